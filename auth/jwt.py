@@ -1,9 +1,12 @@
 import jwt
+import time
 from datetime import datetime, timedelta
+from cachetools import LRUCache
 import schemas, database.connection as connection, models
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
 from jwt.exceptions import InvalidTokenError
 from typing import Annotated
@@ -15,6 +18,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+# token -> (principal, expires at); entries never outlive the token
+_principal_cache = LRUCache(maxsize=settings.auth_principal_cache_size)
+
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -28,10 +34,15 @@ def create_access_token(data: dict) -> str:
 def verify_access_token(token: str, credentials_exception):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = str(payload.get("user_id"))  # Convert user_id to string
+        user_id = payload.get("user_id")
         if user_id is None:
             raise credentials_exception
-        token_data = schemas.TokenData(id=user_id)
+        token_data = schemas.TokenData(
+            id=str(user_id),  # Convert user_id to string
+            name=payload.get("name"),
+            email=payload.get("email"),
+            exp=payload.get("exp")
+        )
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                           detail="Token has expired", headers={"WWW-Authenticate": "Bearer"})
@@ -40,13 +51,40 @@ def verify_access_token(token: str, credentials_exception):
     return token_data
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(connection.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(connection.get_db)):
+    """
+    The user a bearer token belongs to.
+
+    Principals are cached per process for AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    so a user deleted or changed in the database keeps authenticating with
+    the old details for at most that long (or until the token expires, if
+    sooner). Set the TTL to 0 where that window is not acceptable.
+    """
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                           detail=f"Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
 
+    cached = _principal_cache.get(token)
+    if cached is not None:
+        principal, expires_at = cached
+        if time.time() < expires_at:
+            return principal
+        _principal_cache.pop(token, None)
+
     token_data = verify_access_token(token, credentials_exception)
 
-    user = db.query(models.User).filter(models.User.id == token_data.id).first()
+    # Optionally trust the signed claims and skip the database entirely
+    if settings.auth_trust_token_claims and token_data.name is not None and token_data.email is not None:
+        return schemas.UserResponse(id=int(token_data.id), name=token_data.name, email=token_data.email)
+
+    result = await db.execute(select(models.User).where(models.User.id == int(token_data.id)))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
-    return user
+
+    principal = schemas.UserResponse.model_validate(user)
+    if settings.auth_principal_cache_ttl_seconds > 0:
+        expires_at = time.time() + settings.auth_principal_cache_ttl_seconds
+        if token_data.exp is not None:
+            expires_at = min(expires_at, token_data.exp)
+        _principal_cache[token] = (principal, expires_at)
+    return principal
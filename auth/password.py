@@ -1,10 +1,43 @@
+import time
 from passlib.context import CryptContext
+from config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min and max rounds to the configured cost makes hashes with any other cost
+# "need update", so they are transparently rehashed at the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 # Define a function to hash the password
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password:str, hashed_password:str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """
+    Verify a password and, if its hash uses an outdated cost, return a new hash.
+
+    Returns:
+        tuple: (is valid, new hash or None)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def timed(fn, *args):
+    """
+    Call `fn` and also return how long it ran, measured where it runs.
+
+    Pool tasks are wrapped in this so their spans cover the hashing alone,
+    not the wait for a free worker.
+
+    Returns:
+        tuple: (result, seconds)
+    """
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
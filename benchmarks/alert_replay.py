@@ -0,0 +1,162 @@
+"""
+Per-tick latency of the alert index on a synthetic tick replay.
+
+Arms tens of thousands of price alerts per symbol around the starting price,
+replays random-walk ticks through PriceAlertIndex.on_price and re-arms every
+fired alert at a new threshold so the ticks keep crossing alerts for the whole
+replay. The same replay through a list scan of every alert of the symbol gives
+the baseline. Finally times one vectorized PortfolioAlerts pass.
+
+Runs fully in memory; no database or network is needed:
+    python -m benchmarks.alert_replay --symbols 10 --alerts-per-symbol 50000 --ticks 20000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import numpy as np
+from utils.alert_engine import ABOVE, BELOW, PortfolioAlerts, PriceAlertIndex
+
+START_PRICE = 100.0
+
+
+def make_alerts(rng: random.Random, symbols: list[str], per_symbol: int):
+    """
+    Returns:
+        list: (alert id, symbol, direction, threshold); "below" under the start price, "above" over it
+    """
+    alerts = []
+    for symbol in symbols:
+        for _ in range(per_symbol):
+            direction = rng.choice((BELOW, ABOVE))
+            offset = rng.uniform(0.1, 30.0)
+            threshold = START_PRICE - offset if direction == BELOW else START_PRICE + offset
+            alerts.append((len(alerts) + 1, symbol, direction, threshold))
+    return alerts
+
+
+def make_ticks(rng: random.Random, symbols: list[str], count: int) -> list[tuple]:
+    prices = dict.fromkeys(symbols, START_PRICE)
+    ticks = []
+    for _ in range(count):
+        symbol = rng.choice(symbols)
+        # Mean-reverting walk, so prices stay among the thresholds
+        prices[symbol] += rng.gauss(0, 0.5) + (START_PRICE - prices[symbol]) * 0.01
+        ticks.append((symbol, prices[symbol]))
+    return ticks
+
+
+def rearm(rng: random.Random, price: float, direction: str) -> float:
+    # A new threshold on the armed side of the current price
+    offset = rng.uniform(0.1, 30.0)
+    return price - offset if direction == BELOW else price + offset
+
+
+def replay_index(alerts, ticks, seed: int):
+    rng = random.Random(seed)
+    index = PriceAlertIndex()
+    index.load(alerts)
+    directions = {alert_id: direction for alert_id, _, direction, _ in alerts}
+    latencies, fired_total = [], 0
+    for symbol, price in ticks:
+        started = time.perf_counter()
+        fired = index.on_price(symbol, price)
+        latencies.append(time.perf_counter() - started)
+        fired_total += len(fired)
+        for alert_id in fired:
+            index.add(alert_id, symbol, directions[alert_id], rearm(rng, price, directions[alert_id]))
+    return latencies, fired_total
+
+
+def replay_scan(alerts, ticks, seed: int):
+    """
+    The baseline: test every armed alert of the symbol on each tick.
+    """
+    rng = random.Random(seed)
+    books = {}
+    for alert_id, symbol, direction, threshold in alerts:
+        books.setdefault(symbol, []).append([alert_id, direction == BELOW, threshold, True])
+    latencies, fired_total = [], 0
+    for symbol, price in ticks:
+        started = time.perf_counter()
+        fired = []
+        for alert in books[symbol]:
+            if alert[3] and (price < alert[2] if alert[1] else price > alert[2]):
+                alert[3] = False
+                fired.append(alert)
+        latencies.append(time.perf_counter() - started)
+        fired_total += len(fired)
+        for alert in fired:
+            alert[2], alert[3] = rearm(rng, price, BELOW if alert[1] else ABOVE), True
+    return latencies, fired_total
+
+
+def summarize(latencies: list[float], fired: int) -> dict:
+    micros = sorted(latency * 1e6 for latency in latencies)
+    return {
+        "ticks": len(micros),
+        "triggered": fired,
+        "p50_us": round(statistics.median(micros), 1),
+        "p99_us": round(micros[int(len(micros) * 0.99) - 1], 1),
+        "max_us": round(micros[-1], 1),
+        "ticks_per_second": round(len(micros) / sum(latencies)),
+    }
+
+
+def time_portfolio(users: int, alerts: int, rounds: int = 20) -> dict:
+    rng = np.random.default_rng(7)
+    rows = list(zip(
+        range(1, alerts + 1),
+        rng.integers(1, users + 1, alerts).tolist(),
+        rng.choice([BELOW, ABOVE], alerts).tolist(),
+        rng.uniform(-40, 40, alerts).tolist(),
+    ))
+    user_ids = np.arange(1, users + 1, dtype=np.int64)
+    timings, fired = [], 0
+    for _ in range(rounds):
+        # A fresh copy each round, so every pass evaluates the full set
+        portfolio = PortfolioAlerts(rows)
+        pl_percentages = rng.normal(0, 15, users)
+        started = time.perf_counter()
+        fired_ids, _ = portfolio.evaluate(user_ids, pl_percentages)
+        timings.append(time.perf_counter() - started)
+        fired += len(fired_ids)
+    return {
+        "users": users,
+        "alerts": alerts,
+        "median_ms": round(statistics.median(timings) * 1e3, 2),
+        "mean_triggered": round(fired / rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--alerts-per-symbol", type=int, default=50_000)
+    parser.add_argument("--ticks", type=int, default=20_000)
+    parser.add_argument("--scan-ticks", type=int, default=2_000, help="ticks replayed through the scan baseline")
+    parser.add_argument("--portfolio-users", type=int, default=100_000)
+    parser.add_argument("--portfolio-alerts", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    symbols = [f"ALR{i:03d}" for i in range(args.symbols)]
+    alerts = make_alerts(rng, symbols, args.alerts_per_symbol)
+    ticks = make_ticks(rng, symbols, args.ticks)
+
+    started = time.perf_counter()
+    PriceAlertIndex().load(alerts)
+    load_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "alerts": len(alerts),
+        "index_load_seconds": round(load_seconds, 2),
+        "index": summarize(*replay_index(alerts, ticks, seed=11)),
+        "scan": summarize(*replay_scan(alerts, ticks[:args.scan_ticks], seed=11)),
+        "portfolio": time_portfolio(args.portfolio_users, args.portfolio_alerts),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Per-request authentication overhead of get_current_user.
+
+Compares the uncached database lookup, the cached principal fast path and
+the trusted-claims mode against a local SQLite database.
+
+Run from the repository root:
+    DATABASE_URL=sqlite:///./bench_auth.db python -m benchmarks.auth_overhead --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from auth import jwt as auth_jwt
+from config import settings
+from database.connection import AsyncSessionLocal, async_engine, engine
+import models
+
+
+async def ensure_user():
+    models.Base.metadata.create_all(bind=engine)
+    async with AsyncSessionLocal() as db:
+        user = models.User(name="Bench", email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+
+async def measure(token: str, requests: int):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await auth_jwt.get_current_user(token=token, db=db)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return {
+        "mean_us": round(statistics.fmean(latencies), 1),
+        "p50_us": round(latencies[len(latencies) // 2], 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+    }
+
+
+async def run(requests: int):
+    user = await ensure_user()
+    token = auth_jwt.create_access_token({"user_id": user.id, "name": user.name, "email": user.email})
+    results = {"requests": requests}
+
+    settings.auth_trust_token_claims = False
+    settings.auth_principal_cache_ttl_seconds = 0
+    results["database_lookup"] = await measure(token, requests)
+
+    settings.auth_principal_cache_ttl_seconds = 30
+    auth_jwt._principal_cache.clear()
+    results["cached_principal"] = await measure(token, requests)
+
+    settings.auth_trust_token_claims = True
+    settings.auth_principal_cache_ttl_seconds = 0
+    results["trusted_claims"] = await measure(token, requests)
+
+    await async_engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(run(parser.parse_args().requests))
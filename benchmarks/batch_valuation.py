@@ -0,0 +1,147 @@
+"""
+Throughput and memory of the batch valuation job.
+
+Recreates the schema, seeds lots spread over many users, then runs the same
+job as `python -m utils.batch_valuation` against a fake price source that
+counts how often each symbol is requested. Reports lots per minute, the
+peak resident memory during the run and the per-symbol fetch counts.
+
+Run from the repository root (the database is recreated on every run):
+    DATABASE_URL=sqlite:///./bench_valuation.db python -m benchmarks.batch_valuation --lots 1000000 --users 20000
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from sqlalchemy import func, insert, select
+from database.connection import DATABASE_URL, SessionLocal, engine
+from utils.batch_valuation import run_batch_valuation
+import models
+
+SEED_BATCH = 100_000
+
+
+def seed(lots: int, users: int, stocks: int):
+    rng = random.Random(7)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(models.Stock), [
+            {"stock_symbol": f"VAL{i:05d}", "stock_name": f"Valuation {i}", "sector": "Benchmark"} for i in range(stocks)
+        ])
+        db.execute(insert(models.User), [
+            {"name": f"val-{i}", "email": f"val-{i}@example.com", "hashed_password": "x"} for i in range(users)
+        ])
+        db.commit()
+    start = date(2015, 1, 1)
+    with engine.begin() as connection:
+        for offset in range(0, lots, SEED_BATCH):
+            connection.execute(insert(models.Holding), [
+                {
+                    "user_id": 1 + rng.randrange(users),
+                    "stock_id": 1 + rng.randrange(stocks),
+                    "shares": rng.randint(1, 100),
+                    "purchase_cost": rng.uniform(100, 10000),
+                    "purchase_date": start + timedelta(days=rng.randrange(3650)),
+                }
+                for _ in range(min(SEED_BATCH, lots - offset))
+            ])
+
+
+class FakePriceSource:
+    """
+    Deterministic prices; counts requests per symbol.
+    """
+
+    def __init__(self, missing_ratio: float):
+        self.requests = Counter()
+        self.batches = 0
+        self.missing_ratio = missing_ratio
+
+    def __call__(self, symbols: list[str]):
+        self.batches += 1
+        self.requests.update(symbols)
+        quotes, errors = {}, {}
+        for symbol in symbols:
+            seed = hash(symbol) % 10_000
+            if seed < self.missing_ratio * 10_000:
+                errors[symbol] = "no data"
+            else:
+                quotes[symbol] = {"current_price": 10 + seed / 10, "daily_change": 0.0}
+        return quotes, errors
+
+
+class RssSampler:
+    """
+    Peak resident memory of this process while running, from /proc (Linux only).
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def rss_bytes() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self.rss_bytes())
+
+    def __enter__(self):
+        self.start_bytes = self.rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--stocks", type=int, default=2_000)
+    parser.add_argument("--chunk-size", type=int, help="defaults to VALUATION_CHUNK_SIZE")
+    parser.add_argument("--missing-ratio", type=float, default=0.01, help="share of symbols without a price")
+    parser.add_argument("--allow-non-sqlite", action="store_true", help="allow recreating a non-SQLite DATABASE_URL")
+    args = parser.parse_args()
+
+    if not DATABASE_URL.startswith("sqlite") and not args.allow_non_sqlite:
+        raise SystemExit(f"Refusing to recreate the schema of {DATABASE_URL}; pass --allow-non-sqlite to do so.")
+
+    started = time.perf_counter()
+    seed(args.lots, args.users, args.stocks)
+    seed_seconds = time.perf_counter() - started
+
+    prices = FakePriceSource(args.missing_ratio)
+    with RssSampler() as memory:
+        report = run_batch_valuation(args.chunk_size, fetch_quotes=prices)
+
+    with SessionLocal() as db:
+        snapshot_users = db.scalar(select(func.count()).where(models.PortfolioSnapshot.run_id == report["run_id"]))
+    print(json.dumps({
+        **report,
+        "seed_seconds": round(seed_seconds, 1),
+        "lots_per_minute": round(report["lot_count"] / report["seconds"] * 60) if report["seconds"] else None,
+        "rss_start_mb": round(memory.start_bytes / 1e6, 1),
+        "rss_peak_mb": round(memory.peak_bytes / 1e6, 1),
+        "price_batches": prices.batches,
+        "max_requests_per_symbol": max(prices.requests.values(), default=0),
+        "snapshot_users": snapshot_users,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
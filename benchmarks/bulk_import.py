@@ -0,0 +1,136 @@
+"""
+Throughput of the bulk holdings import.
+
+Generates a CSV upload with a share of invalid rows and runs it through the
+same parse, validate and chunked-insert path as POST /holdings/import,
+comparing it with one ORM insert per row.
+
+Run from the repository root:
+    DATABASE_URL=sqlite:///./bench_import.db python -m benchmarks.bulk_import --rows 100000
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import select
+from database.connection import AsyncSessionLocal, async_engine, engine
+from utils.executors import shutdown_pools
+from utils.import_service import import_holdings, iter_import_rows
+from utils.position_service import apply_position_delta
+import models
+
+SYMBOLS = [f"SYM{i}" for i in range(500)]
+
+
+def build_csv(rows: int, invalid_ratio: float) -> bytes:
+    rng = random.Random(7)
+    lines = ["stock_symbol,shares,purchase_cost,purchase_date"]
+    start = date(2020, 1, 1)
+    for _ in range(rows):
+        symbol = rng.choice(SYMBOLS)
+        shares = round(rng.uniform(1, 100), 2)
+        cost = round(shares * rng.uniform(10, 500), 2)
+        purchase_date = start + timedelta(days=rng.randrange(1500))
+        if rng.random() < invalid_ratio:
+            # Unknown symbol or unparsable number
+            if rng.random() < 0.5:
+                symbol = "UNKNOWN"
+            else:
+                shares = "n/a"
+        lines.append(f"{symbol},{shares},{cost},{purchase_date.isoformat()}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def setup():
+    models.Base.metadata.create_all(bind=engine)
+    async with AsyncSessionLocal() as db:
+        existing = set((await db.execute(select(models.Stock.stock_symbol))).scalars())
+        db.add_all(models.Stock(stock_symbol=symbol, stock_name=symbol, sector="Benchmark") for symbol in SYMBOLS if symbol not in existing)
+        user = models.User(name="Bench", email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def bulk(user_id: int, payload: bytes):
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        report = await import_holdings(db, user_id, iter_import_rows(io.BytesIO(payload), "csv"))
+    return time.perf_counter() - start, report
+
+
+async def per_row(user_id: int, payload: bytes, limit: int):
+    # Baseline: what looping over the single-holding endpoint logic costs
+    start = time.perf_counter()
+    inserted = 0
+    async with AsyncSessionLocal() as db:
+        stock_ids = dict((await db.execute(select(models.Stock.stock_symbol, models.Stock.id))).all())
+        for _, row in iter_import_rows(io.BytesIO(payload), "csv"):
+            if inserted >= limit:
+                break
+            stock_id = stock_ids.get(row["stock_symbol"])
+            try:
+                holding = models.Holding(
+                    user_id=user_id,
+                    stock_id=stock_id,
+                    shares=float(row["shares"]),
+                    purchase_cost=float(row["purchase_cost"]),
+                    purchase_date=date.fromisoformat(row["purchase_date"]),
+                )
+            except ValueError:
+                continue
+            if stock_id is None:
+                continue
+            db.add(holding)
+            await apply_position_delta(db, user_id, stock_id, shares=holding.shares, cost=holding.purchase_cost, lots=1)
+            await db.commit()
+            inserted += 1
+    return time.perf_counter() - start, inserted
+
+
+async def run(rows: int, invalid_ratio: float, baseline_rows: int):
+    try:
+        results = await measure(rows, invalid_ratio, baseline_rows)
+    finally:
+        await async_engine.dispose()
+        shutdown_pools()
+    print(json.dumps(results, indent=2))
+
+
+async def measure(rows: int, invalid_ratio: float, baseline_rows: int):
+    user_id = await setup()
+    payload = build_csv(rows, invalid_ratio)
+
+    elapsed, report = await bulk(user_id, payload)
+    results = {
+        "rows": rows,
+        "payload_mb": round(len(payload) / 1e6, 2),
+        "bulk": {
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(rows / elapsed),
+            "inserted": report["inserted"],
+            "failed": report["failed"],
+        },
+    }
+
+    if baseline_rows:
+        elapsed, inserted = await per_row(user_id, payload, baseline_rows)
+        results["per_row_commit"] = {
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(inserted / elapsed),
+            "inserted": inserted,
+        }
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--invalid-ratio", type=float, default=0.01)
+    parser.add_argument("--baseline-rows", type=int, default=2000, help="rows for the per-row baseline, 0 to skip")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.invalid_ratio, args.baseline_rows))
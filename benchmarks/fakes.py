@@ -0,0 +1,111 @@
+"""
+Deterministic local stand-ins for Yahoo Finance and FinBERT, for benchmarks.
+
+The fakes replace `yfinance.Ticker` and `yfinance.Search`, so the app's own
+quote provider, quote cache and news code paths still run; only the network
+is simulated, with a configurable latency.
+"""
+import hashlib
+import time
+import numpy as np
+import pandas as pd
+import yfinance
+from utils.sentiment_service import set_finbert_pipeline
+
+LABELS = ("Positive", "Negative", "Neutral")
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+class FakeTicker:
+    """
+    Stands in for yfinance.Ticker; `.info` and `.history` sleep like a network call.
+    """
+
+    latency = 0.0
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+
+    @property
+    def info(self) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        seed = _stable_hash(self.symbol)
+        price = 10 + seed % 49000 / 100
+        return {"regularMarketPrice": price, "regularMarketChange": round(price * ((seed >> 16) % 600 - 300) / 10000, 2)}
+
+    def history(self, start: str, end: str, **kwargs) -> pd.DataFrame:
+        """
+        Weekday closes, the same for a symbol and day on every call.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        days = pd.bdate_range(start, end, inclusive="left", tz="America/New_York")
+        seed = _stable_hash(self.symbol)
+        # A function of the day alone, so incremental fetches agree with full ones
+        ordinals = np.array([day.toordinal() for day in days], dtype="float64")
+        noise = np.array([_stable_hash(f"{self.symbol}:{day.date()}") % 1001 - 500 for day in days]) / 50000
+        closes = (10 + seed % 49000 / 100) * (1 + 0.3 * np.sin(ordinals / 90 + seed % 7) + noise)
+        return pd.DataFrame({"Close": closes}, index=days)
+
+
+class FakeSearch:
+    """
+    Stands in for yfinance.Search; `.news` returns headlines derived from the symbol.
+    """
+
+    latency = 0.0
+
+    def __init__(self, symbol: str, news_count: int = 5, **kwargs):
+        self.symbol = symbol
+        self.news_count = news_count
+
+    @property
+    def news(self) -> list[dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [
+            {"title": f"{self.symbol} headline {i}", "publisher": "Bench Wire", "link": f"https://example.com/{self.symbol}/{i}"}
+            for i in range(self.news_count)
+        ]
+
+
+class StubSentimentPipeline:
+    """
+    Replaces the FinBERT pipeline with a hash of each headline, optionally
+    sleeping per batch to mimic inference cost.
+    """
+
+    def __init__(self, batch_latency: float = 0.0):
+        self.batch_latency = batch_latency
+        self.batches = 0
+
+    def __call__(self, titles, batch_size: int = 32, truncation: bool = True, **kwargs):
+        titles = [titles] if isinstance(titles, str) else list(titles)
+        batches = max((len(titles) + batch_size - 1) // batch_size, 1)
+        self.batches += batches
+        if self.batch_latency:
+            time.sleep(self.batch_latency * batches)
+        return [
+            {"label": LABELS[_stable_hash(title) % 3], "score": 0.5 + _stable_hash(title) % 500 / 1000}
+            for title in titles
+        ]
+
+
+def install_fakes(quote_latency: float = 0.0, news_latency: float = 0.0, inference_latency: float = 0.0):
+    """
+    Patch yfinance and the sentiment model for the rest of the process.
+
+    Returns:
+        StubSentimentPipeline: The installed model stub.
+    """
+    FakeTicker.latency = quote_latency
+    FakeSearch.latency = news_latency
+    yfinance.Ticker = FakeTicker
+    yfinance.Search = FakeSearch
+    stub = StubSentimentPipeline(inference_latency)
+    set_finbert_pipeline(stub)
+    return stub
@@ -0,0 +1,247 @@
+"""
+End-to-end load test of the portfolio endpoints against local stand-ins.
+
+Boots the FastAPI app in-process with fake Yahoo Finance calls, a stub
+sentiment model and a local SQLite database. It seeds one synthetic user per
+portfolio size, then drives concurrent requests at each endpoint and reports
+latency percentiles, throughput and database queries per request as JSON.
+
+Run from the repository root (the database is recreated on every run):
+    python -m benchmarks.load_test --lots 10 100 1000 10000 --requests 200 --concurrency 16 --output bench.json
+
+Compare two runs, e.g. from two commits:
+    python -m benchmarks.load_test --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+DEFAULT_ENDPOINTS = ["/holdings/profit-loss", "/holdings/news-sentiment", "/user/me"]
+
+
+def configure_environment(args):
+    # Settings are read at import time, so they are set before the app is imported
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_load.db")
+    os.environ.update({
+        "RATE_LIMIT_ENABLED": "false",
+        "SENTIMENT_WARMUP": "false",
+        "NEWS_PREFETCH_ENABLED": "false",
+        "PRICE_REFRESH_ENABLED": "false",
+        "POSITION_RECONCILE_ENABLED": "false",
+        "SYMBOL_INDEX_REFRESH_ENABLED": "false",
+        "QUOTE_CACHE_ENABLED": str(args.quote_cache).lower(),
+        "RESPONSE_CACHE_ENABLED": str(args.response_cache).lower(),
+        "SENTIMENT_CACHE_ENABLED": str(args.sentiment_cache).lower(),
+    })
+
+
+def seed_database(lot_counts: list[int], symbols: int):
+    """
+    Recreate the schema and add one user per portfolio size.
+
+    Returns:
+        dict: {lot count: user id}
+    """
+    from sqlalchemy import insert
+    from database.connection import SessionLocal, engine
+    from utils.position_service import run_reconciliation
+    import models
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    users = {}
+    with SessionLocal() as db:
+        db.execute(insert(models.Stock), [
+            {"stock_symbol": f"SYM{i:04d}", "stock_name": f"Synthetic {i}", "sector": f"Sector {i % 11}"}
+            for i in range(symbols)
+        ])
+        for lots in lot_counts:
+            user = models.User(name=f"bench-{lots}", email=f"bench-{lots}@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            users[lots] = user.id
+            start = date(2020, 1, 1)
+            # Spread lots over at most `symbols` stocks, several lots per stock for large portfolios
+            db.execute(insert(models.Holding), [
+                {
+                    "user_id": user.id,
+                    "stock_id": 1 + i % min(symbols, max(lots // 4, 1)),
+                    "shares": 1 + i % 50,
+                    "purchase_cost": 100.0 + i % 997,
+                    "purchase_date": start + timedelta(days=i % 1500),
+                }
+                for i in range(lots)
+            ])
+        db.commit()
+    run_reconciliation()
+    return users
+
+
+class QueryCounter:
+    """
+    Counts statements executed on the app's engines.
+    """
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_scenario(client, path: str, token: str, requests: int, concurrency: int, queries: QueryCounter):
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    queries_before = queries.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "db_queries_per_request": round((queries.count - queries_before) / requests, 2),
+    }
+
+
+async def run(args):
+    configure_environment(args)
+    import httpx
+    from benchmarks.fakes import install_fakes
+    from auth.jwt import create_access_token
+    from database.connection import DATABASE_URL, async_engine, engine
+    import main as app_module
+
+    if not DATABASE_URL.startswith("sqlite") and not args.allow_non_sqlite:
+        raise SystemExit(f"Refusing to recreate the schema of {DATABASE_URL}; pass --allow-non-sqlite to do so.")
+
+    install_fakes(args.quote_latency, args.news_latency, args.inference_latency)
+    users = seed_database(args.lots, args.symbols)
+    queries = QueryCounter([engine, async_engine.sync_engine])
+
+    results = []
+    app = app_module.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for lots, user_id in users.items():
+                token = create_access_token({"user_id": user_id, "name": f"bench-{lots}", "email": f"bench-{lots}@example.com"})
+                for path in args.endpoints:
+                    # Untimed warm-up so the first request's one-off costs are not measured
+                    await client.get(path, headers={"Authorization": f"Bearer {token}"})
+                    scenario = await run_scenario(client, path, token, args.requests, args.concurrency, queries)
+                    results.append({"endpoint": path, "lots": lots, **scenario})
+                    print(f"{path} lots={lots}: p50={scenario['p50_ms']}ms p95={scenario['p95_ms']}ms "
+                          f"{scenario['throughput_rps']} req/s", file=sys.stderr)
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "compare")
+        },
+        "results": results,
+    }
+
+
+def compare(before_path: str, after_path: str, threshold: float):
+    """
+    Print the p95 and throughput change of every scenario present in both runs.
+
+    Returns:
+        int: 1 when any p95 grew by more than `threshold`, else 0.
+    """
+    with open(before_path) as f:
+        before = {(row["endpoint"], row["lots"]): row for row in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = {(row["endpoint"], row["lots"]): row for row in json.load(f)["results"]}
+
+    regressed = False
+    rows = []
+    for key in sorted(before.keys() & after.keys()):
+        p95_change = after[key]["p95_ms"] / before[key]["p95_ms"] - 1 if before[key]["p95_ms"] else 0.0
+        throughput_change = after[key]["throughput_rps"] / before[key]["throughput_rps"] - 1
+        regression = p95_change > threshold
+        regressed = regressed or regression
+        rows.append({
+            "endpoint": key[0],
+            "lots": key[1],
+            "p95_ms": [before[key]["p95_ms"], after[key]["p95_ms"]],
+            "p95_change": round(p95_change, 3),
+            "throughput_change": round(throughput_change, 3),
+            "regression": regression,
+        })
+    print(json.dumps(rows, indent=2))
+    return 1 if regressed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, nargs="+", default=[10, 100, 1000, 10000], help="portfolio sizes, one user each")
+    parser.add_argument("--symbols", type=int, default=200, help="stocks in the synthetic directory")
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and portfolio size")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--quote-latency", type=float, default=0.05, help="seconds per fake yf.Ticker().info call")
+    parser.add_argument("--news-latency", type=float, default=0.1, help="seconds per fake yf.Search().news call")
+    parser.add_argument("--inference-latency", type=float, default=0.02, help="seconds per stub model batch")
+    parser.add_argument("--quote-cache", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--response-cache", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--sentiment-cache", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--allow-non-sqlite", action="store_true", help="allow recreating a non-SQLite DATABASE_URL")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON reports and exit")
+    parser.add_argument("--threshold", type=float, default=0.1, help="p95 growth counted as a regression by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Cost of the daily portfolio history behind GET /holdings/history.
+
+Fills a price history store in a temporary directory from the fake Yahoo
+Finance history, then times reading the closes back, the vectorized
+valuation and, for comparison, a loop over the days.
+
+Run from the repository root:
+    python -m benchmarks.portfolio_history --years 10 --lots 200 --symbols 50
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+import pandas as pd
+from benchmarks.fakes import FakeTicker
+from utils.portfolio_service import value_history
+from utils.price_history import PriceHistoryStore, update_price_history
+
+
+def fake_fetch(stock_symbol: str, start: date, end: date) -> pd.Series:
+    closes = FakeTicker(stock_symbol).history(start=start.isoformat(), end=(end + timedelta(days=1)).isoformat())["Close"]
+    closes.index = closes.index.tz_localize(None)
+    return closes
+
+
+def build_lots(lots: int, symbols: list[str], start: date, days: int) -> pd.DataFrame:
+    rng = random.Random(7)
+    return pd.DataFrame([
+        {
+            "stock_symbol": rng.choice(symbols),
+            "shares": round(rng.uniform(1, 100), 2),
+            "purchase_cost": round(rng.uniform(100, 10000), 2),
+            "purchase_date": start + timedelta(days=rng.randrange(days)),
+        }
+        for _ in range(lots)
+    ])
+
+
+def value_history_per_day(lots: pd.DataFrame, closes: pd.DataFrame, start: date, end: date) -> list[dict]:
+    # Baseline: value every day separately
+    closes = closes.sort_index().ffill()
+    points = []
+    for day, prices in closes[(closes.index >= pd.Timestamp(start)) & (closes.index <= pd.Timestamp(end))].iterrows():
+        held = lots[pd.to_datetime(lots["purchase_date"]) <= day]
+        price = held["stock_symbol"].map(prices).to_numpy()
+        value = float((held["shares"].to_numpy() * price).sum())
+        points.append({"date": day.date(), "value": value, "cost": float(held["purchase_cost"].sum())})
+    return points
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix="price_history_")
+    try:
+        store = PriceHistoryStore(root)
+        symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+        today = date.today()
+        start = today - timedelta(days=365 * args.years)
+
+        started = time.perf_counter()
+        update_price_history(symbols, today=today - timedelta(days=1), store=store, fetch=fake_fetch)
+        initial_fill = time.perf_counter() - started
+        # The next day only fetches and appends one bar per symbol
+        started = time.perf_counter()
+        update_price_history(symbols, today=today, store=store, fetch=fake_fetch)
+        incremental = time.perf_counter() - started
+
+        lots = build_lots(args.lots, symbols, start, 365 * args.years)
+        closes = store.read_closes(symbols, today)
+        history, _ = value_history(lots, closes, start, today)
+        results = {
+            "years": args.years,
+            "lots": args.lots,
+            "symbols": args.symbols,
+            "trading_days": len(history),
+            "initial_fill_seconds": round(initial_fill, 3),
+            "incremental_update_seconds": round(incremental, 3),
+            "read_closes_ms": round(best_of(args.repeat, store.read_closes, symbols, today) * 1000, 2),
+            "vectorized_ms": round(best_of(args.repeat, value_history, lots, closes, start, today) * 1000, 2),
+        }
+        if args.baseline:
+            results["per_day_loop_ms"] = round(best_of(1, value_history_per_day, lots, closes, start, today) * 1000, 2)
+    finally:
+        shutil.rmtree(root)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--lots", type=int, default=200)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per timing, the best is reported")
+    parser.add_argument("--baseline", action=argparse.BooleanOptionalAction, default=True, help="also time a per-day loop")
+    run(parser.parse_args())
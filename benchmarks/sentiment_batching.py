@@ -0,0 +1,63 @@
+"""
+CPU benchmark: FinBERT per-headline calls versus padded batches.
+
+Run from the repository root:
+    python -m benchmarks.sentiment_batching --headlines 200 --batch-sizes 8 16 32 64
+"""
+import argparse
+import json
+import random
+import time
+import torch
+from utils.sentiment_service import get_finbert_pipeline, score_headlines
+
+SUBJECTS = ["Apple", "Microsoft", "Tesla", "Nvidia", "Amazon", "Alphabet", "Meta", "Netflix"]
+EVENTS = [
+    "beats quarterly earnings expectations",
+    "shares slide after weak guidance",
+    "announces new share buyback program",
+    "faces regulatory probe over market practices",
+    "holds annual shareholder meeting",
+    "raises full-year revenue forecast",
+    "cuts workforce amid slowing demand",
+    "reports record cloud revenue growth",
+]
+
+
+def make_headlines(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(EVENTS)}" for _ in range(count)]
+
+
+def measure(fn, headlines):
+    start = time.perf_counter()
+    fn(headlines)
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 4), "headlines_per_second": round(len(headlines) / elapsed, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headlines", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    headlines = make_headlines(args.headlines)
+    score_headlines(headlines[:4])  # Warm up
+
+    results = {"headlines": len(headlines), "torch_threads": torch.get_num_threads()}
+    finbert_pipeline = get_finbert_pipeline()
+    results["per_item"] = measure(lambda titles: [finbert_pipeline(title) for title in titles], headlines)
+    results["batched"] = {
+        batch_size: measure(lambda titles: score_headlines(titles, batch_size=batch_size), headlines)
+        for batch_size in args.batch_sizes
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
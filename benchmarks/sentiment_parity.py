@@ -0,0 +1,80 @@
+"""
+Accuracy-parity check of an optimized sentiment backend against the fp32 model.
+
+Run from the repository root:
+    python -m benchmarks.sentiment_parity --backend quantized --min-agreement 0.95
+
+Exits with status 1 when label agreement on the fixed headline set falls
+below --min-agreement.
+"""
+import argparse
+import json
+import sys
+import time
+from utils.sentiment_service import SENTIMENT_BACKENDS, load_finbert_pipeline
+
+HEADLINES = [
+    "Apple beats quarterly earnings expectations on strong iPhone sales",
+    "Tesla shares slide after deliveries miss analyst estimates",
+    "Microsoft announces $60 billion share buyback program",
+    "Nvidia faces antitrust probe over chip supply practices",
+    "Amazon holds annual shareholder meeting in Seattle",
+    "Alphabet raises full-year revenue forecast",
+    "Meta cuts 10,000 jobs amid slowing advertising demand",
+    "Netflix reports record subscriber growth in Asia",
+    "Intel warns of weaker margins as competition intensifies",
+    "JPMorgan profit rises as interest income climbs",
+    "Boeing halts deliveries after new quality issues surface",
+    "Coca-Cola keeps dividend unchanged",
+    "Pfizer stock falls after drug trial fails to meet endpoint",
+    "Walmart expands same-day delivery to more cities",
+    "Oil prices steady ahead of OPEC meeting",
+    "Federal Reserve leaves interest rates unchanged",
+    "Disney streaming losses narrow more than expected",
+    "AMD unveils new data center processors",
+    "Ford recalls 500,000 vehicles over brake defect",
+    "Visa reports steady growth in cross-border payments",
+]
+
+
+def score(finbert_pipeline):
+    start = time.perf_counter()
+    scores = finbert_pipeline(HEADLINES, batch_size=len(HEADLINES), truncation=True)
+    return scores, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=[b for b in SENTIMENT_BACKENDS if b != "pytorch"], default="quantized")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    reference, reference_seconds = score(load_finbert_pipeline("pytorch"))
+    candidate, candidate_seconds = score(load_finbert_pipeline(args.backend))
+
+    agreement = sum(
+        ref["label"].lower() == cand["label"].lower() for ref, cand in zip(reference, candidate)
+    ) / len(HEADLINES)
+    mismatches = [
+        {"headline": headline, "fp32": ref["label"], args.backend: cand["label"]}
+        for headline, ref, cand in zip(HEADLINES, reference, candidate)
+        if ref["label"].lower() != cand["label"].lower()
+    ]
+    max_score_delta = max(abs(ref["score"] - cand["score"]) for ref, cand in zip(reference, candidate))
+
+    print(json.dumps({
+        "backend": args.backend,
+        "headlines": len(HEADLINES),
+        "label_agreement": round(agreement, 4),
+        "max_score_delta": round(max_score_delta, 4),
+        "fp32_seconds": round(reference_seconds, 4),
+        f"{args.backend}_seconds": round(candidate_seconds, 4),
+        "mismatches": mismatches,
+    }, indent=2))
+
+    if agreement < args.min_agreement:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     database_hostname: str
@@ -10,6 +11,129 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
 
+    # bcrypt work factor; hashes with another cost are rehashed on login
+    bcrypt_rounds: int = 12
+
+    # Authentication fast path
+    # A deleted or changed user keeps authenticating from the cache for up to this long
+    auth_principal_cache_ttl_seconds: int = 30  # 0 disables the token -> user cache
+    auth_principal_cache_size: int = 10000
+    auth_trust_token_claims: bool = False  # Build the current user from signed claims, without a DB lookup
+
+    # Full database URL; overrides the parts above (e.g. "sqlite:///./finsight.db" for local runs)
+    database_url: Optional[str] = None
+
+    # Connection pool, per engine (the async request engine and the sync background engine)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800  # -1 disables recycling
+    db_pool_pre_ping: bool = True
+    db_migrate_on_startup: bool = True  # Run the Alembic migrations when the app starts
+    db_statement_timeout_ms: int = 30000  # PostgreSQL only; 0 disables
+
+    # Market data
+    quote_fetch_concurrency: int = 8  # Upstream fetches in flight per process, across all requests
+    quote_cache_enabled: bool = True
+    quote_cache_ttl_seconds: int = 60
+    quote_cache_stale_seconds: int = 300  # Serve stale quotes this long while refreshing
+    quote_fetch_timeout: float = 10  # Longest wait for a quote another request is already fetching
+
+    # Where /profit-loss takes prices from: "live" quotes or the "db" stock_prices table
+    portfolio_price_source: str = "live"
+    price_max_age_seconds: int = 300  # Older stored prices are replaced by a live quote
+    price_refresh_enabled: bool = False
+    price_refresh_interval_seconds: int = 60
+    price_refresh_jitter: float = 0.1
+
+    # Check the positions table against the holdings rows on a schedule
+    position_reconcile_enabled: bool = False
+    position_reconcile_interval_seconds: int = 3600
+
+    # Worker pools for blocking work (max_queue = tasks allowed to wait beyond the workers)
+    io_pool_workers: int = 16
+    io_pool_max_queue: int = 256
+    inference_pool_workers: int = 1
+    inference_pool_max_queue: int = 32
+    hashing_pool_workers: int = 2  # Processes, so hashing never holds the API's GIL
+    hashing_pool_max_queue: int = 32
+
+    # Sentiment model
+    sentiment_backend: str = "pytorch"  # "pytorch", "quantized" (int8 dynamic) or "onnx"
+    sentiment_warmup: bool = True  # Load the model in the background at startup
+    sentiment_batch_size: int = 32
+    sentiment_microbatch_window_ms: int = 0  # 0 disables batching across concurrent requests
+    sentiment_cache_enabled: bool = True
+    sentiment_cache_size: int = 10000  # Headlines kept in the in-memory tier
+
+    # Background news prefetch
+    news_prefetch_enabled: bool = False
+    news_prefetch_interval_seconds: int = 900
+    news_prefetch_jitter: float = 0.2  # Fraction of the interval
+    news_prefetch_min_fetch_interval_seconds: float = 1.0  # Rate limit between upstream news calls
+    news_max_age_seconds: int = 3600  # Older prefetched news is refetched on demand
+
+    # Token-bucket rate limiting, per user (or per IP when unauthenticated)
+    rate_limit_enabled: bool = True
+    rate_limit_capacity: float = 15
+    rate_limit_refill_per_minute: float = 15
+    rate_limit_route_costs: Dict[str, float] = {
+        "/health": 0,
+        "/ready": 0,
+        "/holdings/news-sentiment": 5,
+        "/holdings/profit-loss": 2,
+        "/user/login": 2,
+        "/user/signup": 2,
+        "/holdings/import": 5,
+        "/holdings/history": 2,
+        "/metrics": 0,
+    }
+
+    # Bulk holdings import
+    import_chunk_size: int = 5000  # Rows validated and inserted per statement
+    import_max_reported_errors: int = 1000
+
+    # Batch valuation of every account (python -m utils.batch_valuation)
+    valuation_chunk_size: int = 50000  # Lots read per round trip
+    valuation_keep_runs: int = 30  # Older runs and their snapshots are deleted
+
+    # Threshold alerts, evaluated by the price refresh worker (requires price_refresh_enabled)
+    alerts_enabled: bool = True
+    alerts_max_per_user: int = 100
+
+    # Paginated holdings listing
+    holdings_page_default_limit: int = 100
+    holdings_page_max_limit: int = 500
+
+    # Per-user response cache for the read endpoints; writes invalidate it
+    response_cache_enabled: bool = True
+    response_cache_size: int = 10000
+    response_cache_holdings_ttl_seconds: int = 300
+    response_cache_news_ttl_seconds: int = 300
+
+    # Daily close history for /holdings/history, stored as Parquet per symbol
+    price_history_dir: str = "./data/price_history"
+    price_history_lookback_days: int = 3650  # History fetched for a symbol seen for the first time
+    price_history_min_refresh_seconds: int = 3600  # Between upstream checks of a symbol with no new bars
+    price_history_max_parts: int = 64  # Part files per symbol before they are merged
+
+    # Stock symbol search
+    symbol_search_default_limit: int = 50
+    symbol_search_max_limit: int = 200
+    symbol_search_fuzzy_min_length: int = 3  # Shorter queries only match by prefix
+    symbol_search_fuzzy_cutoff: float = 0.75  # difflib similarity ratio
+    symbol_index_refresh_enabled: bool = True
+    symbol_index_refresh_interval_seconds: int = 300
+
+    # Observability
+    profiling_enabled: bool = False  # Allow per-request profiles via the X-Profile header
+    profiling_interval_ms: float = 5
+    profiling_max_profiles: int = 50
+    profiling_max_stacks: int = 100
+
+    # Shared cache backend (optional)
+    redis_url: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
@@ -1,18 +1,46 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from config import settings
+from database.pool import PoolMetrics, attach_pool_events, attach_query_timing, engine_options
 
-DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+DATABASE_URL = settings.database_url or f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
 
-engine = create_engine(DATABASE_URL)
+
+def to_async_url(url: str) -> str:
+    """
+    Swap the sync driver of a database URL for its asyncio counterpart.
+    """
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    async_drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    return f"{async_drivers.get(dialect, scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+pool_metrics = {"sync": PoolMetrics("sync"), "async": PoolMetrics("async")}
+
+# Sync engine for schema management and background jobs
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, pool_metrics["sync"]))
+attach_pool_events(engine, pool_metrics["sync"])
+attach_query_timing(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the request handlers
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, pool_metrics["async"], is_async=True))
+attach_pool_events(async_engine.sync_engine, pool_metrics["async"])
+attach_query_timing(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def get_pool_stats() -> dict:
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-# This code sets up a connection to a PostgreSQL database using SQLAlchemy.
\ No newline at end of file
+# This code sets up a connection to a PostgreSQL database using SQLAlchemy.
@@ -0,0 +1,42 @@
+import logging
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from database.connection import engine
+import models
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+# The revision matching the schema the baseline's create_all built (users, stocks, holdings)
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logging"] = False
+    return config
+
+
+def run_migrations(bind=None):
+    """
+    Upgrade the database schema to the latest revision.
+
+    A database created by `create_all` has the tables but no version. One
+    built before migrations existed is stamped with the baseline revision so
+    only the later revisions run; one that already has every table of the
+    models (e.g. a benchmark database) is stamped as up to date.
+
+    Args:
+        bind: Engine to migrate; defaults to the application's engine.
+    """
+    bind = bind or engine
+    config = alembic_config()
+    config.attributes["engine"] = bind
+    tables = set(inspect(bind).get_table_names())
+    if "alembic_version" not in tables and "holdings" in tables:
+        revision = "head" if set(models.Base.metadata.tables) <= tables else BASELINE_REVISION
+        logger.info("Stamping existing schema with revision %s", revision)
+        command.stamp(config, revision)
+    command.upgrade(config, "head")
@@ -0,0 +1,150 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from config import settings
+from utils.metrics import record_span
+
+
+class PoolMetrics:
+    """
+    Counters for one engine's connection pool, fed by the pool events and
+    by the instrumented checkout below.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.stats = {
+            "checkouts": 0,
+            "checkout_timeouts": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+            "connections_created": 0,
+            "invalidations": 0,
+            "soft_invalidations": 0,
+        }
+        self._lock = threading.Lock()
+
+    def record_wait(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            self.stats["checkout_wait_seconds_total"] += wait
+            self.stats["checkout_wait_seconds_max"] = max(self.stats["checkout_wait_seconds_max"], wait)
+            if timed_out:
+                self.stats["checkout_timeouts"] += 1
+
+    def increment(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = dict(self.stats)
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            # Live gauges straight from the pool
+            snapshot.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        snapshot["pool_class"] = type(pool).__name__ if pool is not None else None
+        snapshot["checkout_wait_measured"] = getattr(pool, "measures_checkout_wait", False)
+        return snapshot
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """
+    A subclass of `base` that times how long each checkout waits for a connection.
+
+    The wait includes opening a new overflow connection, which is also time a
+    request spends blocked on the pool.
+    """
+
+    class InstrumentedPool(base):
+        measures_checkout_wait = True
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record_wait(time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.record_wait(time.perf_counter() - started)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def attach_pool_events(engine, metrics: PoolMetrics):
+    metrics.engine = engine
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.increment("checkouts")
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.increment("connections_created")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("soft_invalidations")
+
+
+def attach_query_timing(engine):
+    """
+    Record every statement's execution time as a "db_query" span.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_span("db_query", time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Failed statements never reach after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+def engine_options(url: str, metrics: PoolMetrics, is_async: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine/create_async_engine built from the pool settings.
+
+    SQLite keeps SQLAlchemy's default pool: its connections are local files, and
+    pool sizing and server-side timeouts do not apply.
+    """
+    if url.startswith("sqlite"):
+        return {}
+
+    options = {
+        "poolclass": instrumented_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, metrics),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_statement_timeout_ms and url.startswith("postgresql"):
+        timeout = str(settings.db_statement_timeout_ms)
+        if is_async:
+            # asyncpg applies server settings when each connection starts
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
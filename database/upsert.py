@@ -0,0 +1,14 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(bind):
+    """
+    Return the dialect-specific `insert` construct for `bind`, which supports
+    ON CONFLICT clauses on both Postgres and SQLite.
+    """
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"ON CONFLICT inserts are not supported for {dialect}")
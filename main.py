@@ -1,28 +1,133 @@
-from fastapi import FastAPI, Request
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 import models, schemas
-from database.connection import engine
-from routers import user, holdings
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from database.connection import async_engine, get_pool_stats
+from database.migrations import run_migrations
+from routers import user, holdings, alerts
+from utils.yfinance_service import get_quote_cache_stats
+from utils.response_cache import get_response_cache_stats
+from utils.executors import PoolSaturatedError, get_executor_stats, run_in_pool, shutdown_pools
+from utils.sentiment_service import is_model_loaded, warm_up_model
+from utils.news_prefetch import NewsPrefetchScheduler
+from utils.price_refresher import PriceRefreshWorker
+from utils.alert_engine import AlertEvaluator
+from utils.position_service import PositionReconcileWorker
+from utils.symbol_index import SymbolIndexRefresher, refresh_symbol_index
+from config import settings
+from utils.rate_limiter import create_rate_limiter
+from utils.metrics import errors_total, get_profile, http_request_duration, profile_request, registry, stats_collector
 
-models.Base.metadata.create_all(bind=engine)
+# Deployments with several workers set DB_MIGRATE_ON_STARTUP=false and run `alembic upgrade head` once instead
+if settings.db_migrate_on_startup:
+    run_migrations()
 
-# Set up rate limiter based on IP
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
+
+# Existing stats endpoints, also exported as gauges on /metrics
+registry.register_collector(stats_collector("finsight_executor", "Worker pool statistics.", get_executor_stats, label="pool"))
+registry.register_collector(stats_collector("finsight_db_pool", "Database connection pool statistics.", get_pool_stats, label="engine"))
+registry.register_collector(stats_collector("finsight_quote_cache", "Quote cache statistics.", get_quote_cache_stats))
+registry.register_collector(stats_collector("finsight_response_cache", "Response cache statistics.", get_response_cache_stats))
+
+# Set up a token-bucket rate limiter, shared between workers when Redis is configured
+rate_limiter = create_rate_limiter()
+
+# Set by the startup warm-up so /ready can report why the model is unavailable
+model_warmup_error = None
+
+
+async def warm_up_sentiment_model():
+    global model_warmup_error
+    try:
+        await run_in_pool("inference", warm_up_model)
+    except Exception as e:
+        model_warmup_error = str(e)
+        errors_total.inc(component="model_warmup")
+        logger.exception("Sentiment model warm-up failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model in the background so liveness checks pass while it loads
+    warmup_task = asyncio.create_task(warm_up_sentiment_model()) if settings.sentiment_warmup else None
+    # Build the symbol search index before serving requests
+    await refresh_symbol_index()
+    workers = []
+    if settings.symbol_index_refresh_enabled:
+        workers.append(SymbolIndexRefresher())
+    if settings.news_prefetch_enabled:
+        workers.append(NewsPrefetchScheduler())
+    if settings.price_refresh_enabled:
+        workers.append(PriceRefreshWorker(alerts=AlertEvaluator() if settings.alerts_enabled else None))
+    if settings.position_reconcile_enabled:
+        workers.append(PositionReconcileWorker())
+    for worker in workers:
+        worker.start()
+    yield
+    for worker in workers:
+        await worker.stop()
+    if warmup_task is not None:
+        warmup_task.cancel()
+    # Close pooled async connections and worker pools on shutdown
+    await async_engine.dispose()
+    shutdown_pools()
 
 # Create the FastAPI app
-app = FastAPI()
-app.state.limiter = limiter
-app.add_exception_handler(429, _rate_limit_exceeded_handler)
+app = FastAPI(lifespan=lifespan)
+app.state.rate_limiter = rate_limiter
+
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    # Shed load instead of queueing more blocking work
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 
 @app.middleware("http")
-@limiter.limit("15/minute") # Limit to 15 requests per minute
 async def global_rate_limiter(request: Request, call_next):
+    if settings.rate_limit_enabled:
+        allowed, retry_after = await rate_limiter.check(request)
+        if not allowed:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
+            )
     return await call_next(request)
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Time every request by route template, and profile it when asked to with X-Profile.
+    """
+    started = time.perf_counter()
+    if settings.profiling_enabled and request.headers.get("x-profile"):
+        with profile_request(request.method, request.url.path) as profile_id:
+            response = await call_next(request)
+        response.headers["X-Profile-Id"] = profile_id
+    else:
+        response = await call_next(request)
+
+    # The route template keeps label cardinality bounded; unmatched paths share one label
+    route = request.scope.get("route")
+    http_request_duration.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
+
 app.include_router(user.router)
 app.include_router(holdings.router)
+app.include_router(alerts.router)
 
 @app.get("/")
 async def root():
@@ -30,4 +135,54 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Ready once the sentiment model is loaded (or immediately when warm-up is disabled).
+    """
+    model_loaded = is_model_loaded()
+    if settings.sentiment_warmup and not model_loaded:
+        detail = {"status": "not ready", "sentiment_model_loaded": False, "error": model_warmup_error}
+        return JSONResponse(status_code=503, content=detail)
+    return {"status": "ready", "sentiment_model_loaded": model_loaded}
+
+
+@app.get("/stats/quote-cache")
+async def quote_cache_stats():
+    return get_quote_cache_stats()
+
+
+@app.get("/stats/response-cache")
+async def response_cache_stats():
+    return get_response_cache_stats()
+
+
+
+@app.get("/stats/executors")
+async def executor_stats():
+    return get_executor_stats()
+
+
+@app.get("/stats/db-pool")
+async def db_pool_stats():
+    return get_pool_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiles/{profile_id}")
+async def debug_profile(profile_id: str):
+    """
+    A request profile recorded with the X-Profile header: span totals and the
+    most frequent sampled stacks, folded for flame graph tools.
+    """
+    profile = get_profile(profile_id) if settings.profiling_enabled else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
@@ -0,0 +1,46 @@
+from logging.config import fileConfig
+from alembic import context
+from database.connection import DATABASE_URL, engine
+import models
+
+config = context.config
+
+# The app configures its own logging when it runs migrations at startup
+if config.config_file_name is not None and config.attributes.get("configure_logging", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+
+def run_migrations_offline():
+    """
+    Emit the migration SQL without connecting, for `alembic upgrade head --sql`.
+    """
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # run_migrations() may pass another engine, e.g. a test database
+    with config.attributes.get("engine", engine).connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite cannot ALTER most constraints; batch mode recreates the table instead
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,63 @@
+"""initial schema
+
+The users, stocks and holdings tables as the original `create_all` built
+them. Databases created that way are stamped with this revision on startup.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 03:34:29.501233
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_name', 'users', ['name'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'stocks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('stock_symbol', sa.String(), nullable=False),
+        sa.Column('stock_name', sa.String(), nullable=False),
+        sa.Column('sector', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stocks_id', 'stocks', ['id'])
+    op.create_index('ix_stocks_stock_symbol', 'stocks', ['stock_symbol'], unique=True)
+
+    op.create_table(
+        'holdings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('stock_id', sa.Integer(), nullable=False),
+        sa.Column('shares', sa.Float(), nullable=False),
+        sa.Column('purchase_cost', sa.Float(), nullable=False),
+        sa.Column('purchase_date', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_holdings_id', 'holdings', ['id'])
+
+
+def downgrade():
+    op.drop_table('holdings')
+    op.drop_table('stocks')
+    op.drop_table('users')
@@ -0,0 +1,37 @@
+"""holdings (user_id, stock_id, purchase_date) index
+
+Every holdings query filters by user_id; the by-symbol lookups and the
+paginated listing also filter by stock and order by purchase date.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 03:40:12.118507
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_holdings_user_stock_date'
+
+
+def upgrade():
+    # Databases built by create_all after the model gained the index already have it
+    if not op.get_context().as_sql:
+        existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('holdings')}
+        if INDEX_NAME in existing:
+            return
+    if op.get_context().dialect.name == 'postgresql':
+        # Build without blocking writes to holdings
+        with op.get_context().autocommit_block():
+            op.create_index(INDEX_NAME, 'holdings', ['user_id', 'stock_id', 'purchase_date'], postgresql_concurrently=True)
+    else:
+        op.create_index(INDEX_NAME, 'holdings', ['user_id', 'stock_id', 'purchase_date'])
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name='holdings')
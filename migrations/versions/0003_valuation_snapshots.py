@@ -0,0 +1,70 @@
+"""valuation snapshots
+
+Tables written by the batch valuation job (utils/batch_valuation.py).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 03:37:02.254825
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'valuation_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('lot_count', sa.Integer(), nullable=False),
+        sa.Column('user_count', sa.Integer(), nullable=False),
+        sa.Column('symbol_count', sa.Integer(), nullable=False),
+        sa.Column('price_errors', sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'portfolio_snapshots',
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_cost', sa.Float(), nullable=False),
+        sa.Column('total_value', sa.Float(), nullable=False),
+        sa.Column('total_profit_loss', sa.Float(), nullable=False),
+        sa.Column('total_profit_loss_percentage', sa.Float(), nullable=False),
+        sa.Column('lot_count', sa.Integer(), nullable=False),
+        sa.Column('unpriced_positions', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['run_id'], ['valuation_runs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('run_id', 'user_id')
+    )
+    op.create_index('ix_portfolio_snapshots_user_run', 'portfolio_snapshots', ['user_id', 'run_id'])
+
+    op.create_table(
+        'position_snapshots',
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('stock_id', sa.Integer(), nullable=False),
+        sa.Column('total_shares', sa.Float(), nullable=False),
+        sa.Column('total_cost', sa.Float(), nullable=False),
+        sa.Column('lot_count', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('market_value', sa.Float(), nullable=True),
+        sa.Column('profit_loss', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['run_id'], ['valuation_runs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('run_id', 'user_id', 'stock_id')
+    )
+
+
+def downgrade():
+    op.drop_table('position_snapshots')
+    op.drop_table('portfolio_snapshots')
+    op.drop_table('valuation_runs')
@@ -0,0 +1,41 @@
+"""alerts
+
+Price and portfolio P/L threshold alerts (utils/alert_engine.py).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 03:52:41.630914
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('stock_id', sa.Integer(), nullable=True),
+        sa.Column('target', sa.String(), nullable=False),
+        sa.Column('direction', sa.String(), nullable=False),
+        sa.Column('threshold', sa.Float(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('triggered_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('triggered_value', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_alerts_user_id', 'alerts', ['user_id'])
+    op.create_index('ix_alerts_active_target', 'alerts', ['active', 'target'])
+
+
+def downgrade():
+    op.drop_table('alerts')
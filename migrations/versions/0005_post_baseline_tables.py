@@ -0,0 +1,122 @@
+"""tables added between the baseline and migrations, positions backfill
+
+stock_prices, positions, headline_sentiments and symbol_news were created
+by `create_all` before migrations existed, so databases built from the
+baseline's three tables never got them. Each is created when missing.
+
+positions is then rebuilt from holdings: databases that gained the table
+from `create_all` only have positions for lots added since, and the table
+is derived data, so a full rebuild is always correct.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 05:12:08.410377
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+TABLES = ('stock_prices', 'positions', 'headline_sentiments', 'symbol_news')
+
+
+def _create_stock_prices():
+    op.create_table(
+        'stock_prices',
+        sa.Column('stock_id', sa.Integer(), nullable=False),
+        sa.Column('current_price', sa.Float(), nullable=False),
+        sa.Column('daily_change', sa.Float(), nullable=False),
+        sa.Column('as_of', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('stock_id')
+    )
+
+
+def _create_positions():
+    op.create_table(
+        'positions',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('stock_id', sa.Integer(), nullable=False),
+        sa.Column('total_shares', sa.Float(), nullable=False),
+        sa.Column('total_cost', sa.Float(), nullable=False),
+        sa.Column('lot_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'stock_id')
+    )
+
+
+def _create_headline_sentiments():
+    op.create_table(
+        'headline_sentiments',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('model_id', sa.String(), nullable=False),
+        sa.Column('label', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+
+
+def _create_symbol_news():
+    op.create_table(
+        'symbol_news',
+        sa.Column('stock_id', sa.Integer(), nullable=False),
+        sa.Column('related_articles', sa.JSON(), nullable=False),
+        sa.Column('sentiment_summary', sa.JSON(), nullable=False),
+        sa.Column('fetched_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('stock_id')
+    )
+
+
+CREATE = {
+    'stock_prices': _create_stock_prices,
+    'positions': _create_positions,
+    'headline_sentiments': _create_headline_sentiments,
+    'symbol_news': _create_symbol_news,
+}
+
+
+def _existing_tables():
+    if op.get_context().as_sql:
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    existing = _existing_tables()
+    for table in TABLES:
+        if table not in existing:
+            CREATE[table]()
+
+    holdings = sa.table(
+        'holdings', sa.column('user_id'), sa.column('stock_id'), sa.column('shares'), sa.column('purchase_cost')
+    )
+    positions = sa.table(
+        'positions',
+        sa.column('user_id'), sa.column('stock_id'), sa.column('total_shares'), sa.column('total_cost'), sa.column('lot_count')
+    )
+    op.execute(positions.delete())
+    op.execute(positions.insert().from_select(
+        ['user_id', 'stock_id', 'total_shares', 'total_cost', 'lot_count'],
+        sa.select(
+            holdings.c.user_id,
+            holdings.c.stock_id,
+            sa.func.sum(holdings.c.shares),
+            sa.func.sum(holdings.c.purchase_cost),
+            sa.func.count()
+        ).group_by(holdings.c.user_id, holdings.c.stock_id)
+    ))
+
+
+def downgrade():
+    # Revision 0001 no longer creates these tables
+    existing = set(TABLES) if op.get_context().as_sql else _existing_tables()
+    for table in reversed(TABLES):
+        if table in existing:
+            op.drop_table(table)
@@ -0,0 +1,58 @@
+"""alerts ids are never reused
+
+The alert evaluator detects changes to the armed alerts by their count and
+id sum, which assumes ids only grow. SQLite reuses the rowid of the newest
+row once it is deleted, so the table is rebuilt with AUTOINCREMENT there.
+Other backends draw ids from a sequence and need no change.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 07:40:19.208316
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def _alerts_table():
+    # The table as revision 0004 created it, so --sql mode needs no reflection
+    return sa.Table(
+        'alerts', sa.MetaData(),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('stock_id', sa.Integer(), nullable=True),
+        sa.Column('target', sa.String(), nullable=False),
+        sa.Column('direction', sa.String(), nullable=False),
+        sa.Column('threshold', sa.Float(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('triggered_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('triggered_value', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_alerts_user_id', 'user_id'),
+        sa.Index('ix_alerts_active_target', 'active', 'target'),
+    )
+
+
+def _rebuild_alerts(autoincrement: bool):
+    if op.get_context().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table(
+        'alerts', recreate='always', copy_from=_alerts_table(), table_kwargs={'sqlite_autoincrement': autoincrement}
+    ):
+        pass
+
+
+def upgrade():
+    _rebuild_alerts(True)
+
+
+def downgrade():
+    _rebuild_alerts(False)
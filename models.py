@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, text, TIMESTAMP, Boolean, Float, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, text, func, TIMESTAMP, Boolean, Float, Date, JSON, Index
 from sqlalchemy.orm import relationship
 from database.connection import Base
 
@@ -9,7 +9,7 @@ class User(Base):
     name = Column(String, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
 
     # Relationship to Portfolio
     holdings = relationship("Holding", back_populates="user", cascade="all, delete-orphan")
@@ -27,6 +27,16 @@ class Stock(Base):
     holdings = relationship("Holding", back_populates="stock")
 
 
+class StockPrice(Base):
+    __tablename__ = "stock_prices"
+
+    # Latest quote per stock, kept current by the price refresh worker
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), primary_key=True)
+    current_price = Column(Float, nullable=False)
+    daily_change = Column(Float, nullable=False)
+    as_of = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
 class Holding(Base):
     __tablename__ = "holdings"
 
@@ -41,3 +51,111 @@ class Holding(Base):
     user = relationship("User", back_populates="holdings")
     stock = relationship("Stock", back_populates="holdings")
 
+    # Every holdings query filters by user; per-stock lookups and pages are ordered by purchase date
+    __table_args__ = (
+        Index("ix_holdings_user_stock_date", "user_id", "stock_id", "purchase_date"),
+    )
+
+
+class Position(Base):
+    __tablename__ = "positions"
+
+    # Per-user, per-stock totals of the holdings rows, updated with every holding change
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), primary_key=True)
+    total_shares = Column(Float, nullable=False, default=0)
+    total_cost = Column(Float, nullable=False, default=0)
+    lot_count = Column(Integer, nullable=False, default=0)
+
+
+class HeadlineSentiment(Base):
+    __tablename__ = "headline_sentiments"
+
+    # sha256 of the model identifier and the normalized headline text
+    content_hash = Column(String(64), primary_key=True)
+    model_id = Column(String, nullable=False)
+    label = Column(String, nullable=False)
+    score = Column(Float, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class SymbolNews(Base):
+    __tablename__ = "symbol_news"
+
+    # Latest scored news per stock, written by the background prefetch
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), primary_key=True)
+    related_articles = Column(JSON, nullable=False)
+    sentiment_summary = Column(JSON, nullable=False)
+    fetched_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
+class ValuationRun(Base):
+    __tablename__ = "valuation_runs"
+
+    # One batch valuation of every account; its snapshots are complete once status is "completed"
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False, default="running")
+    started_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    lot_count = Column(Integer, nullable=False, default=0)
+    user_count = Column(Integer, nullable=False, default=0)
+    symbol_count = Column(Integer, nullable=False, default=0)
+    price_errors = Column(JSON, nullable=False, default=dict)
+
+
+class PortfolioSnapshot(Base):
+    __tablename__ = "portfolio_snapshots"
+
+    # Per-user totals of a valuation run; positions without a price count at cost
+    run_id = Column(Integer, ForeignKey("valuation_runs.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_cost = Column(Float, nullable=False)
+    total_value = Column(Float, nullable=False)
+    total_profit_loss = Column(Float, nullable=False)
+    total_profit_loss_percentage = Column(Float, nullable=False)
+    lot_count = Column(Integer, nullable=False)
+    unpriced_positions = Column(Integer, nullable=False, default=0)
+
+    # Latest snapshot of a user
+    __table_args__ = (
+        Index("ix_portfolio_snapshots_user_run", "user_id", "run_id"),
+    )
+
+
+class PositionSnapshot(Base):
+    __tablename__ = "position_snapshots"
+
+    # Per-user, per-stock values of a valuation run; price is null when it could not be fetched
+    run_id = Column(Integer, ForeignKey("valuation_runs.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), primary_key=True)
+    total_shares = Column(Float, nullable=False)
+    total_cost = Column(Float, nullable=False)
+    lot_count = Column(Integer, nullable=False)
+    price = Column(Float, nullable=True)
+    market_value = Column(Float, nullable=True)
+    profit_loss = Column(Float, nullable=True)
+
+
+class Alert(Base):
+    __tablename__ = "alerts"
+
+    # A one-shot threshold alert; it is disarmed (active = false) when it fires
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    stock_id = Column(Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=True)  # Null for portfolio alerts
+    target = Column(String, nullable=False)  # "price" or "portfolio_pl_percentage"
+    direction = Column(String, nullable=False)  # "below" or "above"
+    threshold = Column(Float, nullable=False)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    triggered_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    triggered_value = Column(Float, nullable=True)  # The price or P/L percentage that fired it
+
+    __table_args__ = (
+        Index("ix_alerts_user_id", "user_id"),
+        # The evaluator loads the armed alerts
+        Index("ix_alerts_active_target", "active", "target"),
+        # Ids are never reused, which the evaluator's change detection relies on
+        {"sqlite_autoincrement": True},
+    )
@@ -0,0 +1,102 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Alert, Stock
+from database.connection import get_db
+from auth.jwt import get_current_user
+import schemas
+from config import settings
+from utils.alert_engine import PRICE
+
+
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+
+def _alert_response(alert: Alert, stock_symbol: Optional[str]) -> dict:
+    return {
+        "id": alert.id,
+        "target": alert.target,
+        "direction": alert.direction,
+        "threshold": alert.threshold,
+        "stock_symbol": stock_symbol,
+        "active": alert.active,
+        "created_at": alert.created_at,
+        "triggered_at": alert.triggered_at,
+        "triggered_value": alert.triggered_value
+    }
+
+
+@router.post("/add", response_model=schemas.AlertResponse, status_code=201)
+async def add_alert(alert: schemas.AlertCreate, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
+    """
+    Register an alert, e.g. AAPL price below 150 or portfolio P/L percentage below -5.
+
+    Alerts fire once, on the first price refresh that crosses the threshold.
+    """
+    if not (settings.price_refresh_enabled and settings.alerts_enabled):
+        # Nothing would ever evaluate the alert
+        raise HTTPException(status_code=503, detail="Alerts are disabled: the price refresh worker is not running")
+    stock = None
+    if alert.target == PRICE:
+        if not alert.stock_symbol:
+            raise HTTPException(status_code=400, detail="Price alerts need a stock_symbol")
+        result = await db.execute(select(Stock).where(Stock.stock_symbol == alert.stock_symbol))
+        stock = result.scalars().first()
+        if not stock:
+            raise HTTPException(status_code=404, detail="Stock not found")
+    elif alert.stock_symbol:
+        raise HTTPException(status_code=400, detail="Portfolio alerts do not take a stock_symbol")
+
+    active_count = await db.scalar(
+        select(func.count(Alert.id)).where(Alert.user_id == current_user.id, Alert.active.is_(True))
+    )
+    if active_count >= settings.alerts_max_per_user:
+        raise HTTPException(status_code=400, detail=f"At most {settings.alerts_max_per_user} active alerts per user")
+
+    new_alert = Alert(
+        user_id=current_user.id,
+        stock_id=stock.id if stock else None,
+        target=alert.target,
+        direction=alert.direction,
+        threshold=alert.threshold
+    )
+    db.add(new_alert)
+    await db.commit()
+    await db.refresh(new_alert)
+    return _alert_response(new_alert, stock.stock_symbol if stock else None)
+
+
+@router.get("/list", response_model=List[schemas.AlertResponse])
+async def list_alerts(
+    active: Optional[bool] = Query(None, description="Only armed (true) or only triggered (false) alerts"),
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    """
+    The user's alerts, newest first.
+    """
+    query = (
+        select(Alert, Stock.stock_symbol)
+        .outerjoin(Stock, Stock.id == Alert.stock_id)
+        .where(Alert.user_id == current_user.id)
+        .order_by(Alert.id.desc())
+    )
+    if active is not None:
+        query = query.where(Alert.active.is_(active))
+    rows = (await db.execute(query)).all()
+    return [_alert_response(row.Alert, row.stock_symbol) for row in rows]
+
+
+@router.delete("/delete/{alert_id}", status_code=204)
+async def delete_alert(alert_id: int, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
+    """
+    Delete an alert by ID.
+    """
+    result = await db.execute(select(Alert).where(Alert.id == alert_id, Alert.user_id == current_user.id))
+    alert = result.scalars().first()
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+
+    await db.delete(alert)
+    await db.commit()
@@ -1,20 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import Holding, Stock, User
+import asyncio
+import csv
+import logging
+from datetime import date, datetime, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Holding, Stock
 from database.connection import get_db
 from auth.jwt import get_current_user
 import schemas
+from config import settings
 from utils.yfinance_service import get_stock_data
-from utils.portfolio_service import calculate_portfolio
-from utils.sentiment_service import fetch_news, analyze_sentiment
+from utils.portfolio_service import calculate_portfolio, calculate_portfolio_history, load_portfolio_holdings, stream_portfolio
+from utils.sentiment_service import fetch_news, analyze_sentiment, score_headlines_cached
+from utils.executors import PoolSaturatedError, run_in_pool
+from utils.metrics import errors_total
+from utils.holdings_listing import list_holdings
+from utils.import_service import import_holdings, iter_import_rows
+from utils.news_prefetch import get_fresh_symbol_news
+from utils.position_service import apply_position_delta
+from utils.response_cache import cached_response, invalidate_user_responses, matches_etag
+from utils.streaming import stream_response
+from utils.symbol_index import get_symbol_index
 
 
 router = APIRouter(prefix="/holdings", tags=["Holdings"])
+logger = logging.getLogger(__name__)
+
+# Compare-and-set attempts of an update racing other updates of the same lot
+UPDATE_ATTEMPTS = 5
 
 @router.post("/add", response_model=schemas.HoldingCreateResponse, status_code=201)
-async def add_holding(holding: schemas.HoldingCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stock = db.query(Stock).filter(Stock.stock_symbol == holding.stock_symbol).first()
+async def add_holding(holding: schemas.HoldingCreate, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
+    result = await db.execute(select(Stock).where(Stock.stock_symbol == holding.stock_symbol))
+    stock = result.scalars().first()
     if not stock:
         raise HTTPException(status_code=404, detail="Stock not found")
 
@@ -26,127 +47,346 @@ async def add_holding(holding: schemas.HoldingCreate, db: Session = Depends(get_
         purchase_date=holding.purchase_date
     )
     db.add(new_holding)
-    db.commit()
-    db.refresh(new_holding)
+    await apply_position_delta(db, current_user.id, stock.id, shares=holding.shares, cost=holding.purchase_cost, lots=1)
+    await db.commit()
+    await invalidate_user_responses(current_user.id)
+    await db.refresh(new_holding)
     return new_holding
 
 
-@router.get("/by-symbol", response_model=list[schemas.HoldingResponse])
-async def get_holdings_by_symbol(stock_symbol: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    holdings = (
-        db.query(Holding, Stock.stock_symbol)
-        .join(Stock, Stock.id == Holding.stock_id)
-        .filter(Holding.user_id == current_user.id, Stock.stock_symbol == stock_symbol)
-        .all()
+@router.post("/import", response_model=schemas.HoldingImportResponse)
+async def import_holdings_file(
+    file: UploadFile = File(...),
+    import_format: Optional[Literal["csv", "jsonl"]] = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    """
+    Bulk import holdings from a CSV (stock_symbol, shares, purchase_cost, purchase_date)
+    or JSON-lines upload. Valid rows are inserted in one transaction; invalid rows are
+    reported by row number.
+    """
+    if import_format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        import_format = "jsonl" if extension in ("jsonl", "ndjson") else "csv"
+
+    rows = iter_import_rows(file.file, import_format)
+    try:
+        report = await import_holdings(db, current_user.id, rows)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse the uploaded file: {e}")
+    await invalidate_user_responses(current_user.id)
+    return report
+
+
+@router.get("/list", response_model=schemas.HoldingPage)
+async def list_holdings_page(
+    request: Request,
+    stock_symbol: Optional[str] = None,
+    limit: int = Query(settings.holdings_page_default_limit, ge=1, le=settings.holdings_page_max_limit),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    """
+    The user's holdings, grouped by stock and oldest purchase first, optionally
+    only those of `stock_symbol`. Pages are chained with `next_cursor`.
+    """
+    async def compute():
+        try:
+            return await list_holdings(db, current_user.id, limit, cursor, stock_symbol)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Holdings only change through writes, which invalidate the cache
+    return await cached_response(
+        request, current_user.id, schemas.HoldingPage, compute, settings.response_cache_holdings_ttl_seconds
     )
-    if not holdings:
-        raise HTTPException(status_code=404, detail="No holdings found for this stock symbol")
-    return [
-        {
-            "id": holding.Holding.id,
-            "stock_symbol": holding.stock_symbol,
-            "shares": holding.Holding.shares,
-            "purchase_cost": holding.Holding.purchase_cost,
-            "purchase_date": holding.Holding.purchase_date
-        }
-        for holding in holdings
-    ]
+
+
+@router.get("/by-symbol", response_model=list[schemas.HoldingResponse], deprecated=True)
+async def get_holdings_by_symbol(request: Request, stock_symbol: str, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
+    """
+    Every holding of one stock. Deprecated: use /list?stock_symbol=, which is paginated.
+    """
+    async def compute():
+        result = await db.execute(
+            select(Holding, Stock.stock_symbol)
+            .join(Stock, Stock.id == Holding.stock_id)
+            .where(Holding.user_id == current_user.id, Stock.stock_symbol == stock_symbol)
+            .order_by(Holding.purchase_date, Holding.id)
+        )
+        holdings = result.all()
+        if not holdings:
+            raise HTTPException(status_code=404, detail="No holdings found for this stock symbol")
+        return [
+            {
+                "id": holding.Holding.id,
+                "stock_symbol": holding.stock_symbol,
+                "shares": holding.Holding.shares,
+                "purchase_cost": holding.Holding.purchase_cost,
+                "purchase_date": holding.Holding.purchase_date
+            }
+            for holding in holdings
+        ]
+
+    # Holdings only change through writes, which invalidate the cache
+    return await cached_response(
+        request, current_user.id, list[schemas.HoldingResponse], compute, settings.response_cache_holdings_ttl_seconds
+    )
+
+
+def portfolio_cache_ttl(portfolio_data: dict) -> float:
+    """
+    How long a valuation stays as current as the prices behind it.
+    """
+    if portfolio_data["errors"]:
+        return 0  # Do not pin a partial valuation
+    # Live quotes are reused by the quote cache for this long anyway
+    ttl = settings.quote_cache_ttl_seconds
+    prices_as_of = portfolio_data["prices_as_of"]
+    if settings.portfolio_price_source == "db" and prices_as_of is not None:
+        # Stored prices change on the next refresh, or are dropped once older than the max age
+        horizon = settings.price_refresh_interval_seconds if settings.price_refresh_enabled else settings.price_max_age_seconds
+        age = (datetime.now(timezone.utc) - prices_as_of).total_seconds()
+        ttl = min(ttl, horizon - age)
+    return max(ttl, 0)
 
 
 @router.get("/profit-loss", response_model=schemas.PortfolioResponse)
-async def get_holdings_profit_loss(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    try:
-        portfolio_data = calculate_portfolio(db, current_user.id)
-        return portfolio_data
-    except ValueError as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_holdings_profit_loss(request: Request, include_purchases: bool = True, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
+    async def compute():
+        try:
+            return await calculate_portfolio(db, current_user.id, include_purchases=include_purchases)
+        except ValueError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_response(request, current_user.id, schemas.PortfolioResponse, compute, portfolio_cache_ttl)
+
+
+@router.get("/history", response_model=schemas.PortfolioHistoryResponse)
+async def get_holdings_history(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    """
+    Daily portfolio value, cost basis and profit/loss from `start` (default:
+    first purchase) to `end` (default: today), valued at daily closes.
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    async def compute():
+        return await calculate_portfolio_history(db, current_user.id, start, end)
+
+    def ttl(history_data: dict) -> float:
+        # Closes only change once a day; retry soon if some history could not be updated
+        return 0 if history_data["errors"] else settings.price_history_min_refresh_seconds
+
+    return await cached_response(request, current_user.id, schemas.PortfolioHistoryResponse, compute, ttl)
 
 
 @router.delete("/delete/{holding_id}", status_code=204)
-async def delete_holding(holding_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_holding(holding_id: int, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
     """
     Delete a holding by ID.
     """
-    holding = db.query(Holding).filter(Holding.id == holding_id, Holding.user_id == current_user.id).first()
+    result = await db.execute(select(Holding).where(Holding.id == holding_id, Holding.user_id == current_user.id))
+    holding = result.scalars().first()
     if not holding:
         raise HTTPException(status_code=404, detail="Holding not found")
     
-    db.delete(holding)
-    db.commit()
+    deleted = await db.execute(delete(Holding).where(Holding.id == holding.id).execution_options(synchronize_session=False))
+    # Of concurrent deletes of the same lot, only the one that removed the row adjusts the position
+    if deleted.rowcount == 1:
+        await apply_position_delta(db, current_user.id, holding.stock_id, shares=-holding.shares, cost=-holding.purchase_cost, lots=-1)
+    await db.commit()
+    await invalidate_user_responses(current_user.id)
     return {"detail": "Holding deleted successfully"}
 
 
 @router.put("/update/{holding_id}", response_model=schemas.HoldingUpdate)
-async def update_holding(holding_id: int, holding_data: schemas.HoldingUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_holding(holding_id: int, holding_data: schemas.HoldingUpdate, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
     """
     Update a holding by its ID.
     """
-    holding = db.query(Holding).filter(Holding.id == holding_id, Holding.user_id == current_user.id).first()
-    if not holding:
-        raise HTTPException(status_code=404, detail="Holding not found")
-    
     # Update only the fields provided in the request body
-    if holding_data.shares is not None:
-        holding.shares = holding_data.shares
-    if holding_data.purchase_cost is not None:
-        holding.purchase_cost = holding_data.purchase_cost
-    if holding_data.purchase_date is not None:
-        holding.purchase_date = holding_data.purchase_date
-
-    db.commit()
-    db.refresh(holding)
+    values = holding_data.model_dump(exclude_none=True)
+    for _ in range(UPDATE_ATTEMPTS):
+        result = await db.execute(
+            select(Holding)
+            .where(Holding.id == holding_id, Holding.user_id == current_user.id)
+            .execution_options(populate_existing=True)
+        )
+        holding = result.scalars().first()
+        if not holding:
+            raise HTTPException(status_code=404, detail="Holding not found")
+        if not values:
+            return holding
+
+        # Only write if the lot still has the values the position delta is computed from;
+        # a concurrent update changed them otherwise, so read them again
+        previous_shares, previous_cost = holding.shares, holding.purchase_cost
+        updated = await db.execute(
+            update(Holding)
+            .where(Holding.id == holding.id, Holding.shares == previous_shares, Holding.purchase_cost == previous_cost)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount == 1:
+            break
+    else:
+        raise HTTPException(status_code=409, detail="Holding was modified concurrently, try again")
+
+    await apply_position_delta(
+        db, current_user.id, holding.stock_id,
+        shares=values.get("shares", previous_shares) - previous_shares,
+        cost=values.get("purchase_cost", previous_cost) - previous_cost
+    )
+    await db.commit()
+    await invalidate_user_responses(current_user.id)
+    await db.refresh(holding)
     return holding
 
 
-@router.get("/stocks/symbols", response_model=list[str])
-async def get_stock_symbols(db: Session = Depends(get_db)):
+@router.get("/stocks/search", response_model=schemas.StockSearchResponse)
+async def search_stocks(
+    request: Request,
+    q: str = "",
+    sector: Optional[str] = None,
+    limit: int = Query(settings.symbol_search_default_limit, ge=1, le=settings.symbol_search_max_limit),
+    cursor: Optional[str] = None
+):
     """
-    Fetch all unique stock symbols from the user's holdings.
+    Search stock symbols and company names by prefix, falling back to fuzzy matches.
+
+    Pages are chained with `next_cursor`. Responses carry an ETag that changes only
+    when the stock directory does, so clients can revalidate with If-None-Match.
     """
-    stock_symbols = db.query(Stock.stock_symbol).all()
-    return [stock[0] for stock in stock_symbols]
+    index = await get_symbol_index()
+    etag = index.etag(q.strip().upper(), (sector or "").lower(), limit, cursor)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if matches_etag(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        page = index.search(q, sector=sector, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content=page, headers=headers)
 
 
-@router.get("/news-sentiment", response_model=schemas.NewsSentimentResponse)
-async def get_news_sentiment(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("/stocks/symbols", response_model=list[str], deprecated=True)
+async def get_stock_symbols():
     """
-    Fetch news articles and perform sentiment analysis for the user's holdings.
+    Fetch all stock symbols. Deprecated: use /stocks/search, which is paginated.
+    """
+    index = await get_symbol_index()
+    return [index.stocks[key]["symbol"] for key in index.symbols]
+
+
+async def fetch_stock_news(stock_symbol: str):
+    try:
+        return await run_in_pool("io", fetch_news, stock_symbol)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        errors_total.inc(component="news_fetch")
+        logger.warning("Error fetching news for %s: %s", stock_symbol, e)
+        return None
+
+
+async def load_news_stocks(db: AsyncSession, user_id: int):
+    """
+    The user's distinct stocks, and the fresh prefetched news among them.
     """
     # Fetch the user's unique holdings
-    unique_stocks = (
-        db.query(Stock.stock_symbol, Stock.stock_name)
+    result = await db.execute(
+        select(Stock.id, Stock.stock_symbol, Stock.stock_name)
         .join(Holding, Stock.id == Holding.stock_id)
-        .filter(Holding.user_id == current_user.id)
+        .where(Holding.user_id == user_id)
         .distinct()
-        .all()
     )
+    unique_stocks = result.all()
 
-    result = []
-    overall_sentiment_summary = {"positive": 0, "negative": 0, "neutral": 0}
+    # Serve news prefetched in the background; only cold symbols are fetched on demand
+    prefetched = await get_fresh_symbol_news(db, [stock.id for stock in unique_stocks])
+    return unique_stocks, prefetched
 
-    for stock in unique_stocks:
-        stock_symbol = stock.stock_symbol
-        stock_name = stock.stock_name
 
-        try:
-            # Fetch news and perform sentiment analysis
-            news_articles = fetch_news(stock_symbol)
-            if not news_articles:
-                print(f"No news found for {stock_symbol}")
-                continue  # Skip if no news articles are found
+@router.get("/news-sentiment", response_model=schemas.NewsSentimentResponse)
+async def get_news_sentiment(request: Request, db: AsyncSession = Depends(get_db), current_user: schemas.UserResponse = Depends(get_current_user)):
+    """
+    Fetch news articles and perform sentiment analysis for the user's holdings.
+    """
+    def ttl(news_data: dict) -> float:
+        if news_data["errors"]:
+            return 0  # Do not pin results missing the stocks that failed
+        # Prefetched news is at most news_max_age_seconds old, so cache no longer than that
+        return min(settings.response_cache_news_ttl_seconds, settings.news_max_age_seconds)
+
+    return await cached_response(
+        request, current_user.id, schemas.NewsSentimentResponse, lambda: analyze_holdings_news(db, current_user.id), ttl
+    )
 
-            analyzed_articles, sentiment_summary = analyze_sentiment(news_articles)
 
-            stock_data = {
-                "stock_symbol": stock_symbol,
-                "stock_name": stock_name,
-                "sentiment_summary": sentiment_summary,
-                "related_articles": analyzed_articles
-            }
+async def analyze_holdings_news(db: AsyncSession, user_id: int):
+    unique_stocks, prefetched = await load_news_stocks(db, user_id)
+    cold_stocks = [stock for stock in unique_stocks if stock.id not in prefetched]
 
-        except Exception as e:
-            print(f"Error processing {stock_symbol}: {e}")
+    # Fetch news for all holdings concurrently
+    news_by_stock = await asyncio.gather(*(fetch_stock_news(stock.stock_symbol) for stock in cold_stocks))
+
+    stocks_with_news = []
+    errors = {}
+    for stock, news_articles in zip(cold_stocks, news_by_stock):
+        if news_articles is None:
+            errors[stock.stock_symbol] = "News could not be fetched"
             continue  # Skip this stock if an error occurs
+        if not news_articles:
+            logger.info("No news found for %s", stock.stock_symbol)
+            continue  # Skip if no news articles are found
+        stocks_with_news.append((stock, news_articles))
+
+    # Score every headline of the request in one batched model call
+    titles = [article['title'] for _, news_articles in stocks_with_news for article in news_articles]
+    try:
+        sentiments = await score_headlines_cached(titles)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        errors_total.inc(component="sentiment_inference")
+        logger.exception("Error analyzing sentiment: %s", e)
+        errors.update((stock.stock_symbol, "Sentiment could not be analyzed") for stock, _ in stocks_with_news)
+        stocks_with_news, sentiments = [], []
+
+    analyzed_by_stock = {
+        stock_id: (news.related_articles, news.sentiment_summary)
+        for stock_id, news in prefetched.items()
+        if news.related_articles
+    }
+    offset = 0
+    for stock, news_articles in stocks_with_news:
+        stock_sentiments = sentiments[offset:offset + len(news_articles)]
+        offset += len(news_articles)
+        analyzed_by_stock[stock.id] = analyze_sentiment(news_articles, stock_sentiments)
+
+    result = []
+    overall_sentiment_summary = {"positive": 0, "negative": 0, "neutral": 0}
+
+    for stock in unique_stocks:
+        if stock.id not in analyzed_by_stock:
+            continue
+        analyzed_articles, sentiment_summary = analyzed_by_stock[stock.id]
+        stock_data = {
+            "stock_symbol": stock.stock_symbol,
+            "stock_name": stock.stock_name,
+            "sentiment_summary": sentiment_summary,
+            "related_articles": analyzed_articles
+        }
 
         # Update overall sentiment summary
         for sentiment, count in stock_data["sentiment_summary"].items():
@@ -156,6 +396,96 @@ async def get_news_sentiment(db: Session = Depends(get_db), current_user: User =
 
     return {
         "overall_sentiment_summary": overall_sentiment_summary,
-        "holdings_sentiment": result
+        "holdings_sentiment": result,
+        "errors": errors
     }
 
+
+@router.get("/profit-loss/stream")
+async def stream_holdings_profit_loss(
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", alias="format"),
+    include_purchases: bool = True,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    """
+    Stream each HoldingProfitLoss as soon as its quote is ready, followed by a
+    "summary" frame with the PortfolioSummary.
+    """
+    # Load everything from the database before streaming starts
+    holdings, purchases = await load_portfolio_holdings(db, current_user.id, include_purchases)
+
+    async def frames():
+        async for event, data in stream_portfolio(holdings, purchases):
+            if event == "holding":
+                data = schemas.HoldingProfitLoss(**data)
+            else:
+                data = dict(data, portfolio_summary=schemas.PortfolioSummary(**data["portfolio_summary"]))
+            yield event, data
+
+    return stream_response(frames(), stream_format)
+
+
+@router.get("/news-sentiment/stream")
+async def stream_news_sentiment(
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    """
+    Stream each StockSentiment as soon as it is scored, followed by a
+    "summary" frame with the overall_sentiment_summary and errors.
+    """
+    unique_stocks, prefetched = await load_news_stocks(db, current_user.id)
+    cold_stocks = [stock for stock in unique_stocks if stock.id not in prefetched]
+
+    async def analyze_stock(stock):
+        """
+        (stock, analyzed articles and summary or None, error message or None)
+        """
+        try:
+            news_articles = await fetch_stock_news(stock.stock_symbol)
+            if news_articles is None:
+                return stock, None, "News could not be fetched"
+            if not news_articles:
+                return stock, None, None
+            sentiments = await score_headlines_cached([article['title'] for article in news_articles])
+        except PoolSaturatedError as e:
+            # Headers are already sent, so report it like any other failed stock
+            return stock, None, str(e)
+        except Exception as e:
+            errors_total.inc(component="news_stream")
+            logger.exception("Error processing news: %s", e)
+            return stock, None, "Sentiment could not be analyzed"
+        return stock, analyze_sentiment(news_articles, sentiments), None
+
+    async def frames():
+        overall_sentiment_summary = {"positive": 0, "negative": 0, "neutral": 0}
+        errors = {}
+
+        def stock_frame(stock, analyzed_articles, sentiment_summary):
+            for sentiment, count in sentiment_summary.items():
+                overall_sentiment_summary[sentiment] += count
+            return "stock", schemas.StockSentiment(
+                stock_symbol=stock.stock_symbol,
+                stock_name=stock.stock_name,
+                sentiment_summary=sentiment_summary,
+                related_articles=analyzed_articles
+            )
+
+        # Prefetched news is ready immediately
+        for stock in unique_stocks:
+            news = prefetched.get(stock.id)
+            if news is not None and news.related_articles:
+                yield stock_frame(stock, news.related_articles, news.sentiment_summary)
+
+        for next_stock in asyncio.as_completed([analyze_stock(stock) for stock in cold_stocks]):
+            stock, analyzed, error = await next_stock
+            if error is not None:
+                errors[stock.stock_symbol] = error
+            if analyzed is not None:
+                yield stock_frame(stock, *analyzed)
+
+        yield "summary", {"overall_sentiment_summary": overall_sentiment_summary, "errors": errors}
+
+    return stream_response(frames(), stream_format)
@@ -1,38 +1,55 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User
 from database.connection import get_db
-from auth.password import hash_password, verify_password
+from auth.password import hash_password, timed, verify_and_update_password
 from auth.jwt import create_access_token, get_current_user
+from utils.executors import run_in_pool
+from utils.metrics import record_span
 import schemas
 
 router = APIRouter(prefix="/user", tags=["User"])
 
 @router.post('/signup', response_model=schemas.UserResponse, status_code=201)
-async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.email == user.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = hash_password(user.password)
+    hashed_password, seconds = await run_in_pool("hashing", timed, hash_password, user.password)
+    record_span("bcrypt_hash", seconds)
     new_user = User(name=user.name, email=user.email, hashed_password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @router.post("/login", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalars().first()
+    if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"user_id": user.id})
+    (is_valid, new_hash), seconds = await run_in_pool(
+        "hashing", timed, verify_and_update_password, form_data.password, user.hashed_password
+    )
+    record_span("bcrypt_verify", seconds)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # The configured bcrypt cost changed since this password was hashed
+        user.hashed_password = new_hash
+        await db.commit()
+
+    access_token = create_access_token(data={"user_id": user.id, "name": user.name, "email": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=schemas.UserResponse)
-async def get_logged_in_user(current_user: User = Depends(get_current_user)):
+async def get_logged_in_user(current_user: schemas.UserResponse = Depends(get_current_user)):
     return current_user
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any, List
-from datetime import date
+from typing import Optional, Dict, Any, List, Literal
+from datetime import date, datetime
 
 class UserCreate(BaseModel):
     name: str
@@ -21,6 +21,9 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     id: Optional[str] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    exp: Optional[int] = None
 
 class HoldingCreate(BaseModel):
     stock_symbol: str
@@ -46,6 +49,24 @@ class HoldingCreateResponse(BaseModel):
 #     class Config:
 #         from_attributes = True
 
+class StockSearchItem(BaseModel):
+    symbol: str
+    name: str
+    sector: Optional[str] = None
+
+class StockSearchResponse(BaseModel):
+    items: List[StockSearchItem]
+    next_cursor: Optional[str] = None
+
+class HoldingImportError(BaseModel):
+    row: int
+    error: str
+
+class HoldingImportResponse(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[HoldingImportError]
+
 class HoldingResponse(BaseModel):
     id: int
     stock_symbol: str
@@ -56,6 +77,10 @@ class HoldingResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class HoldingPage(BaseModel):
+    items: List[HoldingResponse]
+    next_cursor: Optional[str] = None
+
 class HoldingUpdate(BaseModel):
     shares: Optional[float] = None
     purchase_cost: Optional[float] = None
@@ -92,6 +117,22 @@ class PortfolioSummary(BaseModel):
 class PortfolioResponse(BaseModel):
     portfolio_summary: PortfolioSummary
     holdings: List[HoldingProfitLoss]
+    errors: Dict[str, str] = {}  # Symbols whose market data could not be fetched
+    prices_as_of: Optional[datetime] = None  # Timestamp of the oldest price used
+
+class PortfolioHistoryPoint(BaseModel):
+    date: date
+    value: float
+    cost: float
+    profit_loss: float
+    profit_loss_percentage: float
+
+class PortfolioHistoryResponse(BaseModel):
+    start: date
+    end: date
+    points: List[PortfolioHistoryPoint]
+    missing_symbols: List[str] = []  # Held symbols without any stored close, carried at cost
+    errors: Dict[str, str] = {}  # Symbols whose history could not be updated
 
 class ArticleSentiment(BaseModel):
     title: str
@@ -108,4 +149,25 @@ class StockSentiment(BaseModel):
 
 class NewsSentimentResponse(BaseModel):
     overall_sentiment_summary: Dict[str, int]
-    holdings_sentiment: List[StockSentiment]
\ No newline at end of file
+    holdings_sentiment: List[StockSentiment]
+    errors: Dict[str, str] = {}  # Symbols whose news could not be fetched or scored
+
+class AlertCreate(BaseModel):
+    target: Literal["price", "portfolio_pl_percentage"]
+    direction: Literal["below", "above"]
+    threshold: float
+    stock_symbol: Optional[str] = None
+
+class AlertResponse(BaseModel):
+    id: int
+    target: str
+    direction: str
+    threshold: float
+    stock_symbol: Optional[str] = None
+    active: bool
+    created_at: datetime
+    triggered_at: Optional[datetime] = None
+    triggered_value: Optional[float] = None
+
+    class Config:
+        from_attributes = True
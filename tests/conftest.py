@@ -0,0 +1,106 @@
+import os
+import tempfile
+
+# Settings are read on import, so configure a throwaway SQLite database before any app module loads
+_database_dir = tempfile.mkdtemp(prefix="finsight-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+for name, value in {
+    "DATABASE_HOSTNAME": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_PASSWORD": "test",
+    "DATABASE_NAME": "test",
+    "DATABASE_USERNAME": "test",
+    "SECRET_KEY": "test-secret-key-test-secret-key-0123",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "RATE_LIMIT_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",  # The minimum bcrypt cost, to keep signups and logins fast
+}.items():
+    os.environ.setdefault(name, value)
+
+import itertools
+import pytest
+from sqlalchemy import insert, select
+from database.connection import SessionLocal, async_engine
+from database.migrations import run_migrations
+from models import Stock, User
+from utils.yfinance_service import FakeQuoteProvider, get_quote_provider, set_quote_provider
+
+_names = itertools.count()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    run_migrations()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_engine_cleanup():
+    # aiosqlite connections belong to the event loop that opened them; each test gets its own loop
+    yield
+    await async_engine.dispose()
+
+
+@pytest.fixture
+def fake_quotes():
+    provider = FakeQuoteProvider(default_price=100.0)
+    previous = get_quote_provider()
+    set_quote_provider(provider)
+    yield provider
+    set_quote_provider(previous)
+
+
+def create_user() -> int:
+    name = f"user-{next(_names)}"
+    with SessionLocal() as db:
+        user_id = db.execute(
+            insert(User).values(name=name, email=f"{name}@example.com", hashed_password="x").returning(User.id)
+        ).scalar_one()
+        db.commit()
+    return user_id
+
+
+def create_stocks(count: int) -> dict:
+    """
+    Returns:
+        dict: {symbol: stock id} of `count` new stocks
+    """
+    prefix = f"T{next(_names)}X"
+    symbols = [f"{prefix}{i}" for i in range(count)]
+    with SessionLocal() as db:
+        db.execute(insert(Stock), [{"stock_symbol": symbol, "stock_name": symbol, "sector": "Test"} for symbol in symbols])
+        db.commit()
+        return dict(db.execute(select(Stock.stock_symbol, Stock.id).where(Stock.stock_symbol.in_(symbols))).all())
+
+
+def auth_headers(user_id: int) -> dict:
+    from auth.jwt import create_access_token
+
+    return {"Authorization": "Bearer " + create_access_token(data={"user_id": user_id})}
+
+
+async def add_holding(client, headers: dict, symbol: str, shares: float, cost: float) -> int:
+    response = await client.post(
+        "/holdings/add",
+        json={"stock_symbol": symbol, "shares": shares, "purchase_cost": cost, "purchase_date": "2024-01-02"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+@pytest.fixture
+async def client(async_engine_cleanup):
+    """
+    An HTTP client for the app, without running its lifespan (no background workers).
+    """
+    import httpx
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
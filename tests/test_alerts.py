@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from sqlalchemy import delete, insert, select
+from conftest import auth_headers, create_stocks, create_user
+from config import settings
+from database.connection import SessionLocal
+from models import Alert
+from utils.alert_engine import (
+    ABOVE, BELOW, PORTFOLIO_PL_PERCENTAGE, PRICE, PortfolioAlerts, SymbolAlerts, alerts_fingerprint, mark_triggered
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def create_alert(user_id: int, threshold: float, direction: str = BELOW) -> int:
+    with SessionLocal() as db:
+        alert_id = db.execute(
+            insert(Alert)
+            .values(user_id=user_id, target=PORTFOLIO_PL_PERCENTAGE, direction=direction, threshold=threshold, active=True)
+            .returning(Alert.id)
+        ).scalar_one()
+        db.commit()
+    return alert_id
+
+
+def test_symbol_alerts_cross_fires_only_crossed_alerts_once():
+    book = SymbolAlerts()
+    book.extend([(1, BELOW, 100), (2, BELOW, 90), (3, ABOVE, 120), (4, ABOVE, 110)])
+    book.add(5, BELOW, 95)
+
+    assert book.cross(100) == []  # Thresholds are strict
+    assert sorted(book.cross(92)) == [1, 5]
+    assert book.cross(115) == [4]
+    assert sorted(book.cross(80)) == [2]
+    assert book.cross(80) == []
+    assert len(book) == 1
+
+    assert book.remove(3, ABOVE, 120)
+    assert not book.remove(3, ABOVE, 120)
+    assert book.cross(500) == []
+
+
+def test_portfolio_alerts_evaluate():
+    alerts = PortfolioAlerts([(1, 10, BELOW, -5), (2, 10, ABOVE, 20), (3, 11, ABOVE, 0), (4, 12, BELOW, 0)])
+
+    # User 12 has no positions, so alert 4 cannot fire
+    fired_ids, fired_values = alerts.evaluate(np.array([11, 10]), np.array([1.5, -7.0]))
+
+    assert fired_ids.tolist() == [1, 3]
+    assert fired_values.tolist() == [-7.0, 1.5]
+    assert len(alerts) == 2
+
+    fired_ids, _ = alerts.evaluate(np.array([10]), np.array([-50.0]))
+    assert fired_ids.tolist() == []  # Alert 1 already fired
+    assert alerts.evaluate(np.array([], dtype=np.int64), np.array([]))[0].tolist() == []
+
+
+def test_mark_triggered_disarms_each_alert_once():
+    user_id = create_user()
+    first, second = create_alert(user_id, -5), create_alert(user_id, 10, ABOVE)
+
+    assert mark_triggered([(first, -6.0)]) == 1
+    assert mark_triggered([(first, -8.0), (second, 11.0)]) == 1
+    assert mark_triggered([]) == 0
+
+    with SessionLocal() as db:
+        rows = db.execute(select(Alert.id, Alert.active, Alert.triggered_value).where(Alert.user_id == user_id)).all()
+    assert sorted(tuple(row) for row in rows) == [(first, False, -6.0), (second, False, 11.0)]
+
+
+def test_fingerprint_changes_when_the_newest_alert_is_replaced():
+    user_id = create_user()
+    newest = create_alert(user_id, -5)
+    before = alerts_fingerprint()
+
+    with SessionLocal() as db:
+        db.execute(delete(Alert).where(Alert.id == newest))
+        db.commit()
+    create_alert(user_id, -20)
+
+    assert alerts_fingerprint() != before
+
+
+async def test_add_alert_requires_the_evaluator(client, monkeypatch):
+    headers = auth_headers(create_user())
+    (symbol,) = create_stocks(1)
+    body = {"target": PRICE, "direction": BELOW, "threshold": 100, "stock_symbol": symbol}
+
+    monkeypatch.setattr(settings, "price_refresh_enabled", False)
+    assert (await client.post("/alerts/add", json=body, headers=headers)).status_code == 503
+
+    monkeypatch.setattr(settings, "price_refresh_enabled", True)
+    response = await client.post("/alerts/add", json=body, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["stock_symbol"] == symbol
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from conftest import auth_headers, create_stocks, create_user
+from database.connection import AsyncSessionLocal, get_db
+from models import Position
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_get_db_yields_an_async_session(async_engine_cleanup):
+    sessions = get_db()
+    db = await anext(sessions)
+    try:
+        assert isinstance(db, AsyncSession)
+        assert db.bind.dialect.driver == "aiosqlite"
+        assert (await db.execute(text("SELECT 1"))).scalar_one() == 1
+    finally:
+        await sessions.aclose()
+
+
+async def test_holding_round_trip(client):
+    user_id = create_user()
+    (symbol,) = create_stocks(1)
+    headers = auth_headers(user_id)
+
+    response = await client.post(
+        "/holdings/add",
+        json={"stock_symbol": symbol, "shares": 2, "purchase_cost": 150, "purchase_date": "2024-01-02"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    holding_id = response.json()["id"]
+
+    response = await client.get("/holdings/list", headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [holding_id]
+
+    assert (await client.delete(f"/holdings/delete/{holding_id}", headers=headers)).status_code == 204
+    response = await client.get("/holdings/list", headers=headers)
+    assert response.json()["items"] == []
+
+
+async def test_concurrent_requests(client):
+    user_id = create_user()
+    (symbol,) = create_stocks(1)
+    headers = auth_headers(user_id)
+
+    responses = await asyncio.gather(*(
+        client.post(
+            "/holdings/add",
+            json={"stock_symbol": symbol, "shares": 1, "purchase_cost": 10, "purchase_date": "2024-01-02"},
+            headers=headers
+        )
+        for _ in range(10)
+    ))
+
+    assert [response.status_code for response in responses] == [201] * 10
+    async with AsyncSessionLocal() as db:
+        position = (await db.execute(select(Position).where(Position.user_id == user_id))).scalar_one()
+    assert (position.lot_count, position.total_shares, position.total_cost) == (10, 10, 100)
@@ -0,0 +1,43 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+from utils.yfinance_service import YahooQuoteProvider
+
+
+class ConcurrencyProbe:
+    """
+    A stand-in for a network call that records how many run at once.
+    """
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, stock_symbol: str) -> dict:
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.01)
+        with self._lock:
+            self.running -= 1
+        if stock_symbol == "BAD":
+            raise ValueError("No data available")
+        return {"current_price": 1.0, "daily_change": 0.0}
+
+
+def test_quote_fan_out_is_bounded_across_callers(monkeypatch):
+    probe = ConcurrencyProbe()
+    provider = YahooQuoteProvider()
+    monkeypatch.setattr(provider, "fetch_quote", probe)
+    symbols = [f"S{i}" for i in range(20)] + ["BAD"]
+
+    # Several io workers fetching at once share one bound instead of multiplying it
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        results = list(callers.map(lambda _: provider.get_quotes(symbols), range(4)))
+
+    assert probe.peak <= settings.quote_fetch_concurrency
+    for quotes, errors in results:
+        assert len(quotes) == 20
+        assert errors == {"BAD": "No data available"}
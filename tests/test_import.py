@@ -0,0 +1,64 @@
+import io
+import pytest
+from sqlalchemy import event
+from conftest import auth_headers, create_stocks, create_user
+from database.connection import AsyncSessionLocal, async_engine
+from utils.import_service import import_holdings, iter_import_rows
+
+pytestmark = pytest.mark.anyio
+
+
+def csv_rows(*lines: str):
+    body = "stock_symbol,shares,purchase_cost,purchase_date\n" + "\n".join(lines) + "\n"
+    return iter_import_rows(io.BytesIO(body.encode()), "csv")
+
+
+def test_csv_row_with_extra_fields_is_reported():
+    rows = list(csv_rows("AAA,1,10,2024-01-02", "AAA,1,10,2024-01-02,surplus"))
+
+    assert rows[0] == (1, {"stock_symbol": "AAA", "shares": "1", "purchase_cost": "10", "purchase_date": "2024-01-02"})
+    assert rows[1] == (2, "Expected 4 fields, got 5")
+
+
+async def test_import_reports_bad_rows_and_inserts_the_rest(client):
+    user_id = create_user()
+    (symbol,) = create_stocks(1)
+    body = (
+        "stock_symbol,shares,purchase_cost,purchase_date\n"
+        f"{symbol},2,100,2024-01-02\n"
+        f"{symbol},1,50,2024-01-03,extra\n"
+        "UNKNOWN,1,1,2024-01-01\n"
+        f"{symbol},x,1,2024-01-01\n"
+    )
+
+    response = await client.post(
+        "/holdings/import", files={"file": ("h.csv", body.encode(), "text/csv")}, headers=auth_headers(user_id)
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["failed"]) == (1, 3)
+    assert sorted(error["row"] for error in report["errors"]) == [2, 3, 4]
+
+
+async def test_symbols_are_resolved_per_chunk(async_engine_cleanup):
+    user_id = create_user()
+    symbols = sorted(create_stocks(3))
+    rows = csv_rows(*(f"{symbols[i % 3]},1,10,2024-01-02" for i in range(9)), "UNKNOWN,1,1,2024-01-01")
+    stock_lookups = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM stocks" in statement:
+            stock_lookups.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with AsyncSessionLocal() as db:
+            report = await import_holdings(db, user_id, rows, chunk_size=4)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    assert (report["inserted"], report["failed"]) == (9, 1)
+    # The first chunk sees all three symbols and the last one only UNKNOWN; the middle chunk needs no lookup
+    assert len(stock_lookups) == 2
+    assert all(" IN " in statement for statement in stock_lookups)
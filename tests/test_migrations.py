@@ -0,0 +1,68 @@
+from datetime import date
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, insert, inspect, select
+from database.migrations import alembic_config, run_migrations
+import models
+
+
+@pytest.fixture
+def scratch_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migrations.db")
+    yield engine
+    engine.dispose()
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def schema_drift(engine) -> list:
+    with engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection), models.Base.metadata)
+
+
+def test_empty_database_matches_the_models(scratch_engine):
+    run_migrations(scratch_engine)
+
+    assert schema_drift(scratch_engine) == []
+
+
+def test_baseline_database_gets_the_later_tables_and_positions(scratch_engine):
+    # The schema the original create_all built: users, stocks and holdings only
+    baseline = [models.User.__table__, models.Stock.__table__, models.Holding.__table__]
+    models.Base.metadata.create_all(scratch_engine, tables=baseline)
+    with scratch_engine.begin() as connection:
+        connection.execute(insert(models.User), [{"id": 1, "name": "a", "email": "a@example.com", "hashed_password": "x"}])
+        connection.execute(insert(models.Stock), [
+            {"id": 1, "stock_symbol": "AAA", "stock_name": "A", "sector": "Test"},
+            {"id": 2, "stock_symbol": "BBB", "stock_name": "B", "sector": "Test"},
+        ])
+        connection.execute(insert(models.Holding), [
+            {"user_id": 1, "stock_id": 1, "shares": 2, "purchase_cost": 100.0, "purchase_date": date(2024, 1, 2)},
+            {"user_id": 1, "stock_id": 1, "shares": 3, "purchase_cost": 160.0, "purchase_date": date(2024, 2, 2)},
+            {"user_id": 1, "stock_id": 2, "shares": 1, "purchase_cost": 50.0, "purchase_date": date(2024, 3, 2)},
+        ])
+
+    run_migrations(scratch_engine)
+
+    assert set(models.Base.metadata.tables) <= set(inspect(scratch_engine).get_table_names())
+    assert schema_drift(scratch_engine) == []
+    with scratch_engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar_one() == head_revision()
+        positions = connection.execute(
+            select(models.Position.stock_id, models.Position.total_shares, models.Position.total_cost, models.Position.lot_count)
+            .order_by(models.Position.stock_id)
+        ).all()
+    assert [tuple(row) for row in positions] == [(1, 5, 260.0, 2), (2, 1, 50.0, 1)]
+
+
+def test_up_to_date_database_is_stamped(scratch_engine):
+    models.Base.metadata.create_all(scratch_engine)
+
+    run_migrations(scratch_engine)
+
+    with scratch_engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar_one() == head_revision()
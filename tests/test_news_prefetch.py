@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+import pytest
+from conftest import create_stocks
+from database.connection import AsyncSessionLocal
+from utils import news_prefetch
+from utils.news_prefetch import NewsPrefetchScheduler, get_fresh_symbol_news
+
+pytestmark = pytest.mark.anyio
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    """
+    A clock that only moves when the worker sleeps.
+    """
+
+    def __init__(self):
+        self.now = START
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeNewsSource:
+    def __init__(self, news: dict):
+        self.news = news  # symbol -> articles, or an exception to raise
+        self.calls = []
+
+    def __call__(self, stock_symbol: str):
+        self.calls.append(stock_symbol)
+        news = self.news[stock_symbol]
+        if isinstance(news, Exception):
+            raise news
+        return news
+
+
+@pytest.fixture(autouse=True)
+def fake_scores(monkeypatch):
+    async def score(titles):
+        return [{"label": "Positive" if "up" in title else "Neutral", "score": 0.9} for title in titles]
+
+    monkeypatch.setattr(news_prefetch, "score_headlines_cached", score)
+
+
+def articles(*titles):
+    return [{"title": title, "publisher": "p", "link": "l"} for title in titles]
+
+
+def make_worker(stocks: dict, news: dict, **kwargs):
+    clock = FakeClock()
+    source = FakeNewsSource(news)
+    worker = NewsPrefetchScheduler(
+        news_source=source,
+        symbol_source=lambda: sorted((stock_id, symbol) for symbol, stock_id in stocks.items()),
+        clock=clock,
+        sleep=clock.sleep,
+        **kwargs
+    )
+    return worker, source, clock
+
+
+async def test_fetches_are_rate_limited_and_stored(async_engine_cleanup):
+    stocks = create_stocks(3)
+    symbols = sorted(stocks)
+    worker, source, clock = make_worker(
+        stocks, {symbols[0]: articles("up a", "flat b"), symbols[1]: articles("up c"), symbols[2]: articles("d")},
+        min_fetch_interval=2
+    )
+
+    rows = await worker.run_once()
+
+    assert source.calls == symbols
+    assert clock.sleeps == [2, 2]
+    assert [row["sentiment_summary"]["positive"] for row in rows] == [1, 1, 0]
+    assert {row["fetched_at"] for row in rows} == {datetime.fromtimestamp(START + 4, timezone.utc)}
+
+    async with AsyncSessionLocal() as db:
+        fresh = await get_fresh_symbol_news(db, list(stocks.values()), max_age_seconds=10**10)
+    assert set(fresh) == set(stocks.values())
+    assert fresh[stocks[symbols[0]]].sentiment_summary == {"positive": 1, "negative": 0, "neutral": 1}
+
+
+async def test_empty_and_failed_fetches_are_not_stored(async_engine_cleanup):
+    stocks = create_stocks(3)
+    ok, empty, failing = sorted(stocks)
+    stored = []
+    worker, _, _ = make_worker(
+        stocks, {ok: articles("up"), empty: [], failing: RuntimeError("upstream down")},
+        store=stored.extend, min_fetch_interval=0
+    )
+
+    await worker.run_once()
+
+    assert [row["stock_id"] for row in stored] == [stocks[ok]]
+    assert worker.stats == {"symbols_fetched": 2, "fetch_errors": 1, "empty_results": 1}
+
+
+async def test_next_delay_is_jittered_around_the_interval():
+    worker, _, _ = make_worker({}, {}, interval=100, jitter=0.2)
+    worker.rng = lambda: 0.0
+    assert worker.next_delay() == pytest.approx(80)
+    worker.rng = lambda: 1.0
+    assert worker.next_delay() == pytest.approx(120)
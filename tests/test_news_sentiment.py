@@ -0,0 +1,47 @@
+import json
+import pytest
+import routers.holdings
+from conftest import add_holding, auth_headers, create_stocks, create_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_news_fetch_is_reported_and_not_cached(client, monkeypatch):
+    headers = auth_headers(create_user())
+    (symbol,) = create_stocks(1)
+    await add_holding(client, headers, symbol, 1, 10)
+
+    def failing_fetch(stock_symbol):
+        raise ConnectionError("news source down")
+
+    monkeypatch.setattr(routers.holdings, "fetch_news", failing_fetch)
+    for _ in range(2):
+        response = await client.get("/holdings/news-sentiment", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.json()["errors"] == {symbol: "News could not be fetched"}
+
+    monkeypatch.setattr(routers.holdings, "fetch_news", lambda stock_symbol: [])
+    first = await client.get("/holdings/news-sentiment", headers=headers)
+    second = await client.get("/holdings/news-sentiment", headers=headers)
+    assert first.json()["errors"] == {}
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+
+
+async def test_stream_summary_reports_failed_fetches(client, monkeypatch):
+    headers = auth_headers(create_user())
+    failing, quiet = create_stocks(2)
+    for symbol in (failing, quiet):
+        await add_holding(client, headers, symbol, 1, 10)
+
+    def fetch(stock_symbol):
+        if stock_symbol == failing:
+            raise ConnectionError("news source down")
+        return []
+
+    monkeypatch.setattr(routers.holdings, "fetch_news", fetch)
+    response = await client.get("/holdings/news-sentiment/stream", headers=headers)
+
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert [frame["event"] for frame in frames] == ["summary"]
+    assert frames[0]["data"]["errors"] == {failing: "News could not be fetched"}
@@ -0,0 +1,87 @@
+import time
+from datetime import date, datetime, timezone
+import pytest
+from sqlalchemy import event, insert
+from conftest import create_stocks, create_user
+from database.connection import AsyncSessionLocal, SessionLocal, async_engine
+from models import Holding
+from utils.portfolio_service import calculate_portfolio
+from utils.position_service import run_reconciliation
+from utils.quote_cache import CachingQuoteProvider
+from utils.yfinance_service import set_quote_provider
+
+pytestmark = pytest.mark.anyio
+
+
+def add_lots(user_id: int, stock_ids: list[int], lots_per_stock: int):
+    with SessionLocal() as db:
+        db.execute(insert(Holding), [
+            {"user_id": user_id, "stock_id": stock_id, "shares": 2, "purchase_cost": 150.0, "purchase_date": date(2024, 1, 2)}
+            for stock_id in stock_ids
+            for _ in range(lots_per_stock)
+        ])
+        db.commit()
+
+
+async def count_portfolio_queries(user_id: int, include_purchases: bool):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with AsyncSessionLocal() as db:
+            portfolio = await calculate_portfolio(db, user_id, include_purchases=include_purchases)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+    return len(statements), portfolio
+
+
+@pytest.mark.parametrize("include_purchases", [True, False])
+async def test_query_count_does_not_grow_with_holdings(include_purchases, fake_quotes, async_engine_cleanup):
+    small_user, large_user = create_user(), create_user()
+    add_lots(small_user, list(create_stocks(1).values()), 1)
+    add_lots(large_user, list(create_stocks(50).values()), 4)
+    run_reconciliation()
+
+    small_queries, small = await count_portfolio_queries(small_user, include_purchases)
+    large_queries, large = await count_portfolio_queries(large_user, include_purchases)
+
+    assert len(small["holdings"]) == 1
+    assert len(large["holdings"]) == 50
+    assert large["portfolio_summary"]["total_cost"] == 200 * 150.0
+    assert small_queries == large_queries == 1
+
+
+async def test_unpriced_symbols_are_reported(fake_quotes, async_engine_cleanup):
+    user_id = create_user()
+    stocks = create_stocks(2)
+    add_lots(user_id, list(stocks.values()), 1)
+    priced, unpriced = sorted(stocks)
+    fake_quotes.default_price = None
+    fake_quotes.prices = {priced: 120.0}
+
+    async with AsyncSessionLocal() as db:
+        portfolio = await calculate_portfolio(db, user_id)
+
+    assert [holding["stock_symbol"] for holding in portfolio["holdings"]] == [priced]
+    assert list(portfolio["errors"]) == [unpriced]
+    assert portfolio["holdings"][0]["total_profit_loss"] == 2 * 120.0 - 150.0
+
+
+async def test_prices_as_of_is_when_a_cached_quote_was_fetched(fake_quotes, async_engine_cleanup):
+    user_id = create_user()
+    stocks = create_stocks(1)
+    add_lots(user_id, list(stocks.values()), 1)
+    cache = CachingQuoteProvider(fake_quotes, ttl=60, stale_ttl=60)
+    fetched_at = time.time() - 90
+    cache.store.set(*stocks, {"current_price": 110.0, "daily_change": 0.0}, fetched_at, 120)
+    set_quote_provider(cache)
+
+    async with AsyncSessionLocal() as db:
+        portfolio = await calculate_portfolio(db, user_id)
+
+    # The stale quote is served while it is refreshed, and reported with its own age
+    assert portfolio["holdings"][0]["current_price"] == 110.0
+    assert portfolio["prices_as_of"] == datetime.fromtimestamp(fetched_at, timezone.utc)
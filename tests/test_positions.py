@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+from conftest import add_holding, auth_headers, create_stocks, create_user
+from database.connection import AsyncSessionLocal
+from models import Holding, Position
+
+pytestmark = pytest.mark.anyio
+
+
+async def position_of(user_id: int):
+    async with AsyncSessionLocal() as db:
+        position = (await db.execute(select(Position).where(Position.user_id == user_id))).scalar_one()
+    return position.lot_count, position.total_shares, position.total_cost
+
+
+async def test_positions_follow_add_update_and_delete(client):
+    user_id = create_user()
+    (symbol,) = create_stocks(1)
+    headers = auth_headers(user_id)
+
+    first = await add_holding(client, headers, symbol, 2, 100)
+    await add_holding(client, headers, symbol, 3, 150)
+    assert await position_of(user_id) == (2, 5, 250)
+
+    response = await client.put(f"/holdings/update/{first}", json={"shares": 4, "purchase_cost": 180}, headers=headers)
+    assert response.status_code == 200
+    assert await position_of(user_id) == (2, 7, 330)
+
+    assert (await client.delete(f"/holdings/delete/{first}", headers=headers)).status_code == 204
+    assert await position_of(user_id) == (1, 3, 150)
+
+
+async def test_concurrent_deletes_of_one_lot_apply_the_delta_once(client):
+    user_id = create_user()
+    (symbol,) = create_stocks(1)
+    headers = auth_headers(user_id)
+    holding_id = await add_holding(client, headers, symbol, 2, 100)
+    await add_holding(client, headers, symbol, 3, 150)
+
+    responses = await asyncio.gather(*(client.delete(f"/holdings/delete/{holding_id}", headers=headers) for _ in range(5)))
+
+    assert 204 in [response.status_code for response in responses]
+    assert await position_of(user_id) == (1, 3, 150)
+
+
+async def test_concurrent_updates_keep_the_position_consistent(client):
+    user_id = create_user()
+    (symbol,) = create_stocks(1)
+    headers = auth_headers(user_id)
+    holding_id = await add_holding(client, headers, symbol, 10, 100)
+
+    responses = await asyncio.gather(*(
+        client.put(f"/holdings/update/{holding_id}", json={"shares": shares}, headers=headers) for shares in (20, 30, 40, 50)
+    ))
+
+    assert all(response.status_code in (200, 409) for response in responses)
+    async with AsyncSessionLocal() as db:
+        holding = await db.get(Holding, holding_id)
+    assert await position_of(user_id) == (1, holding.shares, 100)
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+import pandas as pd
+from utils.price_history import PriceHistoryStore, update_price_history
+
+TODAY = date(2024, 3, 1)
+
+
+def fake_fetch(symbol: str, start: date, end: date) -> pd.Series:
+    if symbol == "BAD":
+        raise ValueError("No data available")
+    days = pd.date_range(start, end, freq="D")
+    return pd.Series(100.0, index=days)
+
+
+def test_update_fetches_only_missing_days(tmp_path):
+    store = PriceHistoryStore(str(tmp_path))
+
+    errors = update_price_history(["AAA", "BBB", "BAD"], today=TODAY - timedelta(days=1), store=store, fetch=fake_fetch)
+    assert errors == {"BAD": "No data available"}
+    assert store.last_date("AAA") == store.last_date("BBB") == TODAY - timedelta(days=2)
+
+    update_price_history(["AAA"], today=TODAY, store=store, fetch=fake_fetch)
+    assert store.last_date("AAA") == TODAY - timedelta(days=1)
+    assert store.read("AAA").index.is_unique
+
+
+def test_symbols_that_name_no_directory_are_rejected(tmp_path):
+    root = tmp_path / "history"
+    store = PriceHistoryStore(str(root))
+
+    errors = update_price_history(["..", ".", "", "AAA"], today=TODAY, store=store, fetch=fake_fetch)
+
+    assert set(errors) == {"..", ".", ""}
+    assert all(error.startswith("Invalid stock symbol") for error in errors.values())
+    assert sorted(path.name for path in root.iterdir()) == ["AAA"]
+    assert store.read("..").empty
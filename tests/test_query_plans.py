@@ -0,0 +1,25 @@
+import pytest
+from benchmarks.query_plans import check, seed
+
+INDEXED_QUERIES = {
+    "list_first_page": "ix_holdings_user_stock_date",
+    "list_next_page": "ix_holdings_user_stock_date",
+    "list_by_symbol": "ix_holdings_user_stock_date",
+    "by_symbol": "ix_holdings_user_stock_date",
+}
+
+
+@pytest.fixture(scope="module")
+def plans():
+    user_id, stock_symbol = seed(users=300, lots_per_user=20, stocks=100)
+    return {result["query"]: result for result in check(user_id, stock_symbol)}
+
+
+def test_hot_queries_do_not_scan_large_tables(plans):
+    full_scans = {name: result["plan"] for name, result in plans.items() if result["full_scans"]}
+    assert full_scans == {}
+
+
+@pytest.mark.parametrize("query, index", INDEXED_QUERIES.items())
+def test_holdings_listing_uses_the_composite_index(plans, query, index):
+    assert any(index in line for line in plans[query]["plan"]), plans[query]["plan"]
@@ -0,0 +1,43 @@
+import pytest
+from utils.rate_limiter import MemoryBucketBackend
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def test_bucket_limits_and_refills():
+    clock = FakeClock()
+    backend = MemoryBucketBackend(clock)
+
+    assert await backend.take("ip:a", 2, 1, 1) == (True, 0.0)
+    assert await backend.take("ip:a", 2, 1, 1) == (True, 0.0)
+    assert await backend.take("ip:a", 2, 1, 1) == (False, 1.0)
+
+    clock.now = 1
+    assert await backend.take("ip:a", 2, 1, 1) == (True, 0.0)
+
+
+async def test_refilled_buckets_are_dropped():
+    clock = FakeClock()
+    backend = MemoryBucketBackend(clock)
+    for address in range(1000):
+        await backend.take(f"ip:{address}", 10, 1, 1)
+    assert len(backend) == 1000
+
+    # Ten seconds refill a bucket of 10 at 1 token per second
+    clock.now = 9
+    await backend.take("ip:active", 10, 1, 1)
+    assert len(backend) == 1001
+    clock.now = 10
+    await backend.take("ip:active", 10, 1, 1)
+    assert len(backend) == 1
+
+    # A dropped bucket starts full again, exactly as if it had been kept
+    assert await backend.take("ip:0", 10, 1, 10) == (True, 0.0)
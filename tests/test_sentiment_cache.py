@@ -0,0 +1,49 @@
+import pytest
+from utils import sentiment_service
+from utils.sentiment_service import score_headlines_cached
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    """
+    Titles sent to the model, which labels every headline neutral.
+    """
+    titles = []
+
+    async def fake_score(batch):
+        titles.extend(batch)
+        return [{"label": "Neutral", "score": 0.5} for _ in batch]
+
+    monkeypatch.setattr(sentiment_service, "score_headlines_async", fake_score)
+    return titles
+
+
+def failing_store(*args):
+    raise ConnectionError("sentiment store down")
+
+
+async def test_cached_headlines_skip_the_model(scored):
+    await score_headlines_cached(["Cached headline A"])
+    assert await score_headlines_cached(["Cached headline A", "Cached headline B"]) == [
+        {"label": "Neutral", "score": 0.5}, {"label": "Neutral", "score": 0.5}
+    ]
+    assert scored == ["Cached headline A", "Cached headline B"]
+
+
+async def test_unreadable_cache_falls_back_to_scoring(scored, monkeypatch):
+    monkeypatch.setattr(sentiment_service, "lookup_sentiments", failing_store)
+
+    results = await score_headlines_cached(["Unreadable one", "Unreadable two"])
+
+    assert [result["label"] for result in results] == ["Neutral", "Neutral"]
+    assert scored == ["Unreadable one", "Unreadable two"]
+
+
+async def test_unwritable_cache_still_returns_scores(scored, monkeypatch):
+    monkeypatch.setattr(sentiment_service, "store_sentiments", failing_store)
+
+    results = await score_headlines_cached(["Unwritable headline"])
+
+    assert results == [{"label": "Neutral", "score": 0.5}]
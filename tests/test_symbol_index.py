@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import update
+from conftest import create_stocks
+from database.connection import SessionLocal
+from models import Stock
+from utils.symbol_index import refresh_symbol_index, stock_directory_fingerprint
+
+pytestmark = pytest.mark.anyio
+
+
+def rename(stock_id: int, name: str):
+    with SessionLocal() as db:
+        db.execute(update(Stock).where(Stock.id == stock_id).values(stock_name=name))
+        db.commit()
+
+
+def test_fingerprint_changes_on_same_length_rename():
+    ((_, stock_id),) = create_stocks(1).items()
+    rename(stock_id, "Acme Corp")
+    before = stock_directory_fingerprint()
+
+    rename(stock_id, "Acme Inc.")
+
+    assert stock_directory_fingerprint() != before
+    assert stock_directory_fingerprint() == stock_directory_fingerprint()
+
+
+async def test_refresh_rebuilds_only_after_a_change():
+    ((_, stock_id),) = create_stocks(1).items()
+    rename(stock_id, "Same Len A")
+    await refresh_symbol_index()
+    assert not await refresh_symbol_index(force=False)
+
+    rename(stock_id, "Same Len B")
+
+    assert await refresh_symbol_index(force=False)
+
+
+async def test_search_revalidates_with_if_none_match(client):
+    (symbol,) = create_stocks(1)
+    await refresh_symbol_index()
+    response = await client.get("/holdings/stocks/search", params={"q": symbol})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["symbol"] == symbol
+    etag = response.headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        revalidated = await client.get("/holdings/stocks/search", params={"q": symbol}, headers={"If-None-Match": if_none_match})
+        assert revalidated.status_code == 304
+    assert (await client.get("/holdings/stocks/search", params={"q": symbol}, headers={"If-None-Match": '"other"'})).status_code == 200
@@ -0,0 +1,56 @@
+import itertools
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy import select, update
+import routers.user
+from database.connection import SessionLocal
+from auth.password import hash_password, pwd_context, verify_and_update_password
+from models import User
+
+pytestmark = pytest.mark.anyio
+
+_emails = (f"login-{i}@example.com" for i in itertools.count())
+
+# Hashes as they were made before the configured cost changed
+old_cost = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=5)
+
+
+def test_verify_and_update_rehashes_an_outdated_cost():
+    outdated = old_cost.hash("secret")
+
+    assert verify_and_update_password("wrong", outdated) == (False, None)
+    is_valid, new_hash = verify_and_update_password("secret", outdated)
+    assert is_valid
+    assert not pwd_context.needs_update(new_hash)
+    assert verify_and_update_password("secret", new_hash) == (True, None)
+    assert verify_and_update_password("secret", hash_password("secret")) == (True, None)
+
+
+async def test_signup_and_login_hash_on_the_process_pool(client, monkeypatch):
+    spans = []
+    monkeypatch.setattr(routers.user, "record_span", lambda name, seconds: spans.append(name))
+    email = next(_emails)
+
+    response = await client.post("/user/signup", json={"name": "Login", "email": email, "password": "secret"})
+    assert response.status_code == 201
+    login = await client.post("/user/login", data={"username": email, "password": "secret"})
+    assert login.status_code == 200
+    assert login.json()["token_type"] == "bearer"
+    assert (await client.post("/user/login", data={"username": email, "password": "wrong"})).status_code == 400
+
+    assert spans == ["bcrypt_hash", "bcrypt_verify", "bcrypt_verify"]
+
+
+async def test_login_rehashes_an_outdated_hash(client):
+    email = next(_emails)
+    assert (await client.post("/user/signup", json={"name": "Rehash", "email": email, "password": "secret"})).status_code == 201
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.email == email).values(hashed_password=old_cost.hash("secret")))
+        db.commit()
+
+    assert (await client.post("/user/login", data={"username": email, "password": "secret"})).status_code == 200
+
+    with SessionLocal() as db:
+        stored = db.scalar(select(User.hashed_password).where(User.email == email))
+    assert not pwd_context.needs_update(stored)
+    assert pwd_context.verify("secret", stored)
@@ -0,0 +1,347 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+from database.connection import SessionLocal
+from models import Alert, Position, Stock, StockPrice
+from utils.metrics import registry, span
+
+logger = logging.getLogger(__name__)
+
+PRICE = "price"
+PORTFOLIO_PL_PERCENTAGE = "portfolio_pl_percentage"
+BELOW, ABOVE = "below", "above"
+
+alerts_triggered = registry.counter("finsight_alerts_triggered", "Alerts fired by the evaluator.", ("target",))
+
+
+class SymbolAlerts:
+    """
+    The armed price alerts of one symbol, in two sorted threshold arrays.
+
+    "below" alerts fire once the price drops under their threshold, "above"
+    alerts once it rises over it. "below" thresholds are kept ascending and
+    "above" thresholds negated and ascending, so the alerts a price crosses
+    are always a suffix: a tick costs one binary search per side plus the
+    alerts it fires, which are cut off.
+    """
+
+    __slots__ = ("below_keys", "below_ids", "above_keys", "above_ids")
+
+    def __init__(self):
+        self.below_keys, self.below_ids = [], []
+        self.above_keys, self.above_ids = [], []
+
+    def _side(self, direction: str):
+        if direction == BELOW:
+            return self.below_keys, self.below_ids
+        return self.above_keys, self.above_ids
+
+    @staticmethod
+    def _key(direction: str, threshold: float) -> float:
+        return threshold if direction == BELOW else -threshold
+
+    def add(self, alert_id: int, direction: str, threshold: float):
+        keys, ids = self._side(direction)
+        key = self._key(direction, threshold)
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        ids.insert(index, alert_id)
+
+    def extend(self, alerts):
+        """
+        Add many (alert id, direction, threshold) at once with one sort per side.
+        """
+        for direction in (BELOW, ABOVE):
+            keys, ids = self._side(direction)
+            entries = sorted(list(zip(keys, ids)) + [
+                (self._key(direction, threshold), alert_id)
+                for alert_id, alert_direction, threshold in alerts
+                if alert_direction == direction
+            ])
+            keys[:] = [key for key, _ in entries]
+            ids[:] = [alert_id for _, alert_id in entries]
+
+    def remove(self, alert_id: int, direction: str, threshold: float) -> bool:
+        keys, ids = self._side(direction)
+        key = self._key(direction, threshold)
+        for index in range(bisect_left(keys, key), bisect_right(keys, key)):
+            if ids[index] == alert_id:
+                del keys[index]
+                del ids[index]
+                return True
+        return False
+
+    def cross(self, price: float) -> list[int]:
+        """
+        Remove and return the alerts `price` fires.
+        """
+        fired = []
+        # below: price < threshold
+        index = bisect_right(self.below_keys, price)
+        if index < len(self.below_keys):
+            fired.extend(self.below_ids[index:])
+            del self.below_keys[index:], self.below_ids[index:]
+        # above: price > threshold, i.e. -threshold > -price
+        index = bisect_right(self.above_keys, -price)
+        if index < len(self.above_keys):
+            fired.extend(self.above_ids[index:])
+            del self.above_keys[index:], self.above_ids[index:]
+        return fired
+
+    def __len__(self):
+        return len(self.below_ids) + len(self.above_ids)
+
+
+class PriceAlertIndex:
+    """
+    Armed price alerts per symbol.
+    """
+
+    def __init__(self):
+        self.books = {}  # symbol -> SymbolAlerts
+        self.alerts = {}  # alert id -> (symbol, direction, threshold)
+        self._lock = threading.Lock()
+
+    def load(self, alerts):
+        """
+        Add (alert id, symbol, direction, threshold) rows in bulk.
+        """
+        by_symbol = {}
+        for alert_id, symbol, direction, threshold in alerts:
+            by_symbol.setdefault(symbol, []).append((alert_id, direction, threshold))
+            self.alerts[alert_id] = (symbol, direction, threshold)
+        with self._lock:
+            for symbol, rows in by_symbol.items():
+                self.books.setdefault(symbol, SymbolAlerts()).extend(rows)
+
+    def add(self, alert_id: int, symbol: str, direction: str, threshold: float):
+        with self._lock:
+            self.books.setdefault(symbol, SymbolAlerts()).add(alert_id, direction, threshold)
+            self.alerts[alert_id] = (symbol, direction, threshold)
+
+    def remove(self, alert_id: int) -> bool:
+        with self._lock:
+            entry = self.alerts.pop(alert_id, None)
+            if entry is None:
+                return False
+            symbol, direction, threshold = entry
+            return self.books[symbol].remove(alert_id, direction, threshold)
+
+    def on_price(self, symbol: str, price: float) -> list[int]:
+        """
+        Fire and disarm the alerts of `symbol` that `price` crosses.
+        """
+        book = self.books.get(symbol)
+        if book is None:
+            return []
+        with self._lock:
+            fired = book.cross(price)
+            for alert_id in fired:
+                del self.alerts[alert_id]
+        return fired
+
+    def symbols(self) -> list[str]:
+        return [symbol for symbol, book in self.books.items() if len(book)]
+
+    def __len__(self):
+        return len(self.alerts)
+
+
+class PortfolioAlerts:
+    """
+    Armed portfolio P/L alerts as parallel arrays, evaluated in one vectorized pass.
+    """
+
+    def __init__(self, alerts=()):
+        alerts = list(alerts)  # (alert id, user id, direction, threshold)
+        self.ids = np.array([row[0] for row in alerts], dtype=np.int64)
+        self.user_ids = np.array([row[1] for row in alerts], dtype=np.int64)
+        self.is_below = np.array([row[2] == BELOW for row in alerts], dtype=bool)
+        self.thresholds = np.array([row[3] for row in alerts], dtype=np.float64)
+
+    def evaluate(self, user_ids: np.ndarray, pl_percentages: np.ndarray):
+        """
+        Fire and disarm the alerts crossed by each user's current P/L percentage.
+
+        Users missing from `user_ids` (no positions) fire nothing.
+
+        Returns:
+            tuple: (fired alert ids, the P/L percentage that fired each)
+        """
+        if not len(self.ids) or not len(user_ids):
+            return np.array([], dtype=np.int64), np.array([])
+        order = np.argsort(user_ids)
+        sorted_users = user_ids[order]
+        position = np.minimum(np.searchsorted(sorted_users, self.user_ids), len(sorted_users) - 1)
+        known = sorted_users[position] == self.user_ids
+        pl = np.where(known, pl_percentages[order][position], np.nan)
+        # Comparisons with NaN are false, so unknown users never fire
+        fired = np.where(self.is_below, pl < self.thresholds, pl > self.thresholds)
+
+        fired_ids, fired_values = self.ids[fired], pl[fired]
+        keep = ~fired
+        self.ids, self.user_ids = self.ids[keep], self.user_ids[keep]
+        self.is_below, self.thresholds = self.is_below[keep], self.thresholds[keep]
+        return fired_ids, fired_values
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def alerts_fingerprint():
+    """
+    Changes whenever an alert is armed or disarmed: ids only grow and are
+    never reused (AUTOINCREMENT on SQLite), so equal counts with equal id sums
+    mean the same set of armed alerts.
+    """
+    with SessionLocal() as db:
+        return tuple(db.execute(select(func.count(Alert.id), func.sum(Alert.id)).where(Alert.active.is_(True))).one())
+
+
+def load_armed_alerts():
+    """
+    Returns:
+        tuple: (price alert rows, portfolio alert rows) in the formats of
+        PriceAlertIndex.load and PortfolioAlerts.
+    """
+    with SessionLocal() as db:
+        price_alerts = db.execute(
+            select(Alert.id, Stock.stock_symbol, Alert.direction, Alert.threshold)
+            .join(Stock, Stock.id == Alert.stock_id)
+            .where(Alert.active.is_(True), Alert.target == PRICE)
+        ).all()
+        portfolio_alerts = db.execute(
+            select(Alert.id, Alert.user_id, Alert.direction, Alert.threshold)
+            .where(Alert.active.is_(True), Alert.target == PORTFOLIO_PL_PERCENTAGE)
+        ).all()
+    return [tuple(row) for row in price_alerts], [tuple(row) for row in portfolio_alerts]
+
+
+def load_alert_symbols():
+    """
+    Distinct (stock id, stock symbol) pairs with an armed price alert.
+    """
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Stock.id, Stock.stock_symbol)
+            .join(Alert, Alert.stock_id == Stock.id)
+            .where(Alert.active.is_(True), Alert.target == PRICE)
+            .distinct()
+        ).all()
+    return [(row.id, row.stock_symbol) for row in rows]
+
+
+def load_portfolio_pl():
+    """
+    Current P/L percentage of every user with an armed portfolio alert, from
+    the positions and stored prices; positions without a price count at cost.
+
+    Returns:
+        tuple: (user ids, P/L percentages) as arrays
+    """
+    value = func.sum(func.coalesce(Position.total_shares * StockPrice.current_price, Position.total_cost))
+    cost = func.sum(Position.total_cost)
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Position.user_id, cost, value)
+            .outerjoin(StockPrice, StockPrice.stock_id == Position.stock_id)
+            .where(
+                Position.lot_count > 0,
+                Position.user_id.in_(
+                    select(Alert.user_id).where(Alert.active.is_(True), Alert.target == PORTFOLIO_PL_PERCENTAGE)
+                )
+            )
+            .group_by(Position.user_id)
+        ).all()
+    user_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    costs = np.array([row[1] for row in rows], dtype=np.float64)
+    values = np.array([row[2] for row in rows], dtype=np.float64)
+    pl_percentages = np.where(costs > 0, (values - costs) / np.where(costs > 0, costs, 1) * 100, 0.0)
+    return user_ids, pl_percentages
+
+
+def mark_triggered(fired: list[tuple]) -> int:
+    """
+    Disarm fired alerts, recording when and at what value they fired.
+
+    Alerts already disarmed, e.g. by another worker, are left as they are.
+
+    Returns:
+        int: Number of alerts disarmed.
+    """
+    if not fired:
+        return 0
+    triggered_at = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        result = db.connection().execute(
+            update(Alert.__table__)
+            .where(Alert.__table__.c.id == bindparam("alert_id"), Alert.__table__.c.active.is_(True))
+            .values(active=False, triggered_at=triggered_at, triggered_value=bindparam("value")),
+            [{"alert_id": int(alert_id), "value": float(value)} for alert_id, value in fired]
+        )
+        db.commit()
+    return result.rowcount
+
+
+class AlertEvaluator:
+    """
+    Evaluates the armed alerts against each batch of refreshed prices.
+
+    Price alerts sit in a PriceAlertIndex, so a price update only touches the
+    alerts it crosses; portfolio alerts are evaluated together against the
+    positions once per batch. The in-memory state is rebuilt from the alerts
+    table whenever it changes, which covers alerts created or deleted through
+    the API of any worker.
+    """
+
+    def __init__(self):
+        self.prices = PriceAlertIndex()
+        self.portfolio = PortfolioAlerts()
+        self.stats = {"rebuilds": 0, "evaluations": 0, "triggered": 0}
+        self._fingerprint = None
+
+    def sync(self):
+        fingerprint = alerts_fingerprint()
+        if fingerprint == self._fingerprint:
+            return
+        price_alerts, portfolio_alerts = load_armed_alerts()
+        prices = PriceAlertIndex()
+        prices.load(price_alerts)
+        self.prices, self.portfolio = prices, PortfolioAlerts(portfolio_alerts)
+        self._fingerprint = fingerprint
+        self.stats["rebuilds"] += 1
+
+    def evaluate(self, quotes: dict) -> list[tuple]:
+        """
+        Fire the alerts crossed by `quotes` ({symbol: quote}) and by the
+        resulting portfolio P/L, and disarm them in the database.
+
+        Returns:
+            list: (alert id, value that fired it)
+        """
+        self.sync()
+        with span("alert_evaluation"):
+            fired = [
+                (alert_id, quote["current_price"])
+                for symbol, quote in quotes.items()
+                for alert_id in self.prices.on_price(symbol, quote["current_price"])
+            ]
+            alerts_triggered.inc(len(fired), target=PRICE)
+            if len(self.portfolio):
+                fired_ids, fired_values = self.portfolio.evaluate(*load_portfolio_pl())
+                fired.extend(zip(fired_ids.tolist(), fired_values.tolist()))
+                alerts_triggered.inc(len(fired_ids), target=PORTFOLIO_PL_PERCENTAGE)
+
+        disarmed = mark_triggered(fired)
+        if disarmed == len(fired) and self._fingerprint is not None:
+            # Keep the in-memory state instead of rebuilding it for our own changes
+            count, id_sum = self._fingerprint
+            self._fingerprint = (count - disarmed, (id_sum or 0) - sum(alert_id for alert_id, _ in fired) or None)
+        self.stats["evaluations"] += 1
+        self.stats["triggered"] += len(fired)
+        if fired:
+            logger.info("%d alerts triggered", len(fired))
+        return fired
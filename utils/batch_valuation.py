@@ -0,0 +1,212 @@
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select, update
+from config import settings
+from database.connection import engine
+from models import Holding, PortfolioSnapshot, PositionSnapshot, Stock, ValuationRun
+from utils.metrics import errors_total, span
+from utils.yfinance_service import get_stock_quotes
+
+logger = logging.getLogger(__name__)
+
+LOT_COLUMNS = ["user_id", "stock_id", "shares", "purchase_cost"]
+POSITION_KEY = ["user_id", "stock_id"]
+
+
+class PriceBook:
+    """
+    Prices of the stocks seen so far in a run.
+
+    Each chunk's unseen stocks are fetched in one batch, so every symbol is
+    fetched exactly once per run however many users hold it.
+    """
+
+    def __init__(self, connection, fetch_quotes):
+        self.connection = connection
+        self.fetch_quotes = fetch_quotes
+        self.prices = {}  # stock_id -> price, NaN when it could not be fetched
+        self.errors = {}
+
+    def add(self, stock_ids):
+        unseen = [int(stock_id) for stock_id in stock_ids if stock_id not in self.prices]
+        if not unseen:
+            return
+        symbols = dict(self.connection.execute(select(Stock.id, Stock.stock_symbol).where(Stock.id.in_(unseen))).all())
+        quotes, errors = self.fetch_quotes(list(symbols.values()))
+        self.errors.update(errors)
+        for stock_id in unseen:
+            quote = quotes.get(symbols.get(stock_id))
+            self.prices[stock_id] = float(quote["current_price"]) if quote else np.nan
+
+
+def aggregate_positions(lots: pd.DataFrame) -> pd.DataFrame:
+    # Lots arrive ordered by user and stock, so the groups are already in order
+    return (
+        lots.groupby(POSITION_KEY, sort=False)
+        .agg(total_shares=("shares", "sum"), total_cost=("purchase_cost", "sum"), lot_count=("shares", "size"))
+        .reset_index()
+    )
+
+
+def value_positions(positions: pd.DataFrame, prices: dict):
+    """
+    Value complete positions and total them per user.
+
+    Positions without a price are carried at cost in the user totals.
+
+    Returns:
+        tuple: (positions with price, market_value and profit_loss; per-user totals)
+    """
+    positions = positions.copy()
+    positions["price"] = positions["stock_id"].map(prices).astype("float64")
+    positions["market_value"] = positions["total_shares"] * positions["price"]
+    positions["profit_loss"] = positions["market_value"] - positions["total_cost"]
+
+    totals = (
+        positions.assign(
+            value=positions["market_value"].fillna(positions["total_cost"]),
+            unpriced=positions["price"].isna()
+        )
+        .groupby("user_id", sort=False)
+        .agg(
+            total_cost=("total_cost", "sum"),
+            total_value=("value", "sum"),
+            lot_count=("lot_count", "sum"),
+            unpriced_positions=("unpriced", "sum")
+        )
+        .reset_index()
+    )
+    totals["total_profit_loss"] = totals["total_value"] - totals["total_cost"]
+    cost = totals["total_cost"].to_numpy()
+    totals["total_profit_loss_percentage"] = np.where(
+        cost > 0, totals["total_profit_loss"].to_numpy() / np.where(cost > 0, cost, 1) * 100, 0.0
+    )
+    return positions, totals
+
+
+def _records(frame: pd.DataFrame, run_id: int) -> list[dict]:
+    # NULL instead of NaN for unpriced positions
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [dict(record, run_id=run_id) for record in frame.to_dict("records")]
+
+
+def prune_runs(connection, keep_runs: int):
+    """
+    Delete every run but the newest `keep_runs`, with their snapshots.
+    """
+    old_ids = connection.execute(
+        select(ValuationRun.id).order_by(ValuationRun.id.desc()).offset(keep_runs)
+    ).scalars().all()
+    if not old_ids:
+        return 0
+    # Explicit deletes; SQLite does not enforce ON DELETE CASCADE by default
+    connection.execute(delete(PositionSnapshot).where(PositionSnapshot.run_id.in_(old_ids)))
+    connection.execute(delete(PortfolioSnapshot).where(PortfolioSnapshot.run_id.in_(old_ids)))
+    connection.execute(delete(ValuationRun).where(ValuationRun.id.in_(old_ids)))
+    return len(old_ids)
+
+
+def run_batch_valuation(chunk_size: int = None, fetch_quotes=get_stock_quotes, keep_runs: int = None) -> dict:
+    """
+    Value every account and store the results as a new valuation run.
+
+    Lots are streamed ordered by user in chunks of `chunk_size`, so memory
+    depends on the chunk size and the number of distinct stocks, not on the
+    number of users. Every chunk's complete users are written out as soon as
+    it is valued; the last user of a chunk may continue in the next one and is
+    carried over. The snapshots are committed together with the run's
+    "completed" status.
+
+    Args:
+        chunk_size (int): Lots read per round trip.
+        fetch_quotes: Function of a symbol list returning ({symbol: quote}, {symbol: error}).
+        keep_runs (int): Runs to keep, including this one.
+
+    Returns:
+        dict: The run id and its counts.
+    """
+    chunk_size = chunk_size or settings.valuation_chunk_size
+    keep_runs = keep_runs or settings.valuation_keep_runs
+    started = time.perf_counter()
+
+    with engine.connect() as connection:
+        run_id = connection.execute(
+            insert(ValuationRun).values(status="running", started_at=datetime.now(timezone.utc), price_errors={})
+        ).inserted_primary_key[0]
+        connection.commit()
+
+        prices = PriceBook(connection, fetch_quotes)
+        counts = {"lot_count": 0, "user_count": 0}
+        carry = None
+
+        def write(positions: pd.DataFrame):
+            positions, totals = value_positions(positions, prices.prices)
+            connection.execute(insert(PositionSnapshot), _records(positions, run_id))
+            connection.execute(insert(PortfolioSnapshot), _records(totals, run_id))
+            counts["user_count"] += len(totals)
+
+        try:
+            with span("batch_valuation"):
+                lots = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+                    select(Holding.user_id, Holding.stock_id, Holding.shares, Holding.purchase_cost)
+                    .order_by(Holding.user_id, Holding.stock_id)
+                )
+                for rows in lots.partitions():
+                    chunk = pd.DataFrame.from_records(rows, columns=LOT_COLUMNS)
+                    counts["lot_count"] += len(chunk)
+                    positions = aggregate_positions(chunk)
+                    if carry is not None:
+                        positions = pd.concat([carry, positions]).groupby(POSITION_KEY, sort=False).sum().reset_index()
+                    prices.add(positions["stock_id"].unique())
+
+                    last_user = positions["user_id"].iat[-1]
+                    is_last_user = (positions["user_id"] == last_user).to_numpy()
+                    carry = positions[is_last_user]
+                    if not is_last_user.all():
+                        write(positions[~is_last_user])
+                if carry is not None:
+                    write(carry)
+
+                connection.execute(
+                    update(ValuationRun).where(ValuationRun.id == run_id).values(
+                        status="completed",
+                        finished_at=datetime.now(timezone.utc),
+                        symbol_count=len(prices.prices),
+                        price_errors=prices.errors,
+                        **counts
+                    )
+                )
+                pruned = prune_runs(connection, keep_runs)
+                connection.commit()
+        except Exception:
+            connection.rollback()
+            errors_total.inc(component="batch_valuation")
+            connection.execute(
+                update(ValuationRun).where(ValuationRun.id == run_id).values(status="failed", finished_at=datetime.now(timezone.utc))
+            )
+            connection.commit()
+            raise
+
+    report = {
+        "run_id": run_id,
+        **counts,
+        "symbol_count": len(prices.prices),
+        "price_errors": len(prices.errors),
+        "pruned_runs": pruned,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info("Batch valuation finished: %s", report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Value every account and store the snapshots as a new valuation run.")
+    parser.add_argument("--chunk-size", type=int, help="lots read per round trip")
+    parser.add_argument("--keep-runs", type=int, help="valuation runs to keep, including this one")
+    args = parser.parse_args()
+    print(json.dumps(run_batch_valuation(args.chunk_size, keep_runs=args.keep_runs)))
@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from config import settings
+from utils.metrics import registry
+
+queue_wait_seconds = registry.histogram(
+    "finsight_executor_queue_wait_seconds", "Time tasks wait for a pool worker.", ("pool",)
+)
+run_seconds = registry.histogram(
+    "finsight_executor_run_seconds", "Time tasks run on a pool worker.", ("pool",)
+)
+
+
+class PoolSaturatedError(Exception):
+    """
+    Raised when a pool already has its maximum number of queued tasks.
+    """
+
+    def __init__(self, pool_name: str):
+        super().__init__(f"The {pool_name} pool is saturated, try again later.")
+        self.pool_name = pool_name
+
+
+def _timed_call(fn, args, kwargs):
+    # Runs inside the worker; time.monotonic() is system-wide, so it also works for process pools
+    started = time.monotonic()
+    result = fn(*args, **kwargs)
+    return result, started, time.monotonic()
+
+
+class BoundedExecutor:
+    """
+    An executor with a cap on waiting tasks.
+
+    Tasks beyond `max_workers + max_queue` are rejected with PoolSaturatedError
+    instead of piling up, and queue wait and run time are recorded per pool.
+    """
+
+    def __init__(self, name: str, executor, max_workers: int, max_queue: int, copy_context: bool = False):
+        self.name = name
+        self.executor = executor
+        self.copy_context = copy_context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "in_flight": 0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+            "run_seconds_max": 0.0,
+        }
+        self._lock = threading.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.stats["in_flight"] >= self.max_workers + self.max_queue:
+                self.stats["rejected"] += 1
+                raise PoolSaturatedError(self.name)
+            self.stats["in_flight"] += 1
+            self.stats["submitted"] += 1
+
+        submitted = time.monotonic()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(_timed_call, fn, args, kwargs)
+        if self.copy_context:
+            # run_in_executor does not carry context variables over to the worker thread
+            call = functools.partial(contextvars.copy_context().run, call)
+        try:
+            result, started, finished = await loop.run_in_executor(self.executor, call)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+
+        self._record(max(started - submitted, 0.0), finished - started)
+        return result
+
+    def _record(self, queue_wait: float, run_time: float):
+        queue_wait_seconds.observe(queue_wait, pool=self.name)
+        run_seconds.observe(run_time, pool=self.name)
+        with self._lock:
+            self.stats["completed"] += 1
+            self.stats["queue_wait_seconds_total"] += queue_wait
+            self.stats["queue_wait_seconds_max"] = max(self.stats["queue_wait_seconds_max"], queue_wait)
+            self.stats["run_seconds_total"] += run_time
+            self.stats["run_seconds_max"] = max(self.stats["run_seconds_max"], run_time)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _thread_pool(name: str, max_workers: int, max_queue: int) -> BoundedExecutor:
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+    return BoundedExecutor(name, executor, max_workers, max_queue, copy_context=True)
+
+
+def _process_pool(name: str, max_workers: int, max_queue: int) -> BoundedExecutor:
+    # "spawn" avoids forking a process that is running threads; workers start on first use
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    return BoundedExecutor(name, executor, max_workers, max_queue)
+
+
+# Separate pools so slow network calls, model inference and password hashing cannot starve each other
+pools = {
+    "io": _thread_pool("io", settings.io_pool_workers, settings.io_pool_max_queue),
+    "inference": _thread_pool("inference", settings.inference_pool_workers, settings.inference_pool_max_queue),
+    "hashing": _process_pool("hashing", settings.hashing_pool_workers, settings.hashing_pool_max_queue),
+}
+
+
+# One process-wide pool for blocking calls fanned out from a pool worker (e.g. one quote fetch per
+# symbol): a pool per call would multiply the io workers by its size and defeat their bound
+_fan_out_pool = ThreadPoolExecutor(max_workers=settings.quote_fetch_concurrency, thread_name_prefix="fan-out")
+
+
+def fan_out(fn, calls: dict) -> dict:
+    """
+    Run `fn(*args)` for every `{key: args}` on the shared fan-out pool and wait for all of them.
+
+    Blocks the calling thread, so call it from a pool worker, not the event
+    loop; `fn` must not fan out again.
+
+    Returns:
+        dict: {key: completed Future}
+    """
+    # Each call runs in a copy of the caller's context so its spans reach a request profile
+    futures = {key: _fan_out_pool.submit(contextvars.copy_context().run, fn, *args) for key, args in calls.items()}
+    wait(futures.values())
+    return futures
+
+
+async def run_in_pool(pool_name: str, fn, *args, **kwargs):
+    """
+    Run a blocking function on one of the named pools without blocking the event loop.
+    """
+    return await pools[pool_name].run(fn, *args, **kwargs)
+
+
+def get_executor_stats() -> dict:
+    stats = {}
+    for name, pool in pools.items():
+        with pool._lock:
+            stats[name] = dict(pool.stats, max_workers=pool.max_workers, max_queue=pool.max_queue)
+    return stats
+
+
+def shutdown_pools():
+    for pool in pools.values():
+        pool.shutdown()
+    _fan_out_pool.shutdown(wait=False, cancel_futures=True)
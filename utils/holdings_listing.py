@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import date
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Holding, Stock
+
+# Page order; matches ix_holdings_user_stock_date after the user_id prefix, with id breaking ties
+PAGE_ORDER = (Holding.stock_id, Holding.purchase_date, Holding.id)
+
+
+def encode_holdings_cursor(stock_id: int, purchase_date: date, holding_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([stock_id, purchase_date.isoformat(), holding_id]).encode()).decode()
+
+
+def decode_holdings_cursor(cursor: str):
+    """
+    Raises:
+        ValueError: If the cursor was not produced by `encode_holdings_cursor`.
+    """
+    try:
+        stock_id, purchase_date, holding_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(stock_id), date.fromisoformat(purchase_date), int(holding_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def holdings_page_query(user_id: int, limit: int, after: tuple = None, stock_symbol: str = None):
+    """
+    One page of a user's lots, grouped by stock and oldest purchase first.
+
+    Args:
+        user_id (int): Owner of the lots.
+        limit (int): Rows to return.
+        after (tuple): (stock_id, purchase_date, id) of the last row of the previous page.
+        stock_symbol (str): Only lots of this stock.
+    """
+    query = (
+        select(Holding, Stock.stock_symbol)
+        .join(Stock, Stock.id == Holding.stock_id)
+        .where(Holding.user_id == user_id)
+    )
+    if stock_symbol is not None:
+        query = query.where(Stock.stock_symbol == stock_symbol)
+    if after is not None:
+        # Seek past the previous page instead of counting rows with OFFSET
+        query = query.where(tuple_(*PAGE_ORDER) > tuple_(*after))
+    return query.order_by(*PAGE_ORDER).limit(limit)
+
+
+async def list_holdings(db: AsyncSession, user_id: int, limit: int, cursor: str = None, stock_symbol: str = None):
+    """
+    A page of the user's holdings and the cursor of the next one.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+
+    Returns:
+        dict: {"items": [...], "next_cursor": str or None}
+    """
+    after = decode_holdings_cursor(cursor) if cursor else None
+    # One extra row tells whether another page follows
+    rows = (await db.execute(holdings_page_query(user_id, limit + 1, after, stock_symbol))).all()
+    items = [
+        {
+            "id": row.Holding.id,
+            "stock_symbol": row.stock_symbol,
+            "shares": row.Holding.shares,
+            "purchase_cost": row.Holding.purchase_cost,
+            "purchase_date": row.Holding.purchase_date
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1].Holding
+        next_cursor = encode_holdings_cursor(last.stock_id, last.purchase_date, last.id)
+    return {"items": items, "next_cursor": next_cursor}
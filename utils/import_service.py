@@ -0,0 +1,133 @@
+import csv
+import io
+import itertools
+import json
+from collections import defaultdict
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from models import Holding, Stock
+from utils.executors import run_in_pool
+from utils.position_service import apply_position_delta
+import schemas
+
+def iter_import_rows(file, import_format: str):
+    """
+    Lazily parse an uploaded binary file.
+
+    Yields:
+        tuple: (row number, dict) for parsed rows, or (row number, error message)
+        for lines that could not be parsed. Row numbers start at 1 for the first data row.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        reader = csv.DictReader(text)
+        for row_number, row in enumerate(reader, start=1):
+            # DictReader puts fields beyond the header in a list under the None key
+            extra = row.pop(None, None)
+            if extra is not None:
+                yield row_number, f"Expected {len(reader.fieldnames)} fields, got {len(reader.fieldnames) + len(extra)}"
+                continue
+            yield row_number, row
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, f"Invalid JSON: {e}"
+            continue
+        yield row_number, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def read_chunk(rows, size: int):
+    return list(itertools.islice(rows, size))
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+
+async def import_holdings(db: AsyncSession, user_id: int, rows, chunk_size: int = None):
+    """
+    Validate and insert parsed rows in chunks, all inside one transaction.
+
+    Each chunk resolves the symbols it has not seen yet with one query and is
+    inserted with one multi-row INSERT; positions are updated once per stock
+    at the end. Parsing runs on the I/O pool so large uploads do not block the
+    event loop.
+
+    Returns:
+        dict: inserted and failed row counts and a per-row error report.
+    """
+    chunk_size = chunk_size or settings.import_chunk_size
+    stock_ids = {}  # symbol -> stock id, None for unknown symbols
+
+    inserted = 0
+    failed = 0
+    errors = []
+    position_deltas = defaultdict(lambda: [0.0, 0.0, 0])  # stock id -> [shares, cost, lots]
+
+    def report(row_number: int, message: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.import_max_reported_errors:
+            errors.append({"row": row_number, "error": message})
+
+    try:
+        while True:
+            chunk = await run_in_pool("io", read_chunk, rows, chunk_size)
+            if not chunk:
+                break
+
+            parsed = []
+            for row_number, row in chunk:
+                if isinstance(row, str):
+                    report(row_number, row)
+                    continue
+                try:
+                    parsed.append((row_number, schemas.HoldingCreate.model_validate(row)))
+                except ValidationError as e:
+                    report(row_number, _validation_message(e))
+
+            unseen = {holding.stock_symbol for _, holding in parsed} - stock_ids.keys()
+            if unseen:
+                result = await db.execute(select(Stock.stock_symbol, Stock.id).where(Stock.stock_symbol.in_(unseen)))
+                stock_ids.update(dict.fromkeys(unseen))
+                stock_ids.update(result.all())
+
+            values = []
+            for row_number, holding in parsed:
+                stock_id = stock_ids[holding.stock_symbol]
+                if stock_id is None:
+                    report(row_number, f"Stock not found: {holding.stock_symbol}")
+                    continue
+
+                values.append({
+                    "user_id": user_id,
+                    "stock_id": stock_id,
+                    "shares": holding.shares,
+                    "purchase_cost": holding.purchase_cost,
+                    "purchase_date": holding.purchase_date,
+                })
+                delta = position_deltas[stock_id]
+                delta[0] += holding.shares
+                delta[1] += holding.purchase_cost
+                delta[2] += 1
+
+            if values:
+                # executemany is sent as batched multi-row INSERT statements
+                await db.execute(insert(Holding), values)
+                inserted += len(values)
+
+        for stock_id, (shares, cost, lots) in position_deltas.items():
+            await apply_position_delta(db, user_id, stock_id, shares=shares, cost=cost, lots=lots)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return {"inserted": inserted, "failed": failed, "errors": errors}
@@ -0,0 +1,309 @@
+import contextvars
+import math
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter as FrequencyCounter, OrderedDict
+from contextlib import contextmanager
+from config import settings
+
+# Latency buckets in seconds, from a cache hit to a slow upstream call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing value per label set.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name + "_total", dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """
+    Cumulative bucket counts, sum and count per label set.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(entry) for key, entry in self._values.items()}
+        for key, entry in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                yield self.name + "_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+            yield self.name + "_bucket", dict(labels, le="+Inf"), entry[-1]
+            yield self.name + "_sum", labels, entry[-2]
+            yield self.name + "_count", labels, entry[-1]
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text exposition format.
+
+    Collectors are callables returning (name, documentation, type, samples)
+    tuples, for values that already live elsewhere such as pool statistics.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        families = [(metric.name, metric.documentation, metric.type, metric.samples()) for metric in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                errors_total.inc(component="metrics_collector")
+
+        lines = []
+        for name, documentation, metric_type, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "finsight_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+span_duration = registry.histogram(
+    "finsight_span_duration_seconds", "Duration of instrumented hot-path operations.", ("span",)
+)
+errors_total = registry.counter(
+    "finsight_errors", "Handled errors by component.", ("component",)
+)
+
+
+def stats_collector(name: str, documentation: str, stats_fn, label: str = None):
+    """
+    Expose the numeric fields of a stats dict as gauges.
+
+    With `label`, `stats_fn` returns {label value: {field: number}}, e.g. one
+    entry per pool.
+    """
+
+    def collect():
+        stats = stats_fn()
+        groups = stats.items() if label else [(None, stats)]
+        fields = {}
+        for label_value, group in groups:
+            for field, value in group.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    labels = {label: label_value} if label else {}
+                    fields.setdefault(field, []).append((f"{name}_{field}", labels, value))
+        return [(f"{name}_{field}", documentation, "gauge", samples) for field, samples in sorted(fields.items())]
+
+    return collect
+
+
+# Spans recorded during the current request, when it is being profiled
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def record_span(name: str, seconds: float):
+    span_duration.observe(seconds, span=name)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block as a named span.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+# Leaf frames of threads parked with nothing to do; counted, but not kept as stacks
+IDLE_FRAMES = frozenset({
+    "threading:wait",
+    "threading:_wait_for_tstate_lock",
+    "selectors:select",
+    "multiprocessing.connection:wait",
+})
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every other thread at a fixed interval.
+
+    Stacks are folded root-first ("module:function;module:function") and
+    counted, the input format of most flame graph tools. Samples cover the
+    whole process, so concurrent requests show up in each other's profiles.
+    """
+
+    def __init__(self, interval: float, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = FrequencyCounter()
+        self.sample_count = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fold(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}" in IDLE_FRAMES:
+                    self.idle_samples += 1
+                else:
+                    self.stacks[self._fold(frame)] += 1
+            self.sample_count += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+@contextmanager
+def profile_request(method: str, path: str):
+    """
+    Profile the enclosed request: sample stacks and collect its spans.
+
+    Yields:
+        str: The id under which the profile will be kept.
+    """
+    profile_id = uuid.uuid4().hex[:16]
+    spans = []
+    token = _request_spans.set(spans)
+    profiler = SamplingProfiler(settings.profiling_interval_ms / 1000)
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield profile_id
+    finally:
+        profiler.stop()
+        _request_spans.reset(token)
+
+        span_totals = {}
+        for name, seconds in spans:
+            total = span_totals.setdefault(name, {"count": 0, "total_seconds": 0.0})
+            total["count"] += 1
+            total["total_seconds"] += seconds
+
+        profile = {
+            "profile_id": profile_id,
+            "method": method,
+            "path": path,
+            "duration_seconds": time.perf_counter() - started,
+            "sample_count": profiler.sample_count,
+            "idle_thread_samples": profiler.idle_samples,
+            "spans": span_totals,
+            "stacks": [
+                {"stack": stack, "samples": samples}
+                for stack, samples in profiler.stacks.most_common(settings.profiling_max_stacks)
+            ],
+        }
+        with _profiles_lock:
+            _profiles[profile_id] = profile
+            while len(_profiles) > settings.profiling_max_profiles:
+                _profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str):
+    with _profiles_lock:
+        return _profiles.get(profile_id)
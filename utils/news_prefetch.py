@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database.connection import SessionLocal
+from database.upsert import dialect_insert
+from models import Holding, Stock, SymbolNews
+from utils.executors import run_in_pool
+from utils.metrics import errors_total
+from utils.scheduler import PeriodicWorker
+from utils.sentiment_service import analyze_sentiment, fetch_news, score_headlines_cached
+
+logger = logging.getLogger(__name__)
+
+
+def load_held_symbols():
+    """
+    Distinct (stock id, stock symbol) pairs held by any user.
+    """
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Stock.id, Stock.stock_symbol)
+            .join(Holding, Stock.id == Holding.stock_id)
+            .distinct()
+        ).all()
+    return [(row.id, row.stock_symbol) for row in rows]
+
+
+def save_symbol_news(rows: list[dict]):
+    """
+    Insert or replace the stored news of each stock in `rows`.
+    """
+    if not rows:
+        return
+    with SessionLocal() as db:
+        insert = dialect_insert(db.get_bind())
+        statement = insert(SymbolNews).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["stock_id"],
+            set_={
+                "related_articles": statement.excluded.related_articles,
+                "sentiment_summary": statement.excluded.sentiment_summary,
+                "fetched_at": statement.excluded.fetched_at,
+            }
+        ))
+        db.commit()
+
+
+async def get_fresh_symbol_news(db: AsyncSession, stock_ids: list[int], max_age_seconds: int = None):
+    """
+    Prefetched news no older than `max_age_seconds`, keyed by stock id.
+    """
+    if not stock_ids:
+        return {}
+    max_age_seconds = settings.news_max_age_seconds if max_age_seconds is None else max_age_seconds
+    oldest = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+
+    result = await db.execute(select(SymbolNews).where(SymbolNews.stock_id.in_(stock_ids)))
+    fresh = {}
+    for news in result.scalars():
+        fetched_at = news.fetched_at
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+        if fetched_at >= oldest:
+            fresh[news.stock_id] = news
+    return fresh
+
+
+class NewsPrefetchScheduler(PeriodicWorker):
+    """
+    Periodically fetches and scores news for every held symbol so the
+    news-sentiment endpoint can serve it without calling Yahoo.
+
+    Upstream calls are spaced at least `min_fetch_interval` seconds apart.
+    Empty results are not stored: an empty fetch is often transient, and a
+    stored empty row would hide the symbol's news until it ages out.
+    """
+
+    name = "news prefetch"
+
+    def __init__(
+        self,
+        news_source=fetch_news,
+        symbol_source=load_held_symbols,
+        store=save_symbol_news,
+        min_fetch_interval: float = None,
+        interval: float = None,
+        jitter: float = None,
+        **kwargs
+    ):
+        super().__init__(
+            interval=settings.news_prefetch_interval_seconds if interval is None else interval,
+            jitter=settings.news_prefetch_jitter if jitter is None else jitter,
+            **kwargs
+        )
+        self.news_source = news_source
+        self.symbol_source = symbol_source
+        self.store = store
+        self.min_fetch_interval = (
+            settings.news_prefetch_min_fetch_interval_seconds if min_fetch_interval is None else min_fetch_interval
+        )
+        self._last_fetch_at = None
+        self.stats = {"symbols_fetched": 0, "fetch_errors": 0, "empty_results": 0}
+
+    async def _wait_for_rate_limit(self):
+        if self._last_fetch_at is not None:
+            wait = self._last_fetch_at + self.min_fetch_interval - self.clock()
+            if wait > 0:
+                await self.sleep(wait)
+        self._last_fetch_at = self.clock()
+
+    async def run_once(self):
+        symbols = await run_in_pool("io", self.symbol_source)
+
+        fetched = []
+        for stock_id, stock_symbol in symbols:
+            await self._wait_for_rate_limit()
+            try:
+                news_articles = await run_in_pool("io", self.news_source, stock_symbol)
+            except Exception as e:
+                self.stats["fetch_errors"] += 1
+                errors_total.inc(component="news_fetch")
+                logger.warning("Error prefetching news for %s: %s", stock_symbol, e)
+                continue
+            self.stats["symbols_fetched"] += 1
+            if not news_articles:
+                # Keep the last stored news; the endpoint refetches once it is stale
+                self.stats["empty_results"] += 1
+                continue
+            fetched.append((stock_id, news_articles))
+
+        # Score all headlines of the run in one batch
+        titles = [article['title'] for _, news_articles in fetched for article in news_articles]
+        sentiments = await score_headlines_cached(titles)
+
+        rows = []
+        offset = 0
+        fetched_at = datetime.fromtimestamp(self.clock(), timezone.utc)
+        for stock_id, news_articles in fetched:
+            analyzed_articles, sentiment_summary = analyze_sentiment(
+                news_articles, sentiments[offset:offset + len(news_articles)]
+            )
+            offset += len(news_articles)
+            rows.append({
+                "stock_id": stock_id,
+                "related_articles": analyzed_articles,
+                "sentiment_summary": sentiment_summary,
+                "fetched_at": fetched_at,
+            })
+
+        await run_in_pool("io", self.store, rows)
+        return rows
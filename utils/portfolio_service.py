@@ -1,97 +1,343 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import Holding, Stock
-from utils.yfinance_service import get_stock_data
-
-def calculate_portfolio(db: Session, user_id: int):
-    # Fetch aggregated holdings
-    holdings = (
-        db.query(
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from models import Holding, Position, Stock, StockPrice
+from utils.yfinance_service import get_stock_quotes
+from utils.executors import PoolSaturatedError, run_in_pool
+from utils.price_history import get_price_history_store, update_price_history
+
+
+def _percentage(numerator, denominator):
+    # Percentage of total cost, 0 where nothing was paid
+    return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1) * 100, 0.0)
+
+
+PRICE_COLUMNS = ["stored_price", "stored_daily_change", "stored_as_of"]
+
+
+def _stored_price_columns():
+    return (
+        StockPrice.current_price.label("stored_price"),
+        StockPrice.daily_change.label("stored_daily_change"),
+        StockPrice.as_of.label("stored_as_of")
+    )
+
+
+def lots_query(user_id: int):
+    return (
+        select(
+            Holding.id.label("holding_id"),
+            Holding.shares,
+            Holding.purchase_cost,
+            Holding.purchase_date,
             Stock.stock_symbol,
             Stock.stock_name,
-            func.sum(Holding.purchase_cost).label("total_cost"),
-            func.sum(Holding.shares).label("total_shares")
+            *_stored_price_columns()
         )
         .join(Stock, Stock.id == Holding.stock_id)
-        .filter(Holding.user_id == user_id)
-        .group_by(Holding.stock_id, Stock.stock_symbol, Stock.stock_name)
-        .all()
+        .outerjoin(StockPrice, StockPrice.stock_id == Holding.stock_id)
+        .where(Holding.user_id == user_id)
+        .order_by(Stock.stock_symbol, Holding.id)
     )
 
-    result = []
-    total_portfolio_cost = 0
-    total_portfolio_value = 0
-
-    for holding in holdings:
-        stock_symbol = holding.stock_symbol
-        total_cost = holding.total_cost
-        total_shares = holding.total_shares
-
-        # Fetch individual purchases for the stock
-        purchases = (
-            db.query(Holding)
-            .join(Stock, Stock.id == Holding.stock_id)
-            .filter(Holding.user_id == user_id, Stock.stock_symbol == stock_symbol)
-            .all()
+
+async def load_lots(db: AsyncSession, user_id: int):
+    """
+    Every lot of the user, with its stock and stored price, in a single query.
+    """
+    result = await db.execute(lots_query(user_id))
+    return pd.DataFrame(
+        result.all(),
+        columns=["holding_id", "shares", "purchase_cost", "purchase_date", "stock_symbol", "stock_name", *PRICE_COLUMNS]
+    )
+
+
+def aggregate_lots(lots: pd.DataFrame):
+    # Aggregate lots per stock
+    return (
+        lots.groupby(["stock_symbol", "stock_name"], sort=True)
+        .agg(
+            total_cost=("purchase_cost", "sum"),
+            total_shares=("shares", "sum"),
+            stored_price=("stored_price", "first"),
+            stored_daily_change=("stored_daily_change", "first"),
+            stored_as_of=("stored_as_of", "first")
         )
+        .reset_index()
+    )
+
+
+async def load_positions(db: AsyncSession, user_id: int):
+    """
+    Per-stock totals from the incrementally maintained positions table, in a single query.
+    """
+    result = await db.execute(
+        select(
+            Stock.stock_symbol,
+            Stock.stock_name,
+            Position.total_cost,
+            Position.total_shares,
+            *_stored_price_columns()
+        )
+        .join(Stock, Stock.id == Position.stock_id)
+        .outerjoin(StockPrice, StockPrice.stock_id == Position.stock_id)
+        .where(Position.user_id == user_id, Position.lot_count > 0)
+        .order_by(Stock.stock_symbol)
+    )
+    return pd.DataFrame(
+        result.all(),
+        columns=["stock_symbol", "stock_name", "total_cost", "total_shares", *PRICE_COLUMNS]
+    )
+
+
+def group_purchases(lots: pd.DataFrame):
+    # Individual purchase breakdown per stock
+    lots = lots.copy()
+    lots["purchase_cost"] = lots["purchase_cost"].round(2)
+    lots["shares"] = lots["shares"].round(2)
+    return {
+        stock_symbol: group[["holding_id", "purchase_cost", "shares", "purchase_date"]].to_dict("records")
+        for stock_symbol, group in lots.groupby("stock_symbol", sort=False)
+    }
+
+
+async def load_portfolio_holdings(db: AsyncSession, user_id: int, include_purchases: bool = True):
+    """
+    Per-stock totals and, with `include_purchases`, the purchase breakdown.
+
+    With `include_purchases` totals come from the lots themselves; without it
+    they are read from the positions table, which costs O(positions) instead
+    of O(lots).
+
+    Returns:
+        tuple: (holdings DataFrame, {symbol: purchases})
+    """
+    if include_purchases:
+        lots = await load_lots(db, user_id)
+        return aggregate_lots(lots), group_purchases(lots)
+    return await load_positions(db, user_id), {}
+
+
+def stored_quotes(holdings: pd.DataFrame, now: datetime):
+    """
+    Quotes from the stock_prices table that are fresh enough to use.
+
+    Returns:
+        tuple: ({symbol: quote}, {symbol: as-of timestamp})
+    """
+    quotes = {}
+    prices_as_of = {}
+    if settings.portfolio_price_source != "db" or holdings.empty:
+        return quotes, prices_as_of
+
+    stored_as_of = pd.to_datetime(holdings["stored_as_of"], utc=True)
+    fresh = stored_as_of.notna() & (stored_as_of >= now - timedelta(seconds=settings.price_max_age_seconds))
+    for row, as_of in zip(holdings[fresh].itertuples(), stored_as_of[fresh]):
+        quotes[row.stock_symbol] = {"current_price": row.stored_price, "daily_change": row.stored_daily_change}
+        prices_as_of[row.stock_symbol] = as_of.to_pydatetime()
+    return quotes, prices_as_of
+
+
+def quote_time(quote: dict, default: datetime) -> datetime:
+    """
+    When a live quote was fetched upstream; a cached quote can be older than the request.
+    """
+    fetched_at = quote.get("fetched_at")
+    return datetime.fromtimestamp(fetched_at, timezone.utc) if fetched_at is not None else default
 
-        # Fetch current stock data using yfinance service
-        stock_data = get_stock_data(stock_symbol)
-        current_price = stock_data["current_price"]
-        daily_change = stock_data["daily_change"]
-
-        # Calculate profit/loss
-        market_value = current_price * total_shares
-        total_profit_loss = market_value - total_cost
-        daily_profit_loss = daily_change * total_shares
-
-        # Calculate profit/loss percentage
-        total_profit_loss_percentage = (total_profit_loss / total_cost) * 100 if total_cost > 0 else 0
-        daily_profit_loss_percentage = (daily_profit_loss / total_cost) * 100 if total_cost > 0 else 0
-
-        # Add individual purchase breakdown
-        purchase_breakdown = [
-            {
-                "holding_id": purchase.id,  # Include the holding ID in the purchase breakdown
-                "purchase_cost": round(purchase.purchase_cost, 2),
-                "shares": round(purchase.shares, 2),
-                "purchase_date": purchase.purchase_date
-            }
-            for purchase in purchases
-        ]
-
-        # Append to result
-        result.append({
-            "stock_symbol": stock_symbol,
-            "stock_name": holding.stock_name,
-            "total_cost": round(total_cost, 2),
-            "total_shares": round(total_shares, 2),
-            "current_price": round(current_price, 2),
-            "market_value": round(market_value, 2),
-            "total_profit_loss": round(total_profit_loss, 2),
-            "total_profit_loss_percentage": round(total_profit_loss_percentage, 2),
-            "daily_profit_loss": round(daily_profit_loss, 2),
-            "daily_profit_loss_percentage": round(daily_profit_loss_percentage, 2),
-            "purchases": purchase_breakdown  # Include the purchase breakdown here
-        })
-
-        # Update portfolio totals
-        total_portfolio_cost += total_cost
-        total_portfolio_value += market_value
 
+def value_holdings(holdings: pd.DataFrame, quotes: dict, purchases: dict):
+    """
+    Profit/loss of every holding that has a quote, computed in one vectorized pass.
+
+    Returns:
+        tuple: (list of holding records, total cost, total market value)
+    """
+    # Skip symbols whose quote could not be fetched; they are reported in "errors"
+    holdings = holdings[holdings["stock_symbol"].isin(list(quotes))].copy()
+    holdings["current_price"] = holdings["stock_symbol"].map(lambda symbol: quotes[symbol]["current_price"]).astype(float)
+    holdings["daily_change"] = holdings["stock_symbol"].map(lambda symbol: quotes[symbol]["daily_change"]).astype(float)
+
+    # Calculate profit/loss and percentages for all holdings at once
+    holdings["market_value"] = holdings["current_price"] * holdings["total_shares"]
+    holdings["total_profit_loss"] = holdings["market_value"] - holdings["total_cost"]
+    holdings["daily_profit_loss"] = holdings["daily_change"] * holdings["total_shares"]
+    holdings["total_profit_loss_percentage"] = _percentage(holdings["total_profit_loss"], holdings["total_cost"])
+    holdings["daily_profit_loss_percentage"] = _percentage(holdings["daily_profit_loss"], holdings["total_cost"])
+
+    total_cost = float(holdings["total_cost"].sum())
+    total_value = float(holdings["market_value"].sum())
+
+    money_columns = [
+        "total_cost", "total_shares", "current_price", "market_value", "total_profit_loss",
+        "total_profit_loss_percentage", "daily_profit_loss", "daily_profit_loss_percentage"
+    ]
+    holdings[money_columns] = holdings[money_columns].round(2)
+    records = [
+        {**record, "purchases": purchases.get(record["stock_symbol"], [])}
+        for record in holdings.drop(columns=["daily_change", *PRICE_COLUMNS]).to_dict("records")
+    ]
+    return records, total_cost, total_value
+
+
+def summarize_portfolio(total_portfolio_cost: float, total_portfolio_value: float):
     # Calculate portfolio profit/loss
     total_portfolio_profit_loss = total_portfolio_value - total_portfolio_cost
     total_portfolio_profit_loss_percentage = (total_portfolio_profit_loss / total_portfolio_cost) * 100 if total_portfolio_cost > 0 else 0
 
     # Portfolio summary
-    portfolio_summary = {
+    return {
         "total_cost": round(total_portfolio_cost, 2),
         "total_value": round(total_portfolio_value, 2),
         "total_profit_loss": round(total_portfolio_profit_loss, 2),
         "total_profit_loss_percentage": round(total_portfolio_profit_loss_percentage, 2)
     }
 
+
+async def calculate_portfolio(db: AsyncSession, user_id: int, include_purchases: bool = True):
+    """
+    Value the user's portfolio. See load_portfolio_holdings for `include_purchases`.
+    """
+    holdings, purchases = await load_portfolio_holdings(db, user_id, include_purchases)
+
+    now = datetime.now(timezone.utc)
+    quotes, prices_as_of = stored_quotes(holdings, now)
+
+    # Fetch current stock data for the remaining symbols in one batched call
+    quote_errors = {}
+    missing = [symbol for symbol in holdings["stock_symbol"] if symbol not in quotes]
+    if missing:
+        live_quotes, quote_errors = await run_in_pool("io", get_stock_quotes, missing)
+        quotes.update(live_quotes)
+        prices_as_of.update({symbol: quote_time(quote, now) for symbol, quote in live_quotes.items()})
+
+    result, total_portfolio_cost, total_portfolio_value = value_holdings(holdings, quotes, purchases)
+
     return {
-        "portfolio_summary": portfolio_summary,
-        "holdings": result
-    }
\ No newline at end of file
+        "portfolio_summary": summarize_portfolio(total_portfolio_cost, total_portfolio_value),
+        "holdings": result,
+        "errors": quote_errors,
+        "prices_as_of": min(prices_as_of.values()) if prices_as_of else None
+    }
+
+
+async def stream_portfolio(holdings: pd.DataFrame, purchases: dict):
+    """
+    Yield ("holding", record) as soon as each symbol's quote is ready, then
+    ("summary", data) with the portfolio summary, errors and prices_as_of.
+
+    Takes already loaded holdings so no database session is needed while streaming.
+    """
+    now = datetime.now(timezone.utc)
+    quotes, prices_as_of = stored_quotes(holdings, now)
+    total_portfolio_cost = 0.0
+    total_portfolio_value = 0.0
+    quote_errors = {}
+
+    # Holdings priced from the database are ready immediately
+    if quotes:
+        records, total_portfolio_cost, total_portfolio_value = value_holdings(holdings, quotes, purchases)
+        for record in records:
+            yield "holding", record
+
+    async def fetch(symbol: str):
+        try:
+            return symbol, await run_in_pool("io", get_stock_quotes, [symbol])
+        except PoolSaturatedError as e:
+            # Headers are already sent, so report it like any other missing quote
+            return symbol, ({}, {symbol: str(e)})
+
+    # Fetch the remaining symbols concurrently and emit each as it arrives
+    missing = [symbol for symbol in holdings["stock_symbol"] if symbol not in quotes]
+    for next_quote in asyncio.as_completed([fetch(symbol) for symbol in missing]):
+        symbol, (live_quotes, errors) = await next_quote
+        quote_errors.update(errors)
+        if symbol not in live_quotes:
+            continue
+        prices_as_of[symbol] = quote_time(live_quotes[symbol], datetime.now(timezone.utc))
+        records, cost, value = value_holdings(holdings[holdings["stock_symbol"] == symbol], live_quotes, purchases)
+        total_portfolio_cost += cost
+        total_portfolio_value += value
+        for record in records:
+            yield "holding", record
+
+    yield "summary", {
+        "portfolio_summary": summarize_portfolio(total_portfolio_cost, total_portfolio_value),
+        "errors": quote_errors,
+        "prices_as_of": min(prices_as_of.values()) if prices_as_of else None
+    }
+
+
+def value_history(lots: pd.DataFrame, closes: pd.DataFrame, start: date, end: date):
+    """
+    Daily value, cost basis and profit/loss of the lots, vectorized over days and symbols.
+
+    Each lot counts from the first trading day on or after its purchase date.
+    Closes are carried forward over days a symbol did not trade, and a position
+    without any close yet is carried at cost.
+
+    Args:
+        lots (pd.DataFrame): stock_symbol, shares, purchase_cost and purchase_date per lot.
+        closes (pd.DataFrame): Daily closes, one column per symbol.
+        start (date): First day of the series.
+        end (date): Last day of the series.
+
+    Returns:
+        tuple: (DataFrame of daily totals indexed by date, symbols without any close)
+    """
+    symbols = pd.Index(sorted(lots["stock_symbol"].unique()))
+    closes = closes.reindex(columns=symbols).sort_index().ffill()
+    dates = closes.index[(closes.index >= pd.Timestamp(start)) & (closes.index <= pd.Timestamp(end))]
+    prices = closes.loc[dates].to_numpy(dtype="float64")
+    missing_symbols = [symbol for symbol in symbols if closes[symbol].isna().all()]
+
+    # Add each lot on its first trading day, then accumulate down the days
+    day = np.searchsorted(dates.to_numpy(), pd.to_datetime(lots["purchase_date"]).to_numpy(), side="left")
+    column = symbols.get_indexer(lots["stock_symbol"])
+    held = day < len(dates)
+    shares = np.zeros((len(dates), len(symbols)))
+    cost = np.zeros((len(dates), len(symbols)))
+    np.add.at(shares, (day[held], column[held]), lots["shares"].to_numpy(dtype="float64")[held])
+    np.add.at(cost, (day[held], column[held]), lots["purchase_cost"].to_numpy(dtype="float64")[held])
+    shares = shares.cumsum(axis=0)
+    cost = cost.cumsum(axis=0)
+
+    history = pd.DataFrame(index=dates)
+    history["value"] = np.where(np.isnan(prices), cost, shares * prices).sum(axis=1)
+    history["cost"] = cost.sum(axis=1)
+    history["profit_loss"] = history["value"] - history["cost"]
+    history["profit_loss_percentage"] = _percentage(history["profit_loss"], history["cost"])
+    return history, missing_symbols
+
+
+async def calculate_portfolio_history(db: AsyncSession, user_id: int, start: date = None, end: date = None):
+    """
+    Daily value of the user's portfolio from `start` (default: first purchase) to `end` (default: today).
+
+    Missing days of history are fetched once and appended to the price
+    history store; later requests read them from disk.
+    """
+    lots = await load_lots(db, user_id)
+    end = min(end or date.today(), date.today())
+    if lots.empty:
+        return {"start": start or end, "end": end, "points": [], "missing_symbols": [], "errors": {}}
+    start = start or min(lots["purchase_date"])
+
+    symbols = sorted(lots["stock_symbol"].unique())
+    errors = await run_in_pool("io", update_price_history, symbols)
+    closes = await run_in_pool("io", get_price_history_store().read_closes, symbols, end)
+    history, missing_symbols = value_history(lots, closes, start, end)
+
+    history = history.round(2)
+    history["date"] = history.index.date
+    return {
+        "start": start,
+        "end": end,
+        "points": history.to_dict("records"),
+        "missing_symbols": missing_symbols,
+        "errors": errors
+    }
@@ -0,0 +1,134 @@
+import argparse
+import logging
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from config import settings
+from database.connection import SessionLocal
+from database.upsert import dialect_insert
+from models import Holding, Position
+from utils.executors import run_in_pool
+from utils.scheduler import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# Float sums drift slightly when maintained incrementally; differences below this are ignored
+TOLERANCE = 1e-6
+
+
+def position_delta_statement(bind, user_id: int, stock_id: int, shares: float, cost: float, lots: int):
+    """
+    An upsert that adds the deltas to the (user, stock) position, creating it if needed.
+    """
+    insert = dialect_insert(bind)
+    statement = insert(Position).values(
+        user_id=user_id, stock_id=stock_id, total_shares=shares, total_cost=cost, lot_count=lots
+    )
+    return statement.on_conflict_do_update(
+        index_elements=["user_id", "stock_id"],
+        set_={
+            "total_shares": Position.total_shares + statement.excluded.total_shares,
+            "total_cost": Position.total_cost + statement.excluded.total_cost,
+            "lot_count": Position.lot_count + statement.excluded.lot_count,
+        }
+    )
+
+
+async def apply_position_delta(db: AsyncSession, user_id: int, stock_id: int, shares: float = 0, cost: float = 0, lots: int = 0):
+    """
+    Update a position in the caller's transaction; the caller commits.
+    """
+    await db.execute(position_delta_statement(db.get_bind(), user_id, stock_id, shares, cost, lots))
+    if lots < 0:
+        # Drop the position once its last lot is gone
+        await db.execute(
+            delete(Position).where(
+                Position.user_id == user_id, Position.stock_id == stock_id, Position.lot_count <= 0
+            )
+        )
+
+
+def reconcile_positions(db: Session, fix: bool = True):
+    """
+    Compare every position with the aggregate of the raw holdings rows.
+
+    With `fix`, missing or wrong positions are rewritten and orphaned ones deleted.
+
+    Returns:
+        dict: counts of checked, missing, mismatched and orphaned positions.
+    """
+    expected = {
+        (row.user_id, row.stock_id): row
+        for row in db.execute(
+            select(
+                Holding.user_id,
+                Holding.stock_id,
+                func.sum(Holding.shares).label("total_shares"),
+                func.sum(Holding.purchase_cost).label("total_cost"),
+                func.count(Holding.id).label("lot_count")
+            )
+            .group_by(Holding.user_id, Holding.stock_id)
+        )
+    }
+    actual = {(position.user_id, position.stock_id): position for position in db.execute(select(Position)).scalars()}
+
+    missing = [key for key in expected if key not in actual]
+    orphaned = [key for key in actual if key not in expected]
+    mismatched = [
+        key for key in expected
+        if key in actual and (
+            actual[key].lot_count != expected[key].lot_count
+            or abs(actual[key].total_shares - expected[key].total_shares) > TOLERANCE
+            or abs(actual[key].total_cost - expected[key].total_cost) > TOLERANCE
+        )
+    ]
+
+    if fix:
+        for user_id, stock_id in orphaned:
+            db.execute(delete(Position).where(Position.user_id == user_id, Position.stock_id == stock_id))
+        for key in missing + mismatched:
+            row = expected[key]
+            position = actual.get(key) or Position(user_id=row.user_id, stock_id=row.stock_id)
+            position.total_shares = row.total_shares
+            position.total_cost = row.total_cost
+            position.lot_count = row.lot_count
+            db.add(position)
+        db.commit()
+
+    return {
+        "checked": len(expected),
+        "missing": len(missing),
+        "mismatched": len(mismatched),
+        "orphaned": len(orphaned),
+    }
+
+
+def run_reconciliation(fix: bool = True):
+    with SessionLocal() as db:
+        return reconcile_positions(db, fix=fix)
+
+
+class PositionReconcileWorker(PeriodicWorker):
+    """
+    Periodically repairs positions against the holdings table.
+    """
+
+    name = "position reconciliation"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("interval", settings.position_reconcile_interval_seconds)
+        super().__init__(**kwargs)
+        self.last_report = None
+
+    async def run_once(self):
+        self.last_report = await run_in_pool("io", run_reconciliation)
+        if self.last_report["missing"] or self.last_report["mismatched"] or self.last_report["orphaned"]:
+            logger.warning("Position reconciliation repaired drift: %s", self.last_report)
+        return self.last_report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the positions table against the holdings rows.")
+    parser.add_argument("--dry-run", action="store_true", help="report differences without fixing them")
+    args = parser.parse_args()
+    print(run_reconciliation(fix=not args.dry_run))
@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import yfinance as yf
+from config import settings
+from utils.executors import fan_out
+from utils.metrics import errors_total, span
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = pa.schema([("date", pa.date32()), ("close", pa.float64())])
+
+
+class PriceHistoryStore:
+    """
+    Daily closes per symbol in append-only Parquet files.
+
+    Each append writes one part file, `<root>/<SYMBOL>/<first>_<last>.parquet`,
+    named after the dates it covers, so the last stored date and the parts a
+    date range needs are known from the directory listing alone. Parts are
+    merged once a symbol has more than `max_parts` of them.
+    """
+
+    def __init__(self, root: str = None, max_parts: int = None):
+        self.root = root or settings.price_history_dir
+        self.max_parts = max_parts or settings.price_history_max_parts
+        self.checked = {}  # symbol -> (last day asked for, monotonic time), so days without new bars are not refetched
+        self._lock = threading.Lock()
+
+    def _symbol_dir(self, symbol: str) -> str:
+        """
+        Raises:
+            ValueError: If nothing of the symbol is left to name a directory with.
+        """
+        # Symbols such as "BRK/B" must not escape the store
+        name = symbol.upper().replace("/", "_").replace(os.sep, "_").lstrip(".")
+        if not name:
+            # "", "." or ".." would resolve to the store root itself
+            raise ValueError(f"Invalid stock symbol: {symbol!r}")
+        return os.path.join(self.root, name)
+
+    def _parts(self, symbol: str):
+        """
+        Returns:
+            list: (first date, last date, path) of every part, oldest first.
+        """
+        try:
+            directory = self._symbol_dir(symbol)
+            names = os.listdir(directory)
+        except (ValueError, FileNotFoundError):
+            return []  # Nothing stored yet, or a symbol that can never be stored
+        parts = []
+        for name in names:
+            if not name.endswith(".parquet"):
+                continue
+            try:
+                first, last = name[:-len(".parquet")].split("_")[:2]
+                parts.append((date.fromisoformat(first), date.fromisoformat(last), os.path.join(directory, name)))
+            except ValueError:
+                continue  # Not a part file, e.g. an interrupted write
+        return sorted(parts)
+
+    def last_date(self, symbol: str):
+        parts = self._parts(symbol)
+        return max(last for _, last, _ in parts) if parts else None
+
+    def _write_part(self, symbol: str, table: pa.Table) -> str:
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+        dates = table.column("date")
+        first = pc.min(dates).as_py()
+        last = pc.max(dates).as_py()
+        path = os.path.join(directory, f"{first.isoformat()}_{last.isoformat()}_{uuid.uuid4().hex[:8]}.parquet")
+        # Readers never see a half-written part
+        temporary = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+        pq.write_table(table, temporary)
+        os.replace(temporary, path)
+        return path
+
+    def append(self, symbol: str, closes: pd.Series) -> int:
+        """
+        Store the closes dated after the last stored date.
+
+        Args:
+            symbol (str): Stock symbol.
+            closes (pd.Series): Close prices indexed by date.
+
+        Returns:
+            int: Number of rows appended.
+        """
+        with self._lock:
+            last = self.last_date(symbol)
+            closes = closes.dropna()
+            dates = pd.to_datetime(closes.index).date
+            if last is not None:
+                closes = closes[dates > last]
+                dates = dates[dates > last]
+            if closes.empty:
+                return 0
+            table = pa.table({"date": dates, "close": closes.to_numpy(dtype="float64")}, schema=SCHEMA)
+            self._write_part(symbol, table)
+            if len(self._parts(symbol)) > self.max_parts:
+                self._compact(symbol)
+            return len(closes)
+
+    def _compact(self, symbol: str):
+        parts = self._parts(symbol)
+        merged = self._read_parts(parts)
+        self._write_part(symbol, merged)
+        for _, _, path in parts:
+            os.remove(path)
+
+    def _read_parts(self, parts) -> pa.Table:
+        if len(parts) == 1:
+            return pq.ParquetFile(parts[0][2]).read()
+        table = pa.concat_tables([pq.ParquetFile(path).read() for _, _, path in parts])
+        # Concurrent appends from several workers may overlap; keep one row per date
+        frame = table.to_pandas().drop_duplicates("date", keep="last").sort_values("date")
+        return pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+    def read(self, symbol: str, start: date = None, end: date = None) -> pd.Series:
+        """
+        Stored closes of a symbol, indexed by date, reading only the parts that overlap the range.
+        """
+        parts = [
+            part for part in self._parts(symbol)
+            if (start is None or part[1] >= start) and (end is None or part[0] <= end)
+        ]
+        if not parts:
+            return pd.Series(dtype="float64", index=pd.DatetimeIndex([], name="date"), name=symbol)
+        table = self._read_parts(parts)
+        if start is not None:
+            table = table.filter(pc.greater_equal(table.column("date"), pa.scalar(start, pa.date32())))
+        if end is not None:
+            table = table.filter(pc.less_equal(table.column("date"), pa.scalar(end, pa.date32())))
+        # Straight to NumPy; a DataFrame round trip costs more than the read
+        dates = table.column("date").cast(pa.timestamp("ns")).to_numpy()
+        return pd.Series(table.column("close").to_numpy(), index=pd.DatetimeIndex(dates, name="date"), name=symbol)
+
+    def read_closes(self, symbols: list[str], end: date = None) -> pd.DataFrame:
+        """
+        Closes of several symbols up to `end`, one column per symbol.
+
+        Earlier history is included so the last close before any start date
+        can be carried forward.
+        """
+        return pd.DataFrame({symbol: self.read(symbol, end=end) for symbol in symbols}, columns=symbols)
+
+
+_store = None
+
+
+def get_price_history_store() -> PriceHistoryStore:
+    global _store
+    if _store is None:
+        _store = PriceHistoryStore()
+    return _store
+
+
+def set_price_history_store(store: PriceHistoryStore):
+    """
+    Replace the price history store, e.g. with one in a temporary directory.
+    """
+    global _store
+    _store = store
+
+
+def fetch_daily_closes(stock_symbol: str, start: date, end: date) -> pd.Series:
+    """
+    Daily closes from Yahoo Finance between `start` and `end`, inclusive.
+    """
+    with span("price_history_fetch"):
+        # yfinance treats `end` as exclusive
+        history = yf.Ticker(stock_symbol).history(
+            start=start.isoformat(), end=(end + timedelta(days=1)).isoformat(), interval="1d", auto_adjust=False, actions=False
+        )
+    if history.empty:
+        return pd.Series(dtype="float64")
+    closes = history["Close"]
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+    return closes
+
+
+def update_price_history(stock_symbols: list[str], today: date = None, store: PriceHistoryStore = None, fetch=fetch_daily_closes) -> dict:
+    """
+    Bring the stored history of each symbol up to yesterday, fetching only the missing days.
+
+    Today's bar is still moving, so it is never stored; a symbol with no
+    history starts `price_history_lookback_days` back.
+
+    Returns:
+        dict: {symbol: error message} for symbols that could not be updated.
+    """
+    store = store or get_price_history_store()
+    today = today or date.today()
+    end = today - timedelta(days=1)
+    now = time.monotonic()
+
+    pending = {}
+    for symbol in dict.fromkeys(stock_symbols):
+        last = store.last_date(symbol)
+        start = last + timedelta(days=1) if last else today - timedelta(days=settings.price_history_lookback_days)
+        if start > end:
+            continue
+        checked_end, checked_at = store.checked.get(symbol, (None, -np.inf))
+        if checked_end == end and now - checked_at < settings.price_history_min_refresh_seconds:
+            continue  # Weekends and holidays have no new bars
+        pending[symbol] = start
+    if not pending:
+        return {}
+
+    def update(symbol: str, start: date):
+        closes = fetch(symbol, start, end)
+        store.checked[symbol] = (end, time.monotonic())
+        return store.append(symbol, closes)
+
+    errors = {}
+    for symbol, future in fan_out(update, {symbol: (symbol, start) for symbol, start in pending.items()}).items():
+        try:
+            appended = future.result()
+            logger.debug("Stored %d closes for %s", appended, symbol)
+        except Exception as e:
+            errors_total.inc(component="price_history")
+            logger.warning("Price history update failed for %s: %s", symbol, e)
+            errors[symbol] = str(e)
+    return errors
+
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from config import settings
+from database.connection import SessionLocal
+from database.upsert import dialect_insert
+from models import StockPrice
+from utils.alert_engine import load_alert_symbols
+from utils.executors import run_in_pool
+from utils.news_prefetch import load_held_symbols
+from utils.scheduler import PeriodicWorker
+from utils.yfinance_service import get_upstream_quote_provider
+
+
+def save_stock_prices(rows: list[dict]):
+    """
+    Bulk insert-or-update rows of the stock_prices table.
+    """
+    if not rows:
+        return
+    with SessionLocal() as db:
+        insert = dialect_insert(db.get_bind())
+        statement = insert(StockPrice).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["stock_id"],
+            set_={
+                "current_price": statement.excluded.current_price,
+                "daily_change": statement.excluded.daily_change,
+                "as_of": statement.excluded.as_of,
+            }
+        ))
+        db.commit()
+
+
+class PriceRefreshWorker(PeriodicWorker):
+    """
+    Keeps stock_prices current for every held symbol, so /profit-loss can
+    read prices from the database instead of calling Yahoo.
+
+    With an AlertEvaluator, the symbols with armed price alerts are refreshed
+    too, and every batch of stored prices is evaluated against the alerts.
+    """
+
+    name = "price refresh"
+
+    def __init__(self, quote_source=None, symbol_source=load_held_symbols, store=save_stock_prices, alerts=None, interval: float = None, jitter: float = None, **kwargs):
+        super().__init__(
+            interval=settings.price_refresh_interval_seconds if interval is None else interval,
+            jitter=settings.price_refresh_jitter if jitter is None else jitter,
+            **kwargs
+        )
+        # Bypass the quote cache so stored prices are as fresh as their as_of says
+        self.quote_source = quote_source or (lambda symbols: get_upstream_quote_provider().get_quotes(symbols))
+        self.symbol_source = symbol_source
+        self.store = store
+        self.alerts = alerts
+        self.stats = {"prices_updated": 0, "quote_errors": 0, "alerts_triggered": 0}
+
+    async def run_once(self):
+        symbols = await run_in_pool("io", self.symbol_source)
+        if self.alerts is not None:
+            symbols = list(dict.fromkeys(symbols + await run_in_pool("io", load_alert_symbols)))
+        if not symbols:
+            return []
+
+        quotes, errors = await run_in_pool("io", self.quote_source, [stock_symbol for _, stock_symbol in symbols])
+        as_of = datetime.fromtimestamp(self.clock(), timezone.utc)
+        rows = [
+            {
+                "stock_id": stock_id,
+                "current_price": quotes[stock_symbol]["current_price"],
+                "daily_change": quotes[stock_symbol]["daily_change"],
+                "as_of": as_of,
+            }
+            for stock_id, stock_symbol in symbols
+            if stock_symbol in quotes
+        ]
+        await run_in_pool("io", self.store, rows)
+        if self.alerts is not None:
+            # After storing, so portfolio alerts see the new prices
+            fired = await run_in_pool("io", self.alerts.evaluate, quotes)
+            self.stats["alerts_triggered"] += len(fired)
+
+        self.stats["prices_updated"] += len(rows)
+        self.stats["quote_errors"] += len(errors)
+        return rows
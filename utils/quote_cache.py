@@ -0,0 +1,218 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import settings
+from utils.metrics import errors_total
+from utils.yfinance_service import QuoteProvider
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryQuoteStore:
+    """
+    Process-wide quote store kept in a dict.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, stock_symbol: str):
+        with self._lock:
+            return self._entries.get(stock_symbol)
+
+    def set(self, stock_symbol: str, quote: dict, fetched_at: float, expire_seconds: int):
+        with self._lock:
+            self._entries[stock_symbol] = (quote, fetched_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisQuoteStore:
+    """
+    Quote store shared between workers through Redis.
+    """
+
+    def __init__(self, redis_url: str, key_prefix: str = "finsight:quote:"):
+        import redis
+
+        self._client = redis.Redis.from_url(redis_url)
+        self._key_prefix = key_prefix
+
+    def get(self, stock_symbol: str):
+        raw = self._client.get(self._key_prefix + stock_symbol)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["quote"], entry["fetched_at"]
+
+    def set(self, stock_symbol: str, quote: dict, fetched_at: float, expire_seconds: int):
+        payload = json.dumps({"quote": quote, "fetched_at": fetched_at})
+        self._client.set(self._key_prefix + stock_symbol, payload, ex=max(int(expire_seconds), 1))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(self._key_prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class CachingQuoteProvider(QuoteProvider):
+    """
+    TTL cache in front of another QuoteProvider.
+
+    - Fresh entries (younger than `ttl`) are served directly.
+    - Stale entries (younger than `ttl + stale_ttl`) are served immediately while
+      a background refresh fetches a new quote.
+    - Concurrent misses for the same symbol are coalesced into one upstream call;
+      the other callers wait at most `fetch_timeout` for it.
+    - A failing store (e.g. Redis unavailable) is treated as a cache miss.
+
+    Every quote returned carries `fetched_at`, the epoch time of the upstream
+    fetch it came from, since a served quote can be up to `ttl + stale_ttl` old.
+    """
+
+    def __init__(self, provider: QuoteProvider, store=None, ttl: float = None, stale_ttl: float = None, fetch_timeout: float = None):
+        self.provider = provider
+        self.store = store or MemoryQuoteStore()
+        self.ttl = settings.quote_cache_ttl_seconds if ttl is None else ttl
+        self.stale_ttl = settings.quote_cache_stale_seconds if stale_ttl is None else stale_ttl
+        self.fetch_timeout = settings.quote_fetch_timeout if fetch_timeout is None else fetch_timeout
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "coalesced": 0, "refreshes": 0, "errors": 0, "store_errors": 0}
+
+        self._lock = threading.Lock()
+        self._inflight = {}  # symbol -> Future for the upstream call in progress
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quote-refresh")
+
+    def fetch_quote(self, stock_symbol: str) -> dict:
+        quotes, errors = self.get_quotes([stock_symbol])
+        if stock_symbol in errors:
+            raise ValueError(errors[stock_symbol])
+        return quotes[stock_symbol]
+
+    def get_quotes(self, stock_symbols: list[str]):
+        now = time.time()
+        quotes = {}
+        errors = {}
+        to_fetch = []
+        to_refresh = []
+        waiting = {}
+
+        for stock_symbol in dict.fromkeys(stock_symbols):
+            entry = self._store_get(stock_symbol)
+            if entry is not None:
+                quote, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self._count("hits")
+                    quotes[stock_symbol] = dict(quote, fetched_at=fetched_at)
+                    continue
+                if age < self.ttl + self.stale_ttl:
+                    self._count("stale")
+                    quotes[stock_symbol] = dict(quote, fetched_at=fetched_at)
+                    to_refresh.append(stock_symbol)
+                    continue
+
+            with self._lock:
+                future = self._inflight.get(stock_symbol)
+                if future is not None:
+                    self.stats["coalesced"] += 1
+                    waiting[stock_symbol] = future
+                else:
+                    self.stats["misses"] += 1
+                    self._inflight[stock_symbol] = Future()
+                    to_fetch.append(stock_symbol)
+
+        if to_refresh:
+            self._refresh_in_background(to_refresh)
+
+        if to_fetch:
+            fetched, fetch_errors = self._fetch(to_fetch)
+            quotes.update(fetched)
+            errors.update(fetch_errors)
+
+        deadline = time.monotonic() + self.fetch_timeout
+        for stock_symbol, future in waiting.items():
+            try:
+                quotes[stock_symbol] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                errors[stock_symbol] = "Timed out waiting for the quote."
+            except Exception as e:
+                errors[stock_symbol] = str(e)
+
+        return quotes, errors
+
+    def clear(self):
+        self.store.clear()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _store_get(self, stock_symbol: str):
+        try:
+            return self.store.get(stock_symbol)
+        except Exception as e:
+            self._store_failed("read", e)
+            return None
+
+    def _store_set(self, stock_symbol: str, quote: dict, fetched_at: float):
+        try:
+            self.store.set(stock_symbol, quote, fetched_at, self.ttl + self.stale_ttl)
+        except Exception as e:
+            self._store_failed("write", e)
+
+    def _store_failed(self, operation: str, error: Exception):
+        self._count("store_errors")
+        errors_total.inc(component="quote_cache")
+        logger.warning("Quote cache %s failed: %s", operation, error)
+
+    def _fetch(self, stock_symbols: list[str]):
+        """
+        Fetch symbols this caller owns in `_inflight` and resolve their futures.
+        """
+        try:
+            quotes, errors = self.provider.get_quotes(stock_symbols)
+        except Exception as e:
+            quotes, errors = {}, {symbol: str(e) for symbol in stock_symbols}
+
+        fetched_at = time.time()
+        for stock_symbol, quote in quotes.items():
+            self._store_set(stock_symbol, quote, fetched_at)
+        quotes = {stock_symbol: dict(quote, fetched_at=fetched_at) for stock_symbol, quote in quotes.items()}
+
+        with self._lock:
+            self.stats["errors"] += len(errors)
+            for stock_symbol in stock_symbols:
+                future = self._inflight.pop(stock_symbol, None)
+                if future is None:
+                    continue
+                if stock_symbol in quotes:
+                    future.set_result(quotes[stock_symbol])
+                else:
+                    future.set_exception(ValueError(errors.get(stock_symbol, "No data available.")))
+
+        return quotes, errors
+
+    def _refresh_in_background(self, stock_symbols: list[str]):
+        owned = []
+        with self._lock:
+            for stock_symbol in stock_symbols:
+                if stock_symbol not in self._inflight:
+                    self._inflight[stock_symbol] = Future()
+                    owned.append(stock_symbol)
+            self.stats["refreshes"] += len(owned)
+        if owned:
+            self._refresher.submit(self._fetch, owned)
+
+
+def create_quote_store():
+    """
+    Use Redis when a URL is configured, otherwise an in-process store.
+    """
+    if settings.redis_url:
+        return RedisQuoteStore(settings.redis_url)
+    return MemoryQuoteStore()
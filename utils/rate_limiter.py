@@ -0,0 +1,150 @@
+import logging
+import time
+from collections import OrderedDict
+import jwt
+from fastapi import Request
+from config import settings
+from utils.metrics import errors_total
+
+logger = logging.getLogger(__name__)
+
+# Refill and spend in one atomic step; uses the Redis clock so workers never disagree on time
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class MemoryBucketBackend:
+    """
+    Token buckets in process memory, for tests and single-worker runs.
+
+    A bucket idle for long enough to refill to capacity is indistinguishable
+    from a missing one, so it is dropped, like the Redis keys' PEXPIRE; the
+    dict is kept in last-use order so this only ever looks at its oldest end.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time), least recently used first
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float):
+        now = self.clock()
+        self._prune(now - capacity / rate)
+        tokens, ts = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            return True, 0.0
+        self._buckets[key] = (tokens, now)
+        return False, (cost - tokens) / rate
+
+    def _prune(self, refilled_before: float):
+        while self._buckets:
+            key, (_, ts) = next(iter(self._buckets.items()))
+            if ts > refilled_before:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RedisBucketBackend:
+    """
+    Token buckets shared by all workers, one EVALSHA round trip per request.
+    """
+
+    def __init__(self, redis_url: str, key_prefix: str = "finsight:ratelimit:"):
+        import redis.asyncio
+
+        self._client = redis.asyncio.Redis.from_url(redis_url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._key_prefix = key_prefix
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float):
+        allowed, retry_after = await self._script(keys=[self._key_prefix + key], args=[capacity, rate, cost])
+        return bool(int(allowed)), float(retry_after)
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token bucket with per-route costs.
+
+    Clients are identified by the user id in a valid bearer token, falling
+    back to the client IP. A route's cost is taken from the longest matching
+    path prefix in `route_costs`; a cost of 0 skips the backend entirely.
+    """
+
+    def __init__(self, backend, capacity: float, refill_per_second: float, route_costs: dict = None, default_cost: float = 1.0):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.default_cost = default_cost
+        # Longest prefixes first so the most specific route wins
+        self.route_costs = sorted((route_costs or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def cost_for(self, path: str) -> float:
+        for prefix, cost in self.route_costs:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return cost
+        return self.default_cost
+
+    def key_for(self, request: Request) -> str:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], settings.secret_key, algorithms=[settings.algorithm])
+                if payload.get("user_id") is not None:
+                    return f"user:{payload['user_id']}"
+            except jwt.InvalidTokenError:
+                pass
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def check(self, request: Request):
+        """
+        Returns:
+            tuple: (allowed, seconds until the request would be allowed)
+        """
+        cost = self.cost_for(request.url.path)
+        if cost <= 0:
+            return True, 0.0
+        try:
+            return await self.backend.take(self.key_for(request), self.capacity, self.refill_per_second, cost)
+        except Exception as e:
+            # Fail open: an unavailable limiter backend must not take the API down
+            errors_total.inc(component="rate_limiter")
+            logger.warning("Rate limiter backend error: %s", e)
+            return True, 0.0
+
+
+def create_rate_limiter() -> TokenBucketLimiter:
+    backend = RedisBucketBackend(settings.redis_url) if settings.redis_url else MemoryBucketBackend()
+    return TokenBucketLimiter(
+        backend,
+        capacity=settings.rate_limit_capacity,
+        refill_per_second=settings.rate_limit_refill_per_minute / 60,
+        route_costs=settings.rate_limit_route_costs,
+    )
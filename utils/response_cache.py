@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import threading
+import time
+from functools import lru_cache
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from cachetools import LRUCache
+from config import settings
+from utils.metrics import errors_total
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryResponseStore:
+    """
+    Cached responses and per-user generations in process memory, for tests
+    and single-worker runs.
+    """
+
+    def __init__(self, maxsize: int = None, clock=time.monotonic):
+        self.clock = clock
+        self._entries = LRUCache(maxsize=maxsize or settings.response_cache_size)  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+
+    async def get_generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    async def bump_generation(self, user_id: int):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisResponseStore:
+    """
+    Cached responses shared between workers through Redis.
+
+    Bumping a user's generation makes every worker miss on that user's old
+    entries, which then expire on their own TTL.
+    """
+
+    def __init__(self, redis_url: str, key_prefix: str = "finsight:response:"):
+        import redis.asyncio
+
+        self._client = redis.asyncio.Redis.from_url(redis_url)
+        self._key_prefix = key_prefix
+
+    async def get(self, key: str):
+        return await self._client.get(self._key_prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(self._key_prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    async def get_generation(self, user_id: int) -> int:
+        generation = await self._client.get(f"{self._key_prefix}generation:{user_id}")
+        return int(generation or 0)
+
+    async def bump_generation(self, user_id: int):
+        await self._client.incr(f"{self._key_prefix}generation:{user_id}")
+
+
+def create_response_store():
+    """
+    Use Redis when a URL is configured, otherwise an in-process store.
+    """
+    if settings.redis_url:
+        return RedisResponseStore(settings.redis_url)
+    return MemoryResponseStore()
+
+
+_store = None
+stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0, "errors": 0}
+
+
+def get_response_store():
+    global _store
+    if _store is None:
+        _store = create_response_store()
+    return _store
+
+
+def set_response_store(store):
+    """
+    Replace the response store, e.g. with a MemoryResponseStore in tests.
+    """
+    global _store
+    _store = store
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def matches_etag(request: Request, etag: str) -> bool:
+    """
+    Whether the request's If-None-Match lists `etag` (weak or strong) or is "*".
+    """
+    if_none_match = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag in if_none_match or "*" in if_none_match
+
+
+def _json_response(request: Request, body: bytes, etag: str, cache_status: str) -> Response:
+    # no-cache: clients keep the body but revalidate, so writes are visible immediately
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Cache": cache_status}
+    if matches_etag(request, etag):
+        stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cached_response(request: Request, user_id: int, response_model, compute, ttl) -> Response:
+    """
+    Serve a user's read endpoint from the response cache.
+
+    The cache key covers the path, the query string and the user's generation,
+    which `invalidate_user_responses` bumps on every write to their holdings.
+
+    Args:
+        request (Request): The incoming request.
+        user_id (int): Owner of the cached response.
+        response_model: Type the computed data is validated and serialized as.
+        compute: Coroutine function producing the response data on a miss.
+        ttl: Seconds to keep the response, or a function of the computed data returning them.
+
+    Returns:
+        Response: The JSON body with an ETag, or 304 when If-None-Match matches.
+    """
+    if not settings.response_cache_enabled:
+        response, _, _, _ = await _compute_response(request, response_model, compute, ttl)
+        return response
+
+    store = get_response_store()
+    key = None
+    try:
+        generation = await store.get_generation(user_id)
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        key = f"{user_id}:{generation}:{request.url.path}?{query}"
+        cached = await store.get(key)
+    except Exception as e:
+        # Serve uncached rather than failing the request
+        stats["errors"] += 1
+        errors_total.inc(component="response_cache")
+        logger.warning("Response cache error: %s", e)
+        cached = None
+
+    if cached is not None:
+        stats["hits"] += 1
+        etag, body = cached.split(b"\n", 1)
+        return _json_response(request, body, etag.decode(), "HIT")
+
+    stats["misses"] += 1
+    response, body, etag, seconds = await _compute_response(request, response_model, compute, ttl)
+    if key is not None and seconds > 0:
+        try:
+            await store.set(key, etag.encode() + b"\n" + body, seconds)
+        except Exception as e:
+            stats["errors"] += 1
+            errors_total.inc(component="response_cache")
+            logger.warning("Response cache error: %s", e)
+    return response
+
+
+async def _compute_response(request: Request, response_model, compute, ttl):
+    data = await compute()
+    adapter = _adapter(response_model)
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+    seconds = ttl(data) if callable(ttl) else ttl
+    return _json_response(request, body, etag, "MISS"), body, etag, seconds
+
+
+async def invalidate_user_responses(user_id: int):
+    """
+    Drop every cached response of a user; call after committing a change to their holdings.
+    """
+    stats["invalidations"] += 1
+    try:
+        await get_response_store().bump_generation(user_id)
+    except Exception as e:
+        stats["errors"] += 1
+        errors_total.inc(component="response_cache")
+        logger.error("Response cache invalidation failed for user %s: %s", user_id, e)
+
+
+def get_response_cache_stats() -> dict:
+    return dict(stats, backend=type(get_response_store()).__name__)
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import random
+import time
+from utils.metrics import errors_total
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker(ABC):
+    """
+    Runs `run_once` forever with a jittered interval between runs.
+
+    `clock` and `sleep` can be replaced so tests can drive the worker without
+    real waiting.
+    """
+
+    name = "worker"
+
+    def __init__(self, interval: float, jitter: float = 0.1, clock=time.time, sleep=asyncio.sleep, rng=random.random):
+        self.interval = interval
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self.runs = 0
+        self.last_run_at = None
+        self.last_error = None
+        self._task = None
+
+    @abstractmethod
+    async def run_once(self):
+        ...
+
+    def next_delay(self) -> float:
+        # Spread runs by +/- jitter so workers in several processes do not fire together
+        return max(self.interval * (1 + self.jitter * (2 * self.rng() - 1)), 0.0)
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                errors_total.inc(component=self.name)
+                logger.exception("%s run failed: %s", self.name, e)
+            self.runs += 1
+            self.last_run_at = self.clock()
+            await self.sleep(self.next_delay())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import unicodedata
+from cachetools import LRUCache
+from sqlalchemy import select
+from config import settings
+from database.connection import SessionLocal
+from database.upsert import dialect_insert
+from models import HeadlineSentiment
+
+# In-memory tier in front of the shared headline_sentiments table
+_memory = LRUCache(maxsize=settings.sentiment_cache_size)
+_memory_lock = threading.Lock()
+
+
+def normalize_headline(title: str) -> str:
+    # Unicode-normalize and collapse whitespace; case is kept because it can carry meaning
+    return " ".join(unicodedata.normalize("NFKC", title).split())
+
+
+def headline_key(title: str, model_id: str) -> str:
+    return hashlib.sha256(f"{model_id}\n{normalize_headline(title)}".encode("utf-8")).hexdigest()
+
+
+def lookup_sentiments(keys: list[str]) -> dict:
+    """
+    Find cached results for content hashes, checking memory before the database.
+
+    Returns:
+        dict: {content hash: {"label", "score"}} for the keys that were found.
+    """
+    found = {}
+    missing = []
+    with _memory_lock:
+        for key in keys:
+            cached = _memory.get(key)
+            if cached is not None:
+                found[key] = cached
+            else:
+                missing.append(key)
+
+    if missing:
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(HeadlineSentiment.content_hash, HeadlineSentiment.label, HeadlineSentiment.score)
+                .where(HeadlineSentiment.content_hash.in_(missing))
+            ).all()
+        with _memory_lock:
+            for row in rows:
+                found[row.content_hash] = _memory[row.content_hash] = {"label": row.label, "score": row.score}
+
+    return found
+
+
+def store_sentiments(results: dict, model_id: str):
+    """
+    Save {content hash: {"label", "score"}} to both tiers. Existing rows are kept.
+    """
+    if not results:
+        return
+
+    with _memory_lock:
+        for key, sentiment in results.items():
+            _memory[key] = sentiment
+
+    rows = [
+        {"content_hash": key, "model_id": model_id, "label": sentiment["label"], "score": sentiment["score"]}
+        for key, sentiment in results.items()
+    ]
+    with SessionLocal() as db:
+        insert = dialect_insert(db.get_bind())
+        db.execute(insert(HeadlineSentiment).values(rows).on_conflict_do_nothing(index_elements=["content_hash"]))
+        db.commit()
+
+
+def clear_memory_cache():
+    with _memory_lock:
+        _memory.clear()
@@ -1,30 +1,244 @@
+import asyncio
+import logging
+import threading
 import yfinance as yf
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+from config import settings
+from utils.executors import PoolSaturatedError, run_in_pool
+from utils.metrics import errors_total, span
+from utils.sentiment_cache import headline_key, lookup_sentiments, store_sentiments
 
-# Load FinBERT model and tokenizer
-finbert_model = AutoModelForSequenceClassification.from_pretrained("yiyanghkust/finbert-tone")
-finbert_tokenizer = AutoTokenizer.from_pretrained("yiyanghkust/finbert-tone")
+logger = logging.getLogger(__name__)
+
+FINBERT_MODEL_NAME = "yiyanghkust/finbert-tone"
+SENTIMENT_BACKENDS = ("pytorch", "quantized", "onnx")
+
+# The model is loaded on first use (or by the warm-up step in main.py), not at import time
+_finbert_pipeline = None
+_load_lock = threading.Lock()
+
+
+def load_finbert_pipeline(backend: str = None):
+    """
+    Build the FinBERT sentiment pipeline for the given backend.
+
+    - "pytorch": the fp32 model.
+    - "quantized": int8 dynamic quantization of the Linear layers, for CPU.
+    - "onnx": ONNX Runtime via `optimum[onnxruntime]` (optional dependency).
+    """
+    backend = backend or settings.sentiment_backend
+    if backend not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+
+    finbert_tokenizer = AutoTokenizer.from_pretrained(FINBERT_MODEL_NAME)
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError:
+            raise RuntimeError("The onnx sentiment backend requires `pip install optimum[onnxruntime]`.")
+        finbert_model = ORTModelForSequenceClassification.from_pretrained(FINBERT_MODEL_NAME, export=True)
+    else:
+        finbert_model = AutoModelForSequenceClassification.from_pretrained(FINBERT_MODEL_NAME)
+        if backend == "quantized":
+            import torch
+            finbert_model = torch.ao.quantization.quantize_dynamic(finbert_model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return pipeline("sentiment-analysis", model=finbert_model, tokenizer=finbert_tokenizer)
+
+
+def get_finbert_pipeline():
+    """
+    Return the shared pipeline, loading it on first use.
+    """
+    global _finbert_pipeline
+    if _finbert_pipeline is None:
+        with _load_lock:
+            if _finbert_pipeline is None:
+                _finbert_pipeline = load_finbert_pipeline()
+    return _finbert_pipeline
+
+
+def set_finbert_pipeline(finbert_pipeline):
+    """
+    Replace the shared pipeline (e.g. with a stub model in benchmarks).
+    """
+    global _finbert_pipeline
+    _finbert_pipeline = finbert_pipeline
+
+
+def get_model_id() -> str:
+    """
+    Identifies the model and backend; cached sentiments are only reused for the same id.
+    """
+    return f"{FINBERT_MODEL_NAME}@{settings.sentiment_backend}"
+
+
+def is_model_loaded() -> bool:
+    return _finbert_pipeline is not None
+
+
+def warm_up_model():
+    """
+    Load the model and run one headline through it so the first request does not pay for it.
+    """
+    score_headlines(["Markets open higher"])
 
-# Initialize the sentiment analysis pipeline
-finbert_pipeline = pipeline("sentiment-analysis", model=finbert_model, tokenizer=finbert_tokenizer)
 
 def fetch_news(stock_symbol: str, news_count: int = 5):
     """
     Fetch news articles related to a stock symbol using yfinance.
     """
-    search = yf.Search(stock_symbol, news_count=news_count)
-    return search.news
+    with span("news_fetch"):
+        search = yf.Search(stock_symbol, news_count=news_count)
+        return search.news
+
+def score_headlines(titles: list[str], batch_size: int = None):
+    """
+    Run FinBERT over many headlines in padded batches.
+    """
+    if not titles:
+        return []
+    finbert_pipeline = get_finbert_pipeline()
+    batch_size = batch_size or settings.sentiment_batch_size
+    titles = list(titles)
+    results = []
+    for start in range(0, len(titles), batch_size):
+        # One call per batch so each inference batch is timed on its own
+        with span("sentiment_inference"):
+            results.extend(finbert_pipeline(titles[start:start + batch_size], batch_size=batch_size, truncation=True))
+    return results
+
+
+class SentimentMicroBatcher:
+    """
+    Collects headlines from concurrent requests for a short window and scores
+    them in one model call.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._pending = []  # (titles, future) waiting for the next flush
+        self._flush_scheduled = False
+        self._flush_tasks = set()  # The loop only keeps weak references to running tasks
+
+    async def score(self, titles: list[str]):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((list(titles), future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.window_seconds, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        task = asyncio.ensure_future(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
 
-def analyze_sentiment(news_articles):
+    def _flush_done(self, task: asyncio.Task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            errors_total.inc(component="sentiment_microbatch")
+            logger.error("Sentiment micro-batch flush failed", exc_info=task.exception())
+
+    async def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+
+        all_titles = [title for titles, _ in pending for title in titles]
+        try:
+            scores = await run_in_pool("inference", score_headlines, all_titles)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for titles, future in pending:
+            if not future.done():
+                future.set_result(scores[offset:offset + len(titles)])
+            offset += len(titles)
+
+
+_micro_batcher = None
+
+
+async def score_headlines_async(titles: list[str]):
+    """
+    Score headlines off the event loop, sharing a model call with concurrent
+    requests when micro-batching is enabled.
+    """
+    global _micro_batcher
+    if not titles:
+        return []
+    if settings.sentiment_microbatch_window_ms <= 0:
+        return await run_in_pool("inference", score_headlines, titles)
+    if _micro_batcher is None:
+        _micro_batcher = SentimentMicroBatcher(settings.sentiment_microbatch_window_ms / 1000)
+    return await _micro_batcher.score(titles)
+
+
+def _sentiment_cache_failed(operation: str, error: Exception):
+    errors_total.inc(component="sentiment_cache")
+    logger.warning("Sentiment cache %s failed: %s", operation, error)
+
+
+async def score_headlines_cached(titles: list[str]):
+    """
+    Score headlines, reusing cached results so only unseen headlines reach the model.
+
+    The cache is only an optimization: if it cannot be read every headline is
+    scored, and if it cannot be written the scores are returned anyway.
+    """
+    if not settings.sentiment_cache_enabled:
+        return await score_headlines_async(titles)
+    if not titles:
+        return []
+
+    model_id = get_model_id()
+    keys = [headline_key(title, model_id) for title in titles]
+    try:
+        cached = await run_in_pool("io", lookup_sentiments, keys)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        _sentiment_cache_failed("read", e)
+        cached = {}
+
+    # Score each distinct uncached headline once
+    missing = {key: title for key, title in zip(keys, titles) if key not in cached}
+    if missing:
+        scores = await score_headlines_async(list(missing.values()))
+        new_results = {
+            key: {"label": score["label"], "score": score["score"]}
+            for key, score in zip(missing, scores)
+        }
+        try:
+            await run_in_pool("io", store_sentiments, new_results, model_id)
+        except Exception as e:
+            _sentiment_cache_failed("write", e)
+        cached.update(new_results)
+
+    return [cached[key] for key in keys]
+
+
+def analyze_sentiment(news_articles, sentiments=None):
     """
     Analyze the sentiment of a list of news articles using FinBERT.
+
+    `sentiments` may hold precomputed scores (one per article, e.g. from
+    score_headlines); otherwise all titles are scored in one batch.
     """
     analyzed_articles = []
     sentiment_summary = {"positive": 0, "negative": 0, "neutral": 0}
 
-    for article in news_articles:
+    if sentiments is None:
+        sentiments = score_headlines([article['title'] for article in news_articles])
+
+    for article, sentiment in zip(news_articles, sentiments):
         title = article['title']
-        sentiment = finbert_pipeline(title)[0]
         sentiment_label = sentiment['label'].lower()
         sentiment_summary[sentiment_label] += 1
 
@@ -0,0 +1,31 @@
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def encode_frame(event: str, data, stream_format: str) -> str:
+    """
+    One frame of a stream: an NDJSON line {"event", "data"} or a Server-Sent Event.
+    """
+    payload = jsonable_encoder(data)
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": event, "data": payload}) + "\n"
+
+
+def stream_response(frames, stream_format: str) -> StreamingResponse:
+    """
+    Wrap an async iterator of (event, data) pairs in a streaming response.
+    """
+    async def body():
+        async for event, data in frames:
+            yield encode_frame(event, data, stream_format)
+
+    # Disable proxy buffering so each frame reaches the client as soon as it is written
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[stream_format], headers=headers)
@@ -0,0 +1,210 @@
+import base64
+import difflib
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from sqlalchemy import select
+from config import settings
+from database.connection import SessionLocal
+from models import Stock
+from utils.executors import run_in_pool
+from utils.scheduler import PeriodicWorker
+
+# Match ranks, best first; results are ordered by (rank, symbol)
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, FUZZY = range(4)
+
+
+def load_stock_directory():
+    """
+    Every (symbol, name, sector) row of the stocks table.
+    """
+    with SessionLocal() as db:
+        rows = db.execute(select(Stock.stock_symbol, Stock.stock_name, Stock.sector)).all()
+    return [(row.stock_symbol, row.stock_name, row.sector) for row in rows]
+
+
+def stock_directory_fingerprint():
+    """
+    A hash of every (symbol, name, sector) row, so any edit to the directory changes it.
+
+    The rows are hashed here rather than in SQL because SQLite has no md5();
+    they are streamed, so the directory is never held in memory at once.
+    """
+    digest = hashlib.sha1()
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Stock.stock_symbol, Stock.stock_name, Stock.sector)
+            .order_by(Stock.id)
+            .execution_options(yield_per=1000)
+        )
+        for row in rows:
+            digest.update(json.dumps(tuple(row)).encode())
+    return digest.hexdigest()
+
+
+def encode_cursor(rank: int, symbol: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, symbol]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    Raises:
+        ValueError: If the cursor was not produced by `encode_cursor`.
+    """
+    try:
+        rank, symbol = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(rank), str(symbol)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class SymbolIndex:
+    """
+    An immutable in-memory index of the stock directory.
+
+    Symbols and name words are kept in sorted arrays, so prefix lookups are a
+    pair of binary searches. Queries without any prefix match fall back to
+    difflib over the symbols and name words sharing their first letter.
+    """
+
+    def __init__(self, rows):
+        self.stocks = {}
+        for symbol, name, sector in rows:
+            self.stocks[symbol.upper()] = {"symbol": symbol, "name": name, "sector": sector}
+        self.symbols = sorted(self.stocks)
+
+        words = {}
+        for key, stock in self.stocks.items():
+            for word in stock["name"].upper().replace(".", " ").replace(",", " ").split():
+                words.setdefault(word, set()).add(key)
+        self.words = sorted(words)
+        self._word_symbols = words
+
+        # Sorted symbols per sector, so listing one sector does not scan the whole directory
+        self.sector_symbols = {}
+        for key in self.symbols:
+            self.sector_symbols.setdefault((self.stocks[key]["sector"] or "").lower(), []).append(key)
+        digest = hashlib.sha1(json.dumps(sorted(rows)).encode())
+        self.version = digest.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _prefix_range(self, keys: list, prefix: str):
+        return keys[bisect_left(keys, prefix):bisect_right(keys, prefix + "\uffff")]
+
+    def _matches(self, query: str):
+        """
+        (rank, symbol key) for every stock matching `query`, best rank per stock.
+        """
+        query = query.strip().upper()
+        ranks = {}
+
+        def add(rank, key):
+            if rank < ranks.get(key, FUZZY + 1):
+                ranks[key] = rank
+
+        if query in self.stocks:
+            add(EXACT, query)
+        for key in self._prefix_range(self.symbols, query):
+            add(SYMBOL_PREFIX, key)
+        for word in self._prefix_range(self.words, query):
+            for key in self._word_symbols[word]:
+                add(NAME_PREFIX, key)
+        if not ranks and len(query) >= settings.symbol_search_fuzzy_min_length:
+            # Fuzzy fallback, only compared against keys with the same first letter to bound the cost
+            cutoff = settings.symbol_search_fuzzy_cutoff
+            n = settings.symbol_search_max_limit
+            for key in difflib.get_close_matches(query, self._prefix_range(self.symbols, query[0]), n=n, cutoff=cutoff):
+                add(FUZZY, key)
+            for word in difflib.get_close_matches(query, self._prefix_range(self.words, query[0]), n=n, cutoff=cutoff):
+                for key in self._word_symbols[word]:
+                    add(FUZZY, key)
+
+        return sorted((rank, key) for key, rank in ranks.items())
+
+    def search(self, query: str = "", sector: str = None, limit: int = 50, cursor: str = None):
+        """
+        Search symbols and company names, ordered by match quality and then symbol.
+
+        Args:
+            query (str): Symbol or name fragment; empty lists the whole directory.
+            sector (str): Only return stocks in this sector (case-insensitive).
+            limit (int): Page size.
+            cursor (str): `next_cursor` of the previous page.
+
+        Returns:
+            dict: The page's items and the cursor of the next page, or None on the last page.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        sector = sector.lower() if sector else None
+        if query.strip():
+            matches = self._matches(query)
+            # Keyset pagination: resume strictly after the last (rank, symbol) returned
+            matches = iter(matches[bisect_right(matches, after):] if after else matches)
+            if sector:
+                matches = (match for match in matches if (self.stocks[match[1]]["sector"] or "").lower() == sector)
+        else:
+            # The directory (or one sector of it) in symbol order
+            keys = self.sector_symbols.get(sector, []) if sector else self.symbols
+            start = bisect_right(keys, after[1]) if after else 0
+            matches = ((EXACT, key) for key in keys[start:])
+
+        # One extra match tells whether there is a next page
+        page = list(islice(matches, limit + 1))
+        next_cursor = encode_cursor(*page[limit - 1]) if len(page) > limit else None
+        return {"items": [self.stocks[key] for _, key in page[:limit]], "next_cursor": next_cursor}
+
+    def etag(self, *params) -> str:
+        # Same index version and query parameters always produce the same body
+        digest = hashlib.sha1(json.dumps([self.version, *params]).encode()).hexdigest()[:16]
+        return f'"{digest}"'
+
+
+def build_symbol_index() -> SymbolIndex:
+    return SymbolIndex(load_stock_directory())
+
+
+_index = None
+_fingerprint = None
+
+
+async def get_symbol_index() -> SymbolIndex:
+    """
+    The current index, built on first use if startup has not built it yet.
+    """
+    if _index is None:
+        await refresh_symbol_index()
+    return _index
+
+
+async def refresh_symbol_index(force: bool = True) -> bool:
+    """
+    Rebuild the index, or with `force=False` only when the stocks table changed.
+
+    Returns:
+        bool: Whether the index was rebuilt.
+    """
+    global _index, _fingerprint
+    fingerprint = await run_in_pool("io", stock_directory_fingerprint)
+    if not force and _index is not None and fingerprint == _fingerprint:
+        return False
+    index = await run_in_pool("io", build_symbol_index)
+    # Swap the reference in one step; readers keep using the old index until then
+    _index, _fingerprint = index, fingerprint
+    return True
+
+
+class SymbolIndexRefresher(PeriodicWorker):
+    """
+    Rebuilds the symbol index when the stocks table changes.
+    """
+
+    name = "symbol index refresh"
+
+    def __init__(self, interval: float = None, **kwargs):
+        super().__init__(interval=settings.symbol_index_refresh_interval_seconds if interval is None else interval, **kwargs)
+
+    async def run_once(self):
+        return await refresh_symbol_index(force=False)
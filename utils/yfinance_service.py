@@ -1,24 +1,169 @@
+from abc import ABC, abstractmethod
+import time
 import yfinance as yf
+from config import settings
+from utils.executors import fan_out
+from utils.metrics import errors_total, span
+
+
+class QuoteProvider(ABC):
+    """
+    Base class for market data sources.
+
+    Subclasses implement `fetch_quote` for a single symbol; `get_quotes` fans a
+    list of symbols out over that and collects per-symbol results, so one bad
+    symbol never aborts the whole batch.
+    """
+
+    @abstractmethod
+    def fetch_quote(self, stock_symbol: str) -> dict:
+        ...
+
+    def get_quotes(self, stock_symbols: list[str]):
+        """
+        Fetch quotes for several symbols.
+
+        Returns:
+            tuple: ({symbol: quote}, {symbol: error message})
+        """
+        quotes = {}
+        errors = {}
+        for stock_symbol in dict.fromkeys(stock_symbols):
+            try:
+                quotes[stock_symbol] = self.fetch_quote(stock_symbol)
+            except Exception as e:
+                errors_total.inc(component="quote_fetch")
+                errors[stock_symbol] = str(e)
+        return quotes, errors
+
+
+class YahooQuoteProvider(QuoteProvider):
+    """
+    Quotes from Yahoo Finance, fetched concurrently on the shared fan-out pool.
+    """
+
+    def fetch_quote(self, stock_symbol: str) -> dict:
+        with span("quote_fetch"):
+            info = yf.Ticker(stock_symbol).info  # Each access to .info is a network call
+        current_price = info.get("regularMarketPrice", 0)
+        daily_change = info.get("regularMarketChange", 0)
+
+        if not current_price:
+            raise ValueError(f"Invalid stock symbol or no data available: {stock_symbol}")
+
+        return {
+            "current_price": current_price,
+            "daily_change": daily_change or 0,
+        }
+
+    def get_quotes(self, stock_symbols: list[str]):
+        symbols = list(dict.fromkeys(stock_symbols))
+        if len(symbols) <= 1:
+            return super().get_quotes(symbols)
+
+        quotes = {}
+        errors = {}
+        futures = fan_out(self.fetch_quote, {symbol: (symbol,) for symbol in symbols})
+        for symbol, future in futures.items():
+            try:
+                quotes[symbol] = future.result()
+            except Exception as e:
+                errors_total.inc(component="quote_fetch")
+                errors[symbol] = str(e)
+        return quotes, errors
+
+
+class FakeQuoteProvider(QuoteProvider):
+    """
+    In-memory quotes for tests and benchmarks. Symbols missing from `prices`
+    behave like unknown tickers.
+    """
+
+    def __init__(self, prices: dict = None, default_price: float = None, latency: float = 0.0):
+        self.prices = prices or {}
+        self.default_price = default_price
+        self.latency = latency
+        self.calls = 0
+
+    def fetch_quote(self, stock_symbol: str) -> dict:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        quote = self.prices.get(stock_symbol)
+        if quote is None and self.default_price is not None:
+            quote = {"current_price": self.default_price, "daily_change": 0.0}
+        if quote is None:
+            raise ValueError(f"Invalid stock symbol or no data available: {stock_symbol}")
+        if not isinstance(quote, dict):
+            quote = {"current_price": quote, "daily_change": 0.0}
+        return dict(quote)
+
+
+def _build_default_provider() -> QuoteProvider:
+    provider = YahooQuoteProvider()
+    if not settings.quote_cache_enabled:
+        return provider
+
+    from utils.quote_cache import CachingQuoteProvider, create_quote_store
+    return CachingQuoteProvider(provider, create_quote_store())
+
+
+_quote_provider: QuoteProvider = _build_default_provider()
+
+
+def get_quote_provider() -> QuoteProvider:
+    return _quote_provider
+
+
+def set_quote_provider(provider: QuoteProvider):
+    """
+    Replace the process-wide quote provider (e.g. with a FakeQuoteProvider).
+    """
+    global _quote_provider
+    _quote_provider = provider
+
+
+def get_upstream_quote_provider() -> QuoteProvider:
+    """
+    The provider behind the quote cache, for callers that need fresh quotes.
+    """
+    return getattr(_quote_provider, "provider", _quote_provider)
+
+
+def get_quote_cache_stats() -> dict:
+    """
+    Hit/miss/coalesced counters of the quote cache, if one is in use.
+    """
+    stats = getattr(_quote_provider, "stats", None)
+    return dict(stats) if stats is not None else {}
+
+
+def get_stock_quotes(stock_symbols: list[str]):
+    """
+    Fetch current quotes for several stock symbols in one call.
+
+    Args:
+        stock_symbols (list[str]): The stock symbols (e.g., ["MSFT", "AAPL"]).
+
+    Returns:
+        tuple: ({symbol: {"current_price", "daily_change"}}, {symbol: error message}).
+        Quotes served through the quote cache also carry "fetched_at" (epoch seconds).
+    """
+    return _quote_provider.get_quotes(stock_symbols)
+
 
 def get_stock_data(stock_symbol: str):
     """
     Fetch stock data from yfinance for the given stock symbol.
-    
+
     Args:
         stock_symbol (str): The stock symbol (e.g., "MSFT").
-        
+
     Returns:
         dict: A dictionary containing stock data.
     """
-    # Fetch stock data
-    stock_data = yf.Ticker(stock_symbol)
-    current_price = stock_data.info.get("regularMarketPrice", 0)
-    daily_change = stock_data.info.get("regularMarketChange", 0)
-    
-    if current_price == 0:
-        raise ValueError("Invalid stock symbol or no data available.")
-    
-    return {
-        "current_price": current_price,
-        "daily_change": daily_change,
-    }
\ No newline at end of file
+    quotes, errors = get_stock_quotes([stock_symbol])
+    if stock_symbol in errors:
+        raise ValueError(errors[stock_symbol])
+    return quotes[stock_symbol]